@@ -0,0 +1,286 @@
+"""
+============================================================
+  Async batch runner + token-bucket rate limiting
+============================================================
+  run_agent() answers one question at a time, so an evaluation
+  set of a few hundred questions takes (questions x latency of a
+  whole ReAct loop). run_batch() pushes many questions through a
+  compiled graph at once:
+
+      questions ──► Semaphore(concurrency) ──► graph.ainvoke ──► results
+                                                  │               (as they
+                           every LLM request ─────┤                finish)
+                                                  ▼
+                          RateLimiter: requests/min + tokens/min
+                          (one bucket pair shared by all questions)
+
+  The semaphore caps how many questions are in flight; the limiter
+  keeps all of them together under the provider's RPM / TPM limits,
+  so raising the concurrency adds throughput until the provider
+  limit is what holds it back, instead of 429 errors.
+
+  Token use is only known after a call, so each request reserves
+  an estimate (prompt chars / 4 + COMPLETION_ESTIMATE) and settles
+  the difference with the usage the provider reports.
+
+  BENCHMARK (stub LLM with fixed latency, no API key needed):
+      python batch_runner.py
+============================================================
+"""
+
+import os
+import time
+import asyncio
+import threading
+from typing import AsyncIterator, Callable, NamedTuple
+
+from tracing import report_wait, areport_wait
+from checkpointing import arun_resumable
+
+
+# ============================================================
+# 1. CONFIGURATION
+# ============================================================
+
+MAX_CONCURRENCY = 8
+REQUESTS_PER_MINUTE = float(os.environ.get("GROQ_RPM", "30"))
+TOKENS_PER_MINUTE = float(os.environ.get("GROQ_TPM", "6000"))
+COMPLETION_ESTIMATE = 256       # tokens reserved for the answer until usage is known
+
+
+# ============================================================
+# 2. TOKEN BUCKETS
+# ============================================================
+
+class TokenBucket:
+    """
+    `per_minute` units refill continuously, up to `burst` banked.
+    reserve() takes the units right away, letting the level go
+    negative, and returns how long the caller must wait before
+    using them, so callers are served in order and never spin.
+    Thread-safe and not bound to any event loop.
+    """
+
+    def __init__(self, per_minute: float, burst: float = None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Seconds to wait before `amount` may be used."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.level -= min(amount, self.capacity)
+            return max(0.0, -self.level / self.rate)
+
+    def refund(self, amount: float):
+        """Give back (or, if negative, take) units after the fact."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """Requests/min and tokens/min for one provider; None disables a limit."""
+
+    def __init__(self, requests_per_minute: float = REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = TOKENS_PER_MINUTE,
+                 request_burst: float = None, token_burst: float = None):
+        self.requests = TokenBucket(requests_per_minute, request_burst) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, token_burst) if tokens_per_minute else None
+        self.waited_s = 0.0
+        self._lock = threading.Lock()       # waited_s is updated from many threads
+
+    def _reserve(self, tokens: int) -> float:
+        waits = [0.0]
+        if self.requests:
+            waits.append(self.requests.reserve(1))
+        if self.tokens:
+            waits.append(self.tokens.reserve(tokens))
+        wait = max(waits)
+        with self._lock:
+            self.waited_s += wait
+        return wait
+
+    async def acquire(self, tokens: int) -> float:
+        """Seconds it waited."""
+        wait = self._reserve(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+    def acquire_sync(self, tokens: int) -> float:
+        wait = self._reserve(tokens)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def settle(self, reserved: int, used: int):
+        """Correct a reservation with the usage reported (0 if the call failed)."""
+        if self.tokens and used is not None:
+            self.tokens.refund(reserved - used)
+
+
+def estimate_request_tokens(messages) -> int:
+    """Rough prompt size (4 chars per token) plus room for the answer."""
+    chars = sum(len(str(getattr(m, "content", m))) for m in messages)
+    return chars // 4 + COMPLETION_ESTIMATE
+
+
+def used_tokens(response):
+    usage = getattr(response, "usage_metadata", None) or {}
+    return usage.get("total_tokens")
+
+
+async def limited_ainvoke(model, messages, limiter: RateLimiter):
+    """model.ainvoke(messages) once the limiter allows it."""
+    reserved = estimate_request_tokens(messages)
+    await areport_wait(await limiter.acquire(reserved), "rate_limit")
+    used = 0                    # a failed call reports no usage: give the tokens back
+    try:
+        response = await model.ainvoke(messages)
+        used = used_tokens(response)
+    finally:
+        limiter.settle(reserved, used)
+    return response
+
+
+def limited_invoke(model, messages, limiter: RateLimiter):
+    """Blocking version for graphs run with .invoke()."""
+    reserved = estimate_request_tokens(messages)
+    report_wait(limiter.acquire_sync(reserved), "rate_limit")
+    used = 0
+    try:
+        response = model.invoke(messages)
+        used = used_tokens(response)
+    finally:
+        limiter.settle(reserved, used)
+    return response
+
+
+# ============================================================
+# 3. BATCH RUNNER
+# ============================================================
+
+class BatchResult(NamedTuple):
+    index: int                  # position in the input
+    question: str
+    answer: str                 # None if the run failed
+    error: str                  # None if it succeeded
+    seconds: float
+
+
+async def run_batch(graph, questions: list, make_state: Callable[[str], dict],
+                    concurrency: int = MAX_CONCURRENCY,
+                    answer_of: Callable[[dict], str] = lambda s: s["messages"][-1].content,
+                    thread_id_of: Callable[[int, str], str] = None,
+                    ) -> AsyncIterator[BatchResult]:
+    """
+    Run every question through `graph` with at most `concurrency` in
+    flight and yield each BatchResult as soon as it is done (so not in
+    input order; use .index). One failing question does not stop the rest.
+    For a graph with a checkpointer, thread_id_of(index, question) names
+    each question's thread; running the batch again resumes unfinished
+    questions and returns finished ones from their checkpoints.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int, question: str) -> BatchResult:
+        async with semaphore:
+            t0 = time.perf_counter()
+            try:
+                if thread_id_of is None:
+                    final_state = await graph.ainvoke(make_state(question))
+                else:
+                    final_state = await arun_resumable(graph, make_state(question),
+                                                       thread_id_of(index, question))
+                return BatchResult(index, question, answer_of(final_state), None,
+                                   time.perf_counter() - t0)
+            except Exception as e:
+                return BatchResult(index, question, None, f"{type(e).__name__}: {e}",
+                                   time.perf_counter() - t0)
+
+    tasks = [asyncio.create_task(one(i, q)) for i, q in enumerate(questions)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:                    # consumer stopped early
+            task.cancel()
+
+
+# ============================================================
+# 4. BENCHMARK — stub model, real graph + runner + limiter
+# ============================================================
+
+class _StubModel:
+    """Answers after a fixed delay and reports token usage like ChatGroq."""
+
+    def __init__(self, latency_s: float, tokens: int = 300):
+        self.latency_s = latency_s
+        self.tokens = tokens
+
+    async def ainvoke(self, messages):
+        from langchain_core.messages import AIMessage
+        await asyncio.sleep(self.latency_s)
+        return AIMessage(content="stub answer", usage_metadata={
+            "input_tokens": self.tokens - 20, "output_tokens": 20, "total_tokens": self.tokens})
+
+
+def _stub_graph(model, limiter: RateLimiter):
+    import operator
+    from typing import TypedDict, Annotated, List
+    from langgraph.graph import StateGraph, START, END
+
+    class State(TypedDict):
+        messages: Annotated[List, operator.add]
+
+    async def agent(state):
+        return {"messages": [await limited_ainvoke(model, state["messages"], limiter)]}
+
+    graph = StateGraph(State)
+    graph.add_node("agent", agent)
+    graph.add_edge(START, "agent")
+    graph.add_edge("agent", END)
+    return graph.compile()
+
+
+def benchmark(questions: int = 64, latency_s: float = 0.25):
+    from langchain_core.messages import HumanMessage
+
+    def make_state(q):
+        return {"messages": [HumanMessage(content=q)]}
+
+    async def timed(concurrency, limiter):
+        graph = _stub_graph(_StubModel(latency_s), limiter)
+        t0 = time.perf_counter()
+        done = [r async for r in run_batch(graph, [f"q{i}" for i in range(questions)],
+                                           make_state, concurrency)]
+        assert len(done) == questions and not any(r.error for r in done)
+        return time.perf_counter() - t0
+
+    print(f"{questions} questions, stub LLM latency {1000 * latency_s:.0f} ms\n")
+    print(f"{'concurrency':>11} {'limit':<22} {'seconds':>8} {'questions/s':>12}")
+    for concurrency in (1, 4, 16, 64):
+        seconds = asyncio.run(timed(concurrency, RateLimiter(None, None)))
+        print(f"{concurrency:>11} {'none':<22} {seconds:>8.2f} {questions / seconds:>12.1f}")
+
+    # Provider limit of 600 RPM (10/s) with a burst of 10: throughput
+    # stops at ~10/s however high the concurrency goes.
+    for concurrency in (4, 64):
+        seconds = asyncio.run(timed(concurrency, RateLimiter(600, None, request_burst=10)))
+        print(f"{concurrency:>11} {'600 RPM, burst 10':<22} {seconds:>8.2f} {questions / seconds:>12.1f}")
+
+    # 60k TPM (1000/s) with 300-token calls -> ~3.3 calls/s once the burst is spent.
+    seconds = asyncio.run(timed(64, RateLimiter(None, 60_000, token_burst=3000)))
+    print(f"{64:>11} {'60k TPM, burst 3000':<22} {seconds:>8.2f} {questions / seconds:>12.1f}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,256 @@
+"""
+============================================================
+  Pooled + cached HTTP for the web_search tool
+============================================================
+  web_search used to call requests.get() directly: a new TCP/TLS
+  connection for every search, and the same query asked twice
+  (in one run, or across the demo questions) went to DuckDuckGo
+  twice. CachedHTTP puts three things in front of it:
+
+    1. one requests.Session   keep-alive pool, connections reused
+    2. a SQLite response cache  keyed by URL + params, entries
+                                expire after ttl_s, survives restarts
+    3. single-flight          identical requests in flight at the
+                              same time share one network call
+                              (the tool_node runs tool calls in
+                              parallel threads)
+
+  Only 200 responses with a JSON body are cached.
+
+  BENCHMARK (against a local stub server, no internet needed):
+      python http_cache.py
+============================================================
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# ============================================================
+# 1. CONFIGURATION
+# ============================================================
+
+CACHE_PATH = os.environ.get("WEB_CACHE_PATH", ".web_cache.sqlite")
+CACHE_TTL_S = float(os.environ.get("WEB_CACHE_TTL_S", "3600"))
+POOL_SIZE = 8                 # keep-alive connections per host (= tool workers)
+
+
+def request_key(url: str, params: dict = None) -> str:
+    blob = json.dumps([url, sorted((params or {}).items())], default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+# ============================================================
+# 2. CLIENT
+# ============================================================
+
+class CachedHTTP:
+    """Thread-safe; one instance per process is enough."""
+
+    def __init__(self, cache_path: str = CACHE_PATH, ttl_s: float = CACHE_TTL_S,
+                 pool_size: int = POOL_SIZE):
+        self.ttl_s = ttl_s
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.cache_path = cache_path
+        self._conn = None                 # opened on first use, not at import
+        self._db_lock = threading.Lock()
+        self._inflight = {}               # key -> Future shared by concurrent callers
+        self._lock = threading.Lock()     # the in-flight table and the counters; no I/O under it
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    # ---------- cache ----------
+
+    def _db(self) -> sqlite3.Connection:
+        """The cache DB; call with _db_lock held. None if caching is off."""
+        if self._conn is None and self.cache_path:
+            self._conn = sqlite3.connect(self.cache_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, body TEXT NOT NULL, fetched REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _cached(self, key: str):
+        if not self.cache_path:
+            return None
+        with self._db_lock:
+            row = self._db().execute(
+                "SELECT body, fetched FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_s:
+            return None
+        return json.loads(row[0])
+
+    def _store(self, key: str, data):
+        if not self.cache_path:
+            return
+        with self._db_lock, self._db() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, body, fetched) VALUES (?, ?, ?)",
+                (key, json.dumps(data), time.time()),
+            )
+
+    def purge_expired(self):
+        if self.cache_path:
+            with self._db_lock, self._db() as db:
+                db.execute("DELETE FROM responses WHERE fetched < ?", (time.time() - self.ttl_s,))
+
+    # ---------- fetch ----------
+
+    def get_json(self, url: str, params: dict = None, timeout: float = 10):
+        """GET `url` and decode JSON, from the cache when fresh."""
+        key = request_key(url, params)
+        data = self._cached(key)
+        if data is not None:
+            with self._lock:
+                self.hits += 1
+            return data
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()         # re-raises the leader's error, if any
+
+        try:
+            # A leader that finished between our miss and our registration
+            # has stored its result (it stores before leaving the table).
+            data = self._cached(key)
+            if data is None:
+                with self._lock:
+                    self.misses += 1
+                response = self.session.get(url, params=params, timeout=timeout)
+                response.raise_for_status()
+                data = response.json()
+                self._store(key, data)
+            else:
+                with self._lock:
+                    self.hits += 1
+        except Exception as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._inflight[key]
+        future.set_result(data)
+        return data
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
+
+    def close(self):
+        self.session.close()
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# ============================================================
+# 3. BENCHMARK — local stub of the DuckDuckGo Instant Answer API
+# ============================================================
+
+def _start_stub_server(latency_s: float):
+    """Threaded HTTP/1.1 server answering like api.duckduckgo.com; counts connections."""
+    import http.server
+    from urllib.parse import urlparse, parse_qs
+
+    counts = {"connections": 0, "requests": 0}
+    lock = threading.Lock()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"       # keep-alive
+        disable_nagle_algorithm = True      # headers and body go out as separate writes
+
+        def setup(self):
+            super().setup()
+            with lock:
+                counts["connections"] += 1
+
+        def do_GET(self):
+            with lock:
+                counts["requests"] += 1
+            time.sleep(latency_s)
+            query = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+            body = json.dumps({"Abstract": f"Stub answer for {query}", "RelatedTopics": []}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, counts
+
+
+def benchmark(latency_s: float = 0.05):
+    import tempfile
+
+    server, counts = _start_stub_server(latency_s)
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    # A demo-like workload: a few queries, several asked more than once.
+    queries = ["population of Tokyo", "radius of Earth", "population of Tokyo",
+               "compound interest", "radius of Earth", "population of Tokyo"] * 3
+
+    def run(name, fetch, parallel=False):
+        before = dict(counts)
+        t0 = time.perf_counter()
+        if parallel:
+            with ThreadPoolExecutor(max_workers=len(queries)) as pool:
+                list(pool.map(fetch, queries))
+        else:
+            for q in queries:
+                fetch(q)
+        print(f"{name:<34} {time.perf_counter() - t0:7.3f} s   "
+              f"connections {counts['connections'] - before['connections']:>3}   "
+              f"server requests {counts['requests'] - before['requests']:>3}")
+
+    print(f"{len(queries)} searches, {len(set(queries))} distinct, stub latency {1000 * latency_s:.0f} ms\n")
+    run("requests.get (old)", lambda q: requests.get(url, params={"q": q, "format": "json"}, timeout=10).json())
+
+    pooled = CachedHTTP(cache_path=None)
+    run("session, no cache", lambda q: pooled.session.get(url, params={"q": q, "format": "json"}, timeout=10).json())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cached = CachedHTTP(cache_path=os.path.join(tmp, "cache.sqlite"))
+        run("session + cache", lambda q: cached.get_json(url, {"q": q, "format": "json"}))
+        cached.close()
+
+        cold = CachedHTTP(cache_path=os.path.join(tmp, "cold.sqlite"))
+        run("session + cache, parallel (cold)", lambda q: cold.get_json(url, {"q": q, "format": "json"}), True)
+        print(f"  {cold.stats()}")
+        cold.close()
+
+        restarted = CachedHTTP(cache_path=os.path.join(tmp, "cold.sqlite"))
+        run("after restart (persistent cache)", lambda q: restarted.get_json(url, {"q": q, "format": "json"}))
+        restarted.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -9,19 +9,42 @@
   SET YOUR API KEY:
       export GROQ_API_KEY="gsk_your_key_here"
       (or set it directly in the GROQ_API_KEY variable below)
+
+  BATCH (one question per line, GROQ_RPM / GROQ_TPM respected):
+      python react_langgraph_groq.py --batch questions.txt --concurrency 8
+      (re-running the same file resumes it; --run-name NAME starts afresh)
+
+  RESUME (runs are checkpointed to .agent_checkpoints.sqlite):
+      python react_langgraph_groq.py --resume <thread id printed by the run>
 ============================================================
 """
 
 import os
+import sys
 import json
-import traceback
-from typing import TypedDict, Annotated, List
+import time
+import uuid
+import hashlib
+import asyncio
+import operator
+import contextvars
+from typing import Annotated, List
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 
-from langchain_groq import ChatGroq
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage, SystemMessage
 from langchain_core.tools import tool
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END, START
-from langgraph.prebuilt import ToolsCondition, tools_condition
+from langgraph.prebuilt import tools_condition
+
+from llm_registry import get_chat_model
+
+from http_cache import CachedHTTP
+from repl_pool import get_repl_pool
+from tracing import traced, report_wait
+from run_budget import BudgetState, new_budget, exhausted, time_left, final_answer_messages, agent_usage, node_usage
+from checkpointing import sqlite_checkpointer, retry_policy, run_resumable
+from batch_runner import RateLimiter, limited_invoke, limited_ainvoke, run_batch, MAX_CONCURRENCY
 
 
 # ============================================================
@@ -36,13 +59,38 @@ GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "gsk_your_key_here")
 #   "llama3-8b-8192"                          ← lightweight & fast
 MODEL_NAME = "llama3-groq-70b-8192-tool-use-preview"
 
-llm = ChatGroq(
+LLM_PARAMS = dict(
     api_key=GROQ_API_KEY,
-    model_name=MODEL_NAME,
     temperature=0,          # deterministic output
     max_tokens=2048,
 )
 
+# Long-lived, connection-pooled client shared with the other agent scripts
+llm = get_chat_model(MODEL_NAME, **LLM_PARAMS)
+
+# Tool calls from one AI message run side by side on this many threads.
+MAX_TOOL_WORKERS = 8
+
+# Seconds a single call may take (from submission) before it is reported as failed.
+# (python_repl also has its own 10s limit per snippet, enforced in the worker pool.)
+TOOL_TIMEOUTS = {"web_search": 15, "python_repl": 20}
+DEFAULT_TOOL_TIMEOUT = 30
+
+# Per-run limits; when one is reached the agent must answer with what it has.
+RUN_BUDGET = new_budget(max_steps=8, max_tokens=20_000, max_seconds=120)
+
+# One limiter for every LLM request this process makes, sync or batched:
+# GROQ_RPM requests/min and GROQ_TPM tokens/min (see batch_runner.py).
+rate_limiter = RateLimiter()
+
+# Step-by-step trace printing; run_agent_batch turns it off for its questions.
+_trace = contextvars.ContextVar("trace", default=True)
+
+
+def trace(*args):
+    if _trace.get():
+        print(*args)
+
 
 # ============================================================
 # 2. TOOL DEFINITIONS
@@ -50,6 +98,10 @@ llm = ChatGroq(
 #    auto-generates the schema (name, description, args).
 # ============================================================
 
+# Shared by every web_search call: pooled connections, cached + coalesced queries
+search_http = CachedHTTP()
+
+
 @tool
 def web_search(query: str) -> str:
     """
@@ -63,12 +115,11 @@ def web_search(query: str) -> str:
         A string containing the search results summary.
     """
     try:
-        import requests
-        # Using DuckDuckGo Instant Answer API (no key required)
+        # Using DuckDuckGo Instant Answer API (no key required), through a
+        # keep-alive session + persistent cache (see http_cache.py)
         url = "https://api.duckduckgo.com/"
         params = {"q": query, "format": "json", "no_html": "1", "no_redirect": "1"}
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
+        data = search_http.get_json(url, params, timeout=10)
 
         # Try to get the instant answer first
         if data.get("Abstract"):
@@ -101,28 +152,9 @@ def python_repl(code: str) -> str:
     Returns:
         The printed output or return value of the code, or an error message.
     """
-    try:
-        # Restricted globals — blocks dangerous imports
-        safe_globals = {"__builtins__": __builtins__}
-        allowed_modules = {"math", "json", "random", "datetime", "collections", "itertools", "functools", "string"}
-
-        # Capture printed output
-        import io, sys
-        captured = io.StringIO()
-        sys.stdout = captured
-
-        # Execute in sandbox
-        exec(code, safe_globals)
-
-        sys.stdout = sys.__stdout__
-        output = captured.getvalue().strip()
-
-        return output if output else "Code executed successfully (no output)."
-
-    except Exception as e:
-        import sys
-        sys.stdout = sys.__stdout__
-        return f"Python error: {str(e)}\n{traceback.format_exc()}"
+    # Runs in a pre-started worker process with its own stdout, an import
+    # allowlist, CPU/memory limits and a wall-clock timeout (repl_pool.py)
+    return get_repl_pool().run(code)
 
 
 # ============================================================
@@ -130,8 +162,9 @@ def python_repl(code: str) -> str:
 #    Defines the shape of data flowing through the graph.
 # ============================================================
 
-class AgentState(TypedDict):
-    messages: Annotated[List, lambda x, y: x + y]  # message list grows with each step
+class AgentState(BudgetState):
+    messages: Annotated[List, operator.add]  # message list grows with each step
+    # + budget, steps, tokens_used, elapsed_s, stop_reason (run_budget.py)
 
 
 # ============================================================
@@ -146,51 +179,115 @@ tools = [web_search, python_repl]
 tool_map = {t.name: t for t in tools}
 
 
+def _agent_request(state: AgentState):
+    """(model, messages, budget limit hit or None) for this step."""
+    reason = exhausted(state)
+    if reason:
+        # Out of budget: no tools, answer from what has been gathered so far
+        trace(f"   Budget reached ({reason}): asking for a final answer")
+        return get_chat_model(MODEL_NAME, **LLM_PARAMS), final_answer_messages(state["messages"], reason), reason
+    # Cached tool-bound client: no new client or bind_tools per step
+    return get_chat_model(MODEL_NAME, tools=tools, **LLM_PARAMS), state["messages"], None
+
+
 def agent_node(state: AgentState) -> AgentState:
     """
     THE BRAIN — calls the Groq LLM with the current message history.
     Returns the LLM's response (may include a tool_call or a final answer).
     """
-    print("\n [Agent] Thinking...")
-    response = llm.with_tools(tools).invoke(state["messages"])
-    print(f"   LLM output: {response.content or '(tool call)'}")
+    trace("\n [Agent] Thinking...")
+    started = time.monotonic()
+    model, messages, reason = _agent_request(state)
+    response = limited_invoke(model, messages, rate_limiter)
+    _trace_response(response)
+    return {"messages": [response], **agent_usage(response, started, reason)}
+
+
+async def agent_node_async(state: AgentState) -> AgentState:
+    """agent_node for agent.ainvoke(): waits for the rate limiter without blocking."""
+    trace("\n [Agent] Thinking...")
+    started = time.monotonic()
+    model, messages, reason = _agent_request(state)
+    response = await limited_ainvoke(model, messages, rate_limiter)
+    _trace_response(response)
+    return {"messages": [response], **agent_usage(response, started, reason)}
+
+
+def _trace_response(response):
+    trace(f"   LLM output: {response.content or '(tool call)'}")
     if hasattr(response, "tool_calls") and response.tool_calls:
         for tc in response.tool_calls:
-            print(f" Tool call: {tc['name']}({tc['input']})")
-    return {"messages": [response]}
-
+            trace(f" Tool call: {tc['name']}({tc['args']})")
 
-def tool_node(state: AgentState) -> AgentState:
-    """
-    THE ARMS — executes every tool_call the LLM requested,
-    then returns ToolMessage(s) with the results.
-    """
-    results = []
-    last_ai_message = state["messages"][-1]              # the AIMessage with tool_calls
 
-    for tool_call in last_ai_message.tool_calls:
-        tool_name   = tool_call["name"]
-        tool_input  = tool_call["input"]
-        tool_id     = tool_call["id"]
+_tool_pool = ThreadPoolExecutor(max_workers=MAX_TOOL_WORKERS, thread_name_prefix="tool")
 
-        print(f"\n [Tool] Executing: {tool_name}({tool_input})")
 
-        if tool_name in tool_map:
-            output = tool_map[tool_name].invoke(tool_input)
-        else:
-            output = f"Error: Tool '{tool_name}' not found."
+def _invoke_tool(tools_by_name: dict, tool_name: str, tool_input: dict, submitted: float):
+    """(output, status) of one call; failures become error messages for the LLM."""
+    report_wait(time.monotonic() - submitted, "tool_pool")     # time queued for a thread
+    if tool_name not in tools_by_name:
+        return f"Error: Tool '{tool_name}' not found.", "error"
+    try:
+        return str(tools_by_name[tool_name].invoke(tool_input)), "success"
+    except Exception as e:
+        return f"Error: {tool_name} failed: {e}", "error"
 
-        print(f"   Result: {output[:200]}...")  # preview first 200 chars
 
+def run_tool_calls(tool_calls: list, tools_by_name: dict = None, pool=None,
+                   time_left: float = float("inf")) -> List[ToolMessage]:
+    """
+    Run every tool call at once and wait for all of them, so a turn
+    takes as long as its slowest call rather than the sum. Results come
+    back in the order of `tool_calls`. A call past its timeout (or past
+    the run's `time_left`) is reported as an error; its thread is left
+    to finish on its own.
+    """
+    tools_by_name = tool_map if tools_by_name is None else tools_by_name
+    pool = pool or _tool_pool
+    start = time.monotonic()
+    futures = [
+        # copy_context: the tool call stays a child of this node for tracing
+        pool.submit(contextvars.copy_context().run, _invoke_tool,
+                    tools_by_name, tc["name"], tc["args"], time.monotonic())
+        for tc in tool_calls
+    ]
+    results = []
+    for tool_call, future in zip(tool_calls, futures):
+        timeout = min(TOOL_TIMEOUTS.get(tool_call["name"], DEFAULT_TOOL_TIMEOUT), time_left)
+        try:
+            output, status = future.result(timeout=max(0.0, start + timeout - time.monotonic()))
+        except FutureTimeout:
+            output = f"Error: {tool_call['name']} timed out after {timeout:g}s."
+            status = "error"
         results.append(
             ToolMessage(
-                content=str(output),
-                tool_call_id=tool_id,
-                name=tool_name,
+                content=output,
+                tool_call_id=tool_call["id"],
+                name=tool_call["name"],
+                status=status,
             )
         )
+    return results
+
+
+def tool_node(state: AgentState) -> AgentState:
+    """
+    THE ARMS — executes every tool_call the LLM requested (concurrently),
+    then returns ToolMessage(s) with the results, in request order.
+    """
+    started = time.monotonic()
+    last_ai_message = state["messages"][-1]              # the AIMessage with tool_calls
+
+    for tool_call in last_ai_message.tool_calls:
+        trace(f"\n [Tool] Executing: {tool_call['name']}({tool_call['args']})")
+
+    results = run_tool_calls(last_ai_message.tool_calls, time_left=time_left(state))
+
+    for message in results:
+        trace(f"   Result [{message.name}]: {message.content[:200]}...")  # preview first 200 chars
 
-    return {"messages": results}
+    return {"messages": results, **node_usage(started)}
 
 
 # ============================================================
@@ -205,7 +302,7 @@ def should_continue(state: AgentState) -> str:
     """
     last_message = state["messages"][-1]
     if hasattr(last_message, "tool_calls") and last_message.tool_calls:
-        return "tool"       # continue the loop
+        return "tools"      # continue the loop
     return END              # final answer reached
 
 
@@ -228,16 +325,20 @@ def should_continue(state: AgentState) -> str:
 graph = StateGraph(AgentState)
 
 # Register nodes
-graph.add_node("agent", agent_node)
-graph.add_node("tools", tool_node)
+# Retry budget: attempts per node on network / rate-limit errors. Tool failures
+# already come back as error messages, so tools only retry once.
+graph.add_node("agent", RunnableLambda(agent_node, afunc=agent_node_async),  # invoke / ainvoke
+               retry_policy=retry_policy(3))
+graph.add_node("tools", tool_node, retry_policy=retry_policy(2))
 
 # Wire the edges
 graph.add_edge(START, "agent")                          # always start at agent
 graph.add_conditional_edges("agent", should_continue)   # agent → tools OR END
 graph.add_edge("tools", "agent")                        # tools always loop back to agent
 
-# Compile into a runnable
-agent = graph.compile()
+# Compile into a runnable. The SQLite checkpointer saves the state after every
+# node under the call's thread_id, so an interrupted run resumes where it stopped.
+agent = traced(graph.compile(checkpointer=sqlite_checkpointer()))     # AGENT_TRACE=spans.jsonl to record spans
 
 
 # ============================================================
@@ -271,40 +372,145 @@ Rules:
 # 8. RUN THE AGENT
 # ============================================================
 
-def run_agent(user_question: str):
+def run_agent(user_question: str = None, thread_id: str = None, budget: dict = None):
     """
     Entry point: feed a question into the compiled graph
     and stream the full ReAct trace.
+    Pass the thread_id of an interrupted run (question optional) to resume it.
+    `budget` overrides RUN_BUDGET, e.g. new_budget(max_steps=4).
     """
+    thread_id = thread_id or f"react-{uuid.uuid4().hex[:12]}"
     print("=" * 60)
-    print(f" Question: {user_question}")
+    print(f" Question: {user_question or '(resuming)'}")
+    print(f" Thread:   {thread_id}")
     print("=" * 60)
 
-    initial_state = {
-        "messages": [
-            SystemMessage(content=SYSTEM_PROMPT),
-            HumanMessage(content=user_question),
-        ]
-    }
-
     # Invoke the graph — LangGraph handles the loop automatically
-    final_state = agent.invoke(initial_state)
+    state = initial_state(user_question, budget) if user_question else None
+    final_state = run_resumable(agent, state, thread_id)
 
     # The last AIMessage in the chain is the final answer
     final_answer = final_state["messages"][-1].content
     print("\n" + "=" * 60)
     print(f" Final Answer:\n{final_answer}")
+    print(f" Stopped: {final_state.get('stop_reason')} after {final_state.get('steps', 0)} steps, "
+          f"{final_state.get('tokens_used', 0)} tokens, {final_state.get('elapsed_s', 0.0):.1f}s")
     print("=" * 60)
 
     return final_answer
 
 
+def initial_state(user_question: str, budget: dict = None) -> dict:
+    return {
+        "messages": [
+            SystemMessage(content=SYSTEM_PROMPT),
+            HumanMessage(content=user_question),
+        ],
+        "budget": budget or RUN_BUDGET,
+    }
+
+
+async def run_agent_batch(questions: list, concurrency: int = MAX_CONCURRENCY,
+                          run_name: str = "batch"):
+    """
+    Answer many questions at once; yields batch_runner.BatchResult as each
+    one finishes. Every LLM request goes through the shared rate_limiter.
+    Each question is checkpointed as thread "<run_name>-<index>-<hash of
+    question>": a repeated question gets its own thread, and an edited
+    line does not pick up the old line's answer. Re-running an interrupted
+    batch with the same run_name only does the missing work; use a new
+    run_name to answer everything again.
+    """
+    def thread_id_of(index, question):
+        digest = hashlib.sha1(question.encode('utf-8')).hexdigest()[:16]
+        return f"{run_name}-{index}-{digest}"
+
+    token = _trace.set(False)     # interleaved traces of many questions are unreadable
+    try:
+        async for result in run_batch(agent, questions, initial_state, concurrency,
+                                      thread_id_of=thread_id_of):
+            yield result
+    finally:
+        _trace.reset(token)
+
+
+async def _batch_main(path: str, concurrency: int, run_name: str = None):
+    with open(path, encoding="utf-8") as f:
+        questions = [line.strip() for line in f if line.strip()]
+    t0 = time.perf_counter()
+    run_name = run_name or "batch-" + os.path.splitext(os.path.basename(path))[0]
+    async for r in run_agent_batch(questions, concurrency, run_name):
+        print(json.dumps(r._asdict(), ensure_ascii=False), flush=True)
+    elapsed = time.perf_counter() - t0
+    print(f"{len(questions)} questions in {elapsed:.1f}s with concurrency {concurrency} "
+          f"(waited {rate_limiter.waited_s:.1f}s on rate limits)", file=sys.stderr)
+
+
+# ============================================================
+# 9. BENCHMARK — sequential vs concurrent tool calls
+#    Stub tools that only sleep, so no network or API key is used:
+#      python react_langgraph_groq.py --benchmark-tools
 # ============================================================
-# 9. DEMO — run sample questions
+
+def benchmark_tools(latencies=(0.2, 0.4, 0.6, 0.8, 1.0)):
+    def stub(seconds):
+        @tool
+        def slow_search(query: str) -> str:
+            """Stub search that takes a fixed time."""
+            time.sleep(seconds)
+            return f"{query}: done in {seconds}s"
+        return slow_search
+
+    stubs = {f"search_{i}": stub(s) for i, s in enumerate(latencies)}
+    calls = [
+        {"name": name, "args": {"query": f"q{i}"}, "id": f"call_{i}", "type": "tool_call"}
+        for i, name in enumerate(stubs)
+    ]
+
+    t0 = time.perf_counter()
+    for call in calls:                                  # the old one-by-one loop
+        stubs[call["name"]].invoke(call["args"])
+    sequential = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    messages = run_tool_calls(calls, stubs)
+    concurrent = time.perf_counter() - t0
+
+    assert [m.tool_call_id for m in messages] == [c["id"] for c in calls]
+    print(f"{len(calls)} tool calls, slowest {max(latencies):.1f}s, sum {sum(latencies):.1f}s")
+    print(f"sequential : {sequential:6.2f} s")
+    print(f"concurrent : {concurrent:6.2f} s")
+
+
+# ============================================================
+# 10. DEMO — run sample questions
 # ============================================================
 
 if __name__ == "__main__":
 
+    if "--benchmark-tools" in sys.argv:
+        benchmark_tools()
+        sys.exit()
+
+    # Batch mode: one question per line, JSON results printed as they finish
+    #   python react_langgraph_groq.py --batch questions.txt [--concurrency 8] [--run-name NAME]
+    if "--batch" in sys.argv:
+        path = sys.argv[sys.argv.index("--batch") + 1]
+        concurrency = MAX_CONCURRENCY
+        if "--concurrency" in sys.argv:
+            concurrency = int(sys.argv[sys.argv.index("--concurrency") + 1])
+        run_name = None
+        if "--run-name" in sys.argv:
+            run_name = sys.argv[sys.argv.index("--run-name") + 1]
+        asyncio.run(_batch_main(path, concurrency, run_name))
+        sys.exit()
+
+    # Continue an interrupted run from its last checkpoint:
+    #   python react_langgraph_groq.py --resume react-1a2b3c4d5e6f
+    if "--resume" in sys.argv:
+        run_agent(thread_id=sys.argv[sys.argv.index("--resume") + 1])
+        sys.exit()
+
     # --- Question 1: Pure search ---
     run_agent("What is the current population of Tokyo, Japan?")
 
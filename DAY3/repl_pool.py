@@ -0,0 +1,338 @@
+"""
+============================================================
+  Pre-started sandboxed interpreters for the python_repl tool
+============================================================
+  python_repl used to exec() the model's code inside the agent
+  process: no timeout (a `while True` froze the whole agent), no
+  memory cap, and output was captured by swapping sys.stdout,
+  which breaks as soon as tool calls run on parallel threads.
+
+  ReplPool keeps a few worker interpreters running, each with
+  the allowed modules already imported, and sends every snippet to
+  an idle one over a pipe:
+
+      agent thread ──code──► worker (own process, own stdout)
+                   ◄─output─
+
+  Per call:   wall-clock timeout (the worker is killed and replaced)
+              CPU-time limit     (RLIMIT_CPU -> SIGXCPU, POSIX only)
+  Per worker: memory limit       (RLIMIT_AS, POSIX only)
+              recycled after MAX_RUNS calls or any limit hit
+
+  Imports are limited to ALLOWED_MODULES. This contains runaway
+  or greedy code; it is not a security boundary against hostile
+  code.
+
+  BENCHMARK (per-call latency, parallel runs, limits):
+      python repl_pool.py
+============================================================
+"""
+
+import io
+import os
+import sys
+import json
+import math
+import time
+import queue
+import atexit
+import builtins
+import threading
+import traceback
+import importlib
+import subprocess
+
+try:
+    import resource               # POSIX only; on Windows only the wall clock applies
+    import signal
+except ImportError:
+    resource = None
+
+
+# ============================================================
+# 1. CONFIGURATION
+# ============================================================
+
+ALLOWED_MODULES = ("math", "json", "random", "datetime", "collections", "itertools",
+                   "functools", "string", "statistics", "decimal", "fractions", "re")
+POOL_SIZE = min(4, os.cpu_count() or 1)
+WALL_TIMEOUT_S = 10
+CPU_LIMIT_S = 5
+MEMORY_LIMIT_MB = 512
+MAX_RUNS = 50                 # calls before a worker is replaced by a fresh one
+MAX_OUTPUT_CHARS = 10_000
+START_TIMEOUT_S = 30
+
+REMOVED_BUILTINS = ("open", "input", "breakpoint", "exit", "quit")
+
+
+# ============================================================
+# 2. WORKER SIDE (runs in the child interpreter)
+# ============================================================
+
+class CPUTimeExceeded(Exception):
+    pass
+
+
+def _guarded_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name.split(".")[0] not in ALLOWED_MODULES:
+        raise ImportError(f"import of {name!r} is not allowed (allowed: {', '.join(ALLOWED_MODULES)})")
+    return importlib.__import__(name, globals, locals, fromlist, level)
+
+
+def _worker_main(cpu_limit_s: int, memory_limit_mb: int):
+    # The protocol gets private copies of stdin/stdout; fd 0/1 point at
+    # /dev/null so nothing the snippet does can corrupt the pipe.
+    proto_in = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    proto_out = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+
+    for name in ALLOWED_MODULES:
+        importlib.import_module(name)
+    safe_builtins = {k: v for k, v in vars(builtins).items() if k not in REMOVED_BUILTINS}
+    safe_builtins["__import__"] = _guarded_import
+
+    if resource is not None:
+        limit = memory_limit_mb * 2 ** 20
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+        def on_sigxcpu(signum, frame):
+            raise CPUTimeExceeded(f"CPU time limit of {cpu_limit_s}s exceeded")
+        signal.signal(signal.SIGXCPU, on_sigxcpu)
+
+    proto_out.write(json.dumps({"ready": os.getpid()}) + "\n")
+    proto_out.flush()
+
+    for line in proto_in:
+        code = json.loads(line)["code"]
+        if resource is not None:
+            # RLIMIT_CPU counts the whole process, so move the soft limit to
+            # "CPU used so far + this call's allowance" before every call.
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            soft = math.ceil(usage.ru_utime + usage.ru_stime) + cpu_limit_s
+            resource.setrlimit(resource.RLIMIT_CPU, (soft, resource.RLIM_INFINITY))
+
+        captured = io.StringIO()
+        sys.stdout = sys.stderr = captured
+        error, recycle = None, False
+        try:
+            exec(code, {"__builtins__": safe_builtins, "__name__": "__repl__"})
+        except (CPUTimeExceeded, MemoryError) as e:
+            error, recycle = f"{type(e).__name__}: {e}", True
+        except BaseException as e:             # SystemExit, KeyboardInterrupt too
+            error = f"{e}\n{traceback.format_exc()}"
+        finally:
+            sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+
+        proto_out.write(json.dumps({
+            "output": captured.getvalue()[:MAX_OUTPUT_CHARS],
+            "error": error,
+            "recycle": recycle,
+        }) + "\n")
+        proto_out.flush()
+
+
+# ============================================================
+# 3. PARENT SIDE
+# ============================================================
+
+class _Worker:
+
+    def __init__(self, cpu_limit_s: int, memory_limit_mb: int):
+        self.proc = subprocess.Popen(
+            [sys.executable, "-u", os.path.abspath(__file__), "--worker",
+             str(cpu_limit_s), str(memory_limit_mb)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding="utf-8", bufsize=1,
+        )
+        self.replies = queue.Queue()
+        self.runs = 0
+        self.ready = False
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        for line in self.proc.stdout:
+            self.replies.put(json.loads(line))
+        self.replies.put(None)                         # EOF: the worker died
+
+    def call(self, code: str, timeout: float) -> dict:
+        """Reply dict; raises TimeoutError, or RuntimeError if the worker died."""
+        if not self.ready:
+            try:
+                started = self.replies.get(timeout=START_TIMEOUT_S)
+            except queue.Empty:
+                raise RuntimeError(f"worker did not start within {START_TIMEOUT_S}s")
+            if started is None:
+                raise RuntimeError("worker failed to start")
+            self.ready = True
+        self.runs += 1
+        try:
+            self.proc.stdin.write(json.dumps({"code": code}) + "\n")
+            self.proc.stdin.flush()
+        except OSError:                                # BrokenPipeError: died while idle
+            raise RuntimeError("worker process died while idle")
+        try:
+            reply = self.replies.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"timed out after {timeout}s")
+        if reply is None:
+            raise RuntimeError("worker process died (memory or CPU limit?)")
+        return reply
+
+    def kill(self):
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+
+
+class ReplPool:
+    """Thread-safe: any number of agent threads may call run() at once."""
+
+    def __init__(self, size: int = POOL_SIZE, timeout_s: float = WALL_TIMEOUT_S,
+                 cpu_limit_s: int = CPU_LIMIT_S, memory_limit_mb: int = MEMORY_LIMIT_MB,
+                 max_runs: int = MAX_RUNS):
+        self.timeout_s = timeout_s
+        self.cpu_limit_s = cpu_limit_s
+        self.memory_limit_mb = memory_limit_mb
+        self.max_runs = max_runs
+        self._workers = set()                          # every live worker, idle or busy
+        self._workers_lock = threading.Lock()
+        self._closed = False
+        self._idle = queue.Queue()                     # None once closed: wakes waiters
+        for _ in range(size):
+            self._idle.put(self._spawn())              # all start in parallel
+        self._counts_lock = threading.Lock()
+        self.counts = {"calls": 0, "timeouts": 0, "crashes": 0, "recycled": 0}
+        atexit.register(self.close)
+
+    def _spawn(self):
+        """A new tracked worker, or None once the pool is closed."""
+        with self._workers_lock:
+            if self._closed:
+                return None
+            worker = _Worker(self.cpu_limit_s, self.memory_limit_mb)
+            self._workers.add(worker)
+        return worker
+
+    def _retire(self, worker: _Worker):
+        worker.kill()
+        with self._workers_lock:
+            self._workers.discard(worker)
+
+    def _count(self, key: str):
+        with self._counts_lock:
+            self.counts[key] += 1
+
+    def run(self, code: str, timeout: float = None) -> str:
+        """Output of `code`, formatted the way python_repl always returned it."""
+        timeout = timeout or self.timeout_s
+        worker = self._idle.get()                      # waits while all workers are busy
+        if worker is None or self._closed:
+            self._idle.put(None)                       # wake the next waiter too
+            raise RuntimeError("REPL pool is closed")
+        self._count("calls")
+        replace = False
+        try:
+            reply = worker.call(code, timeout)
+            replace = reply["recycle"] or worker.runs >= self.max_runs
+        except TimeoutError as e:
+            self._count("timeouts")
+            replace = True
+            return f"Python error: {e} (the worker was stopped)"
+        except RuntimeError as e:
+            self._count("crashes")
+            replace = True
+            return f"Python error: {e}"
+        finally:
+            if replace:
+                self._retire(worker)
+                self._count("recycled")
+                worker = self._spawn()                 # starts now, ready by its next call
+            if worker is not None:
+                self._idle.put(worker)
+
+        if reply["error"]:
+            return f"Python error: {reply['error']}"
+        output = reply["output"].strip()
+        return output if output else "Code executed successfully (no output)."
+
+    def close(self):
+        """Kill every worker, busy ones included; later run() calls raise."""
+        with self._workers_lock:
+            self._closed = True                        # no new workers from here on
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.kill()
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+        self._idle.put(None)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_repl_pool() -> ReplPool:
+    """The process-wide pool, started on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ReplPool()
+    return _pool
+
+
+# ============================================================
+# 4. BENCHMARK
+# ============================================================
+
+def benchmark(calls: int = 20):
+    snippet = "import math, itertools\nprint(sum(math.factorial(n) % 97 for n in range(300)))"
+
+    t0 = time.perf_counter()
+    for _ in range(calls):
+        subprocess.run([sys.executable, "-c", snippet], capture_output=True, check=True)
+    fresh = (time.perf_counter() - t0) / calls
+
+    pool = ReplPool()
+    pool.run("pass")                                   # wait until the workers are up
+    t0 = time.perf_counter()
+    for _ in range(calls):
+        pool.run(snippet)
+    pooled = (time.perf_counter() - t0) / calls
+    print(f"per call, fresh interpreter : {1000 * fresh:8.1f} ms")
+    print(f"per call, pre-started pool  : {1000 * pooled:8.1f} ms")
+
+    busy = "t = 0\nfor i in range(3_000_000):\n    t += i\nprint(t)"
+    t0 = time.perf_counter()
+    pool.run(busy)
+    one = time.perf_counter() - t0
+    n = POOL_SIZE
+    threads = [threading.Thread(target=pool.run, args=(busy,)) for _ in range(n)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(f"{n} CPU-bound snippets in parallel: {time.perf_counter() - t0:.2f} s (one alone: {one:.2f} s)")
+
+    t0 = time.perf_counter()
+    print("runaway loop ->", pool.run("while True: pass", timeout=2), f"({time.perf_counter() - t0:.1f} s)")
+    print("memory bomb  ->", pool.run("x = bytearray(4 * 1024 ** 3)"))
+    print("import os    ->", pool.run("import os").splitlines()[0])
+    print("after limits ->", pool.run("print(6 * 7)"))
+    print(pool.counts)
+    pool.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--worker":
+        _worker_main(int(sys.argv[2]), int(sys.argv[3]))
+    else:
+        benchmark()
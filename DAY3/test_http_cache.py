@@ -0,0 +1,100 @@
+"""
+CachedHTTP against a local stub of the DuckDuckGo Instant Answer API.
+
+    python -m pytest test_http_cache.py
+"""
+
+import json
+import time
+import threading
+import http.server
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from http_cache import CachedHTTP
+
+
+@pytest.fixture
+def stub():
+    counts = {"requests": 0}
+    lock = threading.Lock()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            with lock:
+                counts["requests"] += 1
+            time.sleep(0.05)
+            query = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+            body = json.dumps({"Abstract": f"Stub answer for {query}", "RelatedTopics": []}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/", counts
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_client(tmp_path):
+    clients = []
+
+    def make(**kwargs):
+        client = CachedHTTP(cache_path=str(tmp_path / f"cache{len(clients)}.sqlite"), **kwargs)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+def test_hit_serves_repeat_from_cache(stub, make_client):
+    url, counts = stub
+    http = make_client()
+    first = http.get_json(url, {"q": "tokyo"})
+    second = http.get_json(url, {"q": "tokyo"})
+    assert first == second == {"Abstract": "Stub answer for tokyo", "RelatedTopics": []}
+    assert counts["requests"] == 1
+    assert http.stats() == {"hits": 1, "misses": 1, "coalesced": 0}
+
+
+def test_different_params_miss(stub, make_client):
+    url, counts = stub
+    http = make_client()
+    assert http.get_json(url, {"q": "tokyo"})["Abstract"].endswith("tokyo")
+    assert http.get_json(url, {"q": "paris"})["Abstract"].endswith("paris")
+    assert counts["requests"] == 2
+    assert http.stats() == {"hits": 0, "misses": 2, "coalesced": 0}
+
+
+def test_expired_entry_is_fetched_again(stub, make_client):
+    url, counts = stub
+    http = make_client(ttl_s=0.1)
+    http.get_json(url, {"q": "tokyo"})
+    time.sleep(0.2)
+    http.get_json(url, {"q": "tokyo"})
+    assert counts["requests"] == 2
+    assert http.stats()["misses"] == 2
+
+
+def test_concurrent_identical_requests_share_one_fetch(stub, make_client):
+    url, counts = stub
+    http = make_client()
+    callers = 16
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        results = list(pool.map(lambda _: http.get_json(url, {"q": "tokyo"}), range(callers)))
+    assert all(r == results[0] for r in results)
+    assert counts["requests"] == 1
+    stats = http.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] + stats["coalesced"] == callers - 1
@@ -1,10 +1,13 @@
+import os
 from fastapi import FastAPI
 from pydantic import BaseModel
-from langchain_groq import ChatGroq
+
+from llm_registry import get_chat_model
 
 app = FastAPI()
 
-llm_obj = ChatGroq(model="llama-3.1-8b-instant",api_key=os.getenv("GROQ_API_KEY"))
+# One pooled client for every request, instead of a connection per worker call
+llm_obj = get_chat_model("llama-3.1-8b-instant", api_key=os.getenv("GROQ_API_KEY"))
 
 
 class Query(BaseModel):
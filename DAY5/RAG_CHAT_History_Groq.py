@@ -1,100 +1,70 @@
-import os
+import time
+import uuid
 import streamlit as st
 
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_groq import ChatGroq
-from langchain_classic.chains import RetrievalQA
-from langchain_core.prompts import PromptTemplate
-
-from langchain_community.chat_message_histories import ChatMessageHistory
 from langchain_core.chat_history import BaseChatMessageHistory
 from langchain_core.runnables.history import RunnableWithMessageHistory
 
+from rag_backend import get_shared_backend, prompt_tokens
+from rag_history import SQLiteHistoryStore
+
 # ======================================
 # STREAMLIT UI
 # ======================================
 st.set_page_config(page_title="Strict RAG Chatbot", layout="centered")
 st.title(" Strict RAG Chatbot with History")
 
-if "rag_chain" not in st.session_state:
-
-    # Step 1: Load PDF
-    loader = PyPDFLoader("attention.pdf")
-    documents = loader.load()
-
-    # Step 2: Split
-    splitter = RecursiveCharacterTextSplitter()
-    docs = splitter.split_documents(documents)
-
-    # Step 3: Embeddings
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
-    )
-
-    # Step 4: Vector Store
-    vectorstore = FAISS.from_documents(docs, embeddings)
-    retriever = vectorstore.as_retriever()
-
-    # Step 5: LLM
-    llm = ChatGroq(
-        model="llama-3.1-8b-instant",
-        api_key=os.getenv("GROQ_API_KEY")
-    )
-
-    # Step 6: Strict Prompt
-    prompt = PromptTemplate(
-        input_variables=["context", "question", "history"],
-        template="""
-You are a strict retrieval QA assistant.
-Use only the following context and chat history to answer the question.
-If the answer is not present, reply exactly with:
-"I don't know, the document doesnot contain this information."
-
-Context:
-{context}
+# ======================================
+# SHARED BACKEND (one per process)
+# ======================================
+# Embeddings, FAISS index, Groq client and the RAG chain are
+# built once and shared by every browser session. Chat history is
+# kept per session ID in SQLite, with recently active sessions held
+# in memory.
+#
+# The history keeps the last few turns verbatim plus a rolling
+# summary (written in the background), so the prompt stops growing.
 
-Chat history:
-{history}
+@st.cache_resource
+def get_history_store():
+    return SQLiteHistoryStore("chat_history.db", llm=get_backend().llm)
 
-Question:
-{question}
 
-Answer:
-"""
-    )
+def get_session_history(session_id: str) -> BaseChatMessageHistory:
+    return get_history_store().get(session_id)
 
-    # Step 7: RetrievalQA Chain
-    rag_chain = RetrievalQA.from_chain_type(
-        llm=llm,
-        retriever=retriever,
-        chain_type_kwargs={"prompt": prompt}
-    )
 
-    # Step 8: Chat History Store
-    store = {}
+@st.cache_resource
+def get_backend():
+    return get_shared_backend("attention.pdf")
 
-    def get_session_history(session_id: str) -> BaseChatMessageHistory:
-        if session_id not in store:
-            store[session_id] = ChatMessageHistory()
-        return store[session_id]
 
-    rag_with_history = RunnableWithMessageHistory(
-        rag_chain,
+@st.cache_resource
+def get_rag_chain():
+    return RunnableWithMessageHistory(
+        get_backend().rag_chain,
         get_session_history,
         input_messages_key="query",
         history_messages_key="history"
     )
 
-    st.session_state.rag_chain = rag_with_history
 
+backend = get_backend()
+rag_chain = get_rag_chain()
+
+# One session ID per user, kept in the URL so a reload (or a server
+# restart) picks the same conversation back up.
+if "session_id" not in st.session_state:
+    st.session_state.session_id = st.query_params.get("sid") or uuid.uuid4().hex
+    st.query_params["sid"] = st.session_state.session_id
+SESSION_ID = st.session_state.session_id
 
-SESSION_ID = "streamlit-session-1"
+stream_answers = st.sidebar.toggle("Stream tokens", value=True)
 
 if "messages" not in st.session_state:
-    st.session_state.messages = []
+    st.session_state.messages = get_history_store().transcript(SESSION_ID)
+if "prompt_tokens" not in st.session_state:
+    st.session_state.prompt_tokens = []
 
 # Display previous messages
 for msg in st.session_state.messages:
@@ -112,17 +82,60 @@ if query:
     with st.chat_message("user"):
         st.write(query)
 
-    # Invoke RAG
-    response = st.session_state.rag_chain.invoke(
-        {"query": query},
-        config={"configurable": {"session_id": SESSION_ID}}
-    )
-
-    answer = response["result"]
+    # Semantic cache first: same meaning + same retrieved context + same
+    # conversation so far means the same answer, without a Groq round trip.
+    query_vector, docs = backend.retrieve(query)
+    history = get_session_history(SESSION_ID)
+    history_before = history.messages
+    answer = backend.answer_cache.lookup(query_vector, docs, history_before)
 
-    # Show assistant message
+    with st.chat_message("assistant"):
+        if answer is None:
+            # Record the prompt size for this turn to check it plateaus
+            st.session_state.prompt_tokens.append(
+                prompt_tokens(query, docs, history_before)
+            )
+
+            # Invoke RAG (docs are passed in so the query isn't retrieved twice)
+            inputs = {"query": query, "docs": docs}
+            config = {"configurable": {"session_id": SESSION_ID}}
+            t0 = time.perf_counter()
+            if stream_answers:
+                first_token = []
+
+                def tokens():
+                    for token in rag_chain.stream(inputs, config=config):
+                        if not first_token:
+                            first_token.append(time.perf_counter() - t0)
+                        yield token
+
+                # Tokens appear in the bubble as Groq produces them
+                answer = st.write_stream(tokens())
+                total = time.perf_counter() - t0
+                ttft = first_token[0] if first_token else total
+            else:
+                answer = rag_chain.invoke(inputs, config=config)
+                st.write(answer)
+                total = ttft = time.perf_counter() - t0
+            st.caption(f"first token {ttft:.2f}s · total {total:.2f}s")
+            backend.answer_cache.store(query_vector, docs, answer, history_before)
+        else:
+            history.add_user_message(query)
+            history.add_ai_message(answer)
+            st.write(answer)
+            st.caption("answer cache hit")
+
+    # Keep the final text for re-rendering on the next rerun
     st.session_state.messages.append(
         {"role": "assistant", "content": answer}
     )
-    with st.chat_message("assistant"):
-        st.write(answer)
+
+stats = backend.answer_cache.stats()
+st.sidebar.caption(
+    f"Answer cache: {stats['hits']} hits / {stats['misses']} misses "
+    f"({stats['hit_rate']:.0%}; first turn {stats['first_turn_hit_rate']:.0%}, "
+    f"follow-ups {stats['follow_up_hit_rate']:.0%})"
+)
+if st.session_state.prompt_tokens:
+    st.sidebar.caption("Prompt tokens per turn (estimated)")
+    st.sidebar.line_chart(st.session_state.prompt_tokens)
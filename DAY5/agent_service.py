@@ -0,0 +1,160 @@
+"""
+============================================================
+  Warm agent service: compile once, answer many queries
+============================================================
+  usecase_example.run_query() and run_with_streaming() called
+  create_agent() for every query, rebuilding and recompiling the
+  StateGraph each time, and its agent node used to build a new
+  ChatGroq + bind_tools on every step. interactive_mode() and
+  quick_test() paid for all of it again on every question.
+
+  AgentService does the setup once:
+
+      service = AgentService(create_agent, make_state, warm=...)
+      service.ask("What's 15 * 234?")             -> final state
+      service.stream("Weather in Tokyo?")         -> step states
+      service.ask_many([...], max_concurrency=4)  -> final states, in order
+
+  One compiled app serves every call; a compiled LangGraph graph
+  keeps no per-run state, so concurrent calls are safe. `warm` runs
+  once at start-up, e.g. to create the shared tool-bound client
+  (llm_registry) before the first query instead of during it.
+
+  BENCHMARK (per-query overhead, stub LLM, no API key needed):
+      python agent_service.py
+============================================================
+"""
+
+import os
+import time
+from typing import Callable
+
+
+# ============================================================
+# 1. SERVICE
+# ============================================================
+
+class AgentService:
+
+    def __init__(self, build_graph: Callable, make_state: Callable[[str], dict],
+                 warm: Callable = None):
+        t0 = time.perf_counter()
+        self.app = build_graph()
+        self.make_state = make_state
+        if warm is not None:
+            warm()
+        self.startup_s = time.perf_counter() - t0
+        self.queries = 0
+
+    def ask(self, query: str, config: dict = None) -> dict:
+        """Final state of the graph for `query`."""
+        self.queries += 1
+        return self.app.invoke(self.make_state(query), config)
+
+    def stream(self, query: str, stream_mode: str = "values", config: dict = None):
+        self.queries += 1
+        yield from self.app.stream(self.make_state(query), config, stream_mode=stream_mode)
+
+    def ask_many(self, queries: list, max_concurrency: int = 4) -> list:
+        """Final states in the order of `queries`; a failed query gives its exception."""
+        self.queries += len(queries)
+        return self.app.batch([self.make_state(q) for q in queries],
+                              {"max_concurrency": max_concurrency}, return_exceptions=True)
+
+
+# ============================================================
+# 2. BENCHMARK
+# ============================================================
+
+def benchmark(queries: int = 50, latency_s: float = 0.05):
+    """
+    The graph of usecase_example (agent -> tool -> agent -> END) with a
+    stub model, so only the per-query overhead differs between runs.
+    """
+    import operator
+    from typing import TypedDict, Annotated, List
+    from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+    from langchain_core.tools import tool
+    from langchain_groq import ChatGroq
+    from langgraph.graph import StateGraph, END
+    from llm_registry import get_chat_model
+
+    os.environ.setdefault("GROQ_API_KEY", "gsk_benchmark_dummy")
+    model = "mixtral-8x7b-32768"
+
+    @tool
+    def calculator(expression: str) -> str:
+        """Perform mathematical calculations."""
+        return str(eval(expression, {"__builtins__": {}}, {}))
+
+    tools = [calculator]
+
+    def stub_reply(messages, delay):
+        """What the LLM would answer: one tool call, then the result."""
+        if delay:
+            time.sleep(delay)
+        if messages[-1].type == "tool":
+            return AIMessage(content=f"The answer is {messages[-1].content}.")
+        return AIMessage(content="", tool_calls=[
+            {"name": "calculator", "args": {"expression": "15 * 234"}, "id": "call_1", "type": "tool_call"}])
+
+    class State(TypedDict):
+        messages: Annotated[List, operator.add]
+
+    def build(per_step_client: bool, delay: float = 0.0):
+        def agent(state):
+            if per_step_client:
+                ChatGroq(model=model, temperature=0).bind_tools(tools)     # what every step used to do
+            else:
+                get_chat_model(model, tools=tools, temperature=0)
+            return {"messages": [stub_reply(state["messages"], delay)]}
+
+        def run_tools(state):
+            call = state["messages"][-1].tool_calls[0]
+            return {"messages": [ToolMessage(content=calculator.invoke(call["args"]), tool_call_id=call["id"])]}
+
+        graph = StateGraph(State)
+        graph.add_node("agent", agent)
+        graph.add_node("tools", run_tools)
+        graph.set_entry_point("agent")
+        graph.add_conditional_edges("agent", lambda s: "tools" if s["messages"][-1].tool_calls else END)
+        graph.add_edge("tools", "agent")
+        return graph.compile()
+
+    def make_state(q):
+        return {"messages": [HumanMessage(content=q)]}
+
+    t0 = time.perf_counter()
+    for i in range(queries):
+        app = build(per_step_client=True)                   # create_agent() per query
+        app.invoke(make_state(f"query {i}"))
+    before = (time.perf_counter() - t0) / queries
+
+    service = AgentService(lambda: build(per_step_client=False), make_state,
+                           warm=lambda: get_chat_model(model, tools=tools, temperature=0))
+    t0 = time.perf_counter()
+    for i in range(queries):
+        service.ask(f"query {i}")
+    after = (time.perf_counter() - t0) / queries
+
+    print(f"per query, compile + new client per step : {1000 * before:7.2f} ms")
+    print(f"per query, warm AgentService             : {1000 * after:7.2f} ms"
+          f"   (one-time start-up {1000 * service.startup_s:.1f} ms)")
+
+    # With a model that takes latency_s per call, concurrent queries share the app.
+    slow = AgentService(lambda: build(per_step_client=False, delay=latency_s), make_state)
+    batch = [f"query {i}" for i in range(16)]
+    t0 = time.perf_counter()
+    for q in batch:
+        slow.ask(q)
+    sequential = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    results = slow.ask_many(batch, max_concurrency=8)
+    concurrent = time.perf_counter() - t0
+    assert all(r["messages"][-1].content == "The answer is 3510." for r in results)
+    print(f"{len(batch)} queries, {1000 * latency_s:.0f} ms per LLM call: "
+          f"one by one {sequential:.2f} s, ask_many(8) {concurrent:.2f} s")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,234 @@
+"""
+============================================================
+  Crash-safe checkpoints + per-node retries for agent graphs
+============================================================
+  A ReAct run or the p8 review loop that died halfway (network
+  error, Ctrl-C, restart) had to start over and pay for every LLM
+  and tool call again. Compiled with
+
+      graph.compile(checkpointer=sqlite_checkpointer())
+
+  LangGraph writes the state to a local SQLite file after every
+  node, keyed by the thread_id in the call's config. run_resumable()
+  then picks up where a thread stopped:
+
+      no checkpoint yet        -> start it with the given state
+      stopped before the end   -> continue from the last finished node
+                                  (earlier LLM / tool calls are not redone)
+      already finished         -> return the saved final state
+
+  Checkpoints are written before the next node starts
+  (durability="sync"), so a crash costs at most the node that was
+  running.
+
+  Retry budget: add_node(..., retry_policy=retry_policy(n)) retries a
+  failing node up to n attempts in total, with exponential backoff,
+  on transient errors only (connection errors, timeouts, 429, 5xx).
+  Bad requests and bugs fail at once.
+
+  DEMO (crash halfway, resume, no API key needed):
+      python checkpointing.py
+============================================================
+"""
+
+import os
+import asyncio
+import sqlite3
+import threading
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.types import RetryPolicy, default_retry_on
+
+
+# ============================================================
+# 1. CONFIGURATION
+# ============================================================
+
+CHECKPOINT_DB = os.environ.get("AGENT_CHECKPOINT_DB", ".agent_checkpoints.sqlite")
+MAX_ATTEMPTS = 3              # per node, first try included
+RETRY_STATUS = {408, 409, 429}
+
+
+# ============================================================
+# 2. CHECKPOINTER
+# ============================================================
+
+class LocalSqliteSaver(SqliteSaver):
+    """
+    SqliteSaver that also works under ainvoke() (batch runs): the async
+    methods run the sync ones on a thread. SqliteSaver serializes access
+    to the connection with its own lock.
+
+    The file is opened on first use, not when a graph is compiled, so
+    importing a script that compiles one creates no database.
+    """
+
+    def __init__(self, path: str, **kwargs):
+        self.path = path
+        self._conn = None
+        self._conn_lock = threading.Lock()
+        super().__init__(None, **kwargs)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        with self._conn_lock:
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            return self._conn
+
+    @conn.setter
+    def conn(self, value):
+        self._conn = value
+
+    async def aget_tuple(self, config):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        for item in await asyncio.to_thread(
+                lambda: list(self.list(config, filter=filter, before=before, limit=limit))):
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id):
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+_savers = {}
+_savers_lock = threading.Lock()
+
+
+def sqlite_checkpointer(path: str = CHECKPOINT_DB) -> LocalSqliteSaver:
+    """One saver (and SQLite connection) per file, shared by every graph using it."""
+    with _savers_lock:
+        if path not in _savers:
+            _savers[path] = LocalSqliteSaver(path)
+        return _savers[path]
+
+
+# ============================================================
+# 3. RETRY BUDGET
+# ============================================================
+
+def transient_error(exc: Exception) -> bool:
+    """Worth retrying: provider hiccups, not our own mistakes."""
+    status = getattr(exc, "status_code", None)    # groq / openai APIStatusError
+    if status is not None:
+        return status in RETRY_STATUS or status >= 500
+    if isinstance(exc, TimeoutError):
+        return True
+    return default_retry_on(exc)
+
+
+def retry_policy(max_attempts: int = MAX_ATTEMPTS) -> RetryPolicy:
+    return RetryPolicy(max_attempts=max_attempts, initial_interval=1.0,
+                       backoff_factor=2.0, max_interval=30.0, retry_on=transient_error)
+
+
+# ============================================================
+# 4. RESUMABLE RUNS
+# ============================================================
+
+def thread_config(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def run_resumable(app, state: dict, thread_id: str) -> dict:
+    """
+    Final state of thread `thread_id`, running only what is still missing.
+    `state` may be None to resume a thread that must already exist.
+    """
+    config = thread_config(thread_id)
+    saved = app.get_state(config)
+    if not saved.values:
+        if state is None:
+            raise ValueError(f"no checkpoint for thread {thread_id!r}")
+        return app.invoke(state, config, durability="sync")
+    if saved.next:
+        return app.invoke(None, config, durability="sync")   # None = resume
+    return saved.values
+
+
+async def arun_resumable(app, state: dict, thread_id: str) -> dict:
+    """run_resumable() for ainvoke()."""
+    config = thread_config(thread_id)
+    saved = await app.aget_state(config)
+    if not saved.values:
+        if state is None:
+            raise ValueError(f"no checkpoint for thread {thread_id!r}")
+        return await app.ainvoke(state, config, durability="sync")
+    if saved.next:
+        return await app.ainvoke(None, config, durability="sync")
+    return saved.values
+
+
+# ============================================================
+# 5. DEMO — a 3-node pipeline that crashes in the middle
+# ============================================================
+
+if __name__ == "__main__":
+    import tempfile
+    from typing import TypedDict
+    from langgraph.graph import StateGraph, START, END
+
+    calls = {"research": 0, "write": 0, "review": 0}
+    crash = {"write": True}
+
+    class State(TypedDict):
+        question: str
+        notes: str
+        draft: str
+        review: str
+
+    def research(state):
+        calls["research"] += 1
+        return {"notes": f"notes on {state['question']}"}
+
+    def write(state):
+        calls["write"] += 1
+        if crash["write"]:
+            raise KeyboardInterrupt("process killed while writing")
+        return {"draft": f"draft from {state['notes']}"}
+
+    flaky = {"left": 2}
+
+    def review(state):
+        calls["review"] += 1
+        if flaky["left"]:
+            flaky["left"] -= 1
+            raise ConnectionError("connection reset by peer")
+        return {"review": f"approved: {state['draft']}"}
+
+    def build(path):
+        graph = StateGraph(State)
+        graph.add_node("research", research, retry_policy=retry_policy())
+        graph.add_node("write", write, retry_policy=retry_policy())
+        graph.add_node("review", review, retry_policy=RetryPolicy(
+            max_attempts=3, initial_interval=0.05, retry_on=transient_error))
+        graph.add_edge(START, "research")
+        graph.add_edge("research", "write")
+        graph.add_edge("write", "review")
+        graph.add_edge("review", END)
+        return graph.compile(checkpointer=sqlite_checkpointer(path))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "checkpoints.sqlite")
+        start = {"question": "What is LangGraph?", "notes": "", "draft": "", "review": ""}
+        try:
+            run_resumable(build(path), start, "demo-1")
+        except KeyboardInterrupt as e:
+            print(f"run 1 crashed: {e}    calls so far {calls}")
+
+        _savers.clear()                       # as if the process had restarted
+        crash["write"] = False
+        final = run_resumable(build(path), start, "demo-1")
+        print(f"run 2 resumed: {final['review']!r}")
+        print(f"               calls {calls}  (research ran once; review retried twice)")
+
+        run_resumable(build(path), start, "demo-1")
+        print(f"run 3 (done) : calls {calls}  (nothing re-run)")
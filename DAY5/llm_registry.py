@@ -0,0 +1,313 @@
+"""
+============================================================
+  Shared, connection-pooled LLM clients for every agent script
+============================================================
+  p6-p9, the ReAct agent, the FastAPI app and the RAG backend
+  each built their own ChatGroq, and usecase_example.run_agent
+  built a new one (plus bind_tools) on every agent step. Each new
+  client has its own HTTP connection pool, so every step also paid
+  a fresh TCP + TLS handshake to the Groq API.
+
+  get_chat_model() hands out one long-lived client per
+
+      (provider, model, params)
+
+  and every client of a provider shares one keep-alive httpx pool
+  for invoke(). ainvoke() connections belong to the event loop that
+  opened them, so async calls get one pool per running loop (created
+  on first use, dropped once that loop has closed).
+  Passing tools= returns a cached bind_tools() variant of it.
+
+      from llm_registry import get_chat_model
+      llm = get_chat_model("llama-3.1-8b-instant", temperature=0)
+      llm_with_tools = get_chat_model("llama-3.1-8b-instant", tools=tools, temperature=0)
+
+  stats() reports client/binding cache hits and how many HTTP
+  requests reused an open connection instead of opening one.
+
+  BENCHMARK (client construction per step vs registry, offline):
+      python llm_registry.py
+  BENCHMARK (connection reuse over real calls):
+      python llm_registry.py --live 5
+============================================================
+"""
+
+import os
+import sys
+import time
+import asyncio
+import weakref
+import threading
+
+import httpx
+
+
+# ============================================================
+# 1. CONFIGURATION
+# ============================================================
+
+MAX_CONNECTIONS = 20          # per provider, shared by every model/params
+KEEPALIVE_EXPIRY_S = 120      # idle connections are kept this long
+
+
+# ============================================================
+# 2. CONNECTION POOLS (one per provider) + REUSE COUNTERS
+# ============================================================
+
+class _PoolStats:
+    """Counts requests and the connections/TLS handshakes they caused."""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+        self._lock = threading.Lock()
+
+    def _trace(self, event: str, info: dict):
+        if event == "connection.connect_tcp.complete":
+            with self._lock:
+                self.connections_opened += 1
+        elif event == "connection.start_tls.complete":
+            with self._lock:
+                self.tls_handshakes += 1
+
+    def on_request(self, request: httpx.Request):
+        with self._lock:
+            self.requests += 1
+        # httpcore reports connection events through this extension.
+        request.extensions["trace"] = self._trace
+
+    async def _atrace(self, event: str, info: dict):
+        self._trace(event, info)
+
+    async def on_arequest(self, request: httpx.Request):
+        """on_request() for the async pool: httpx awaits its hooks there."""
+        with self._lock:
+            self.requests += 1
+        request.extensions["trace"] = self._atrace
+
+    def as_dict(self) -> dict:
+        reused = max(self.requests - self.connections_opened, 0)
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "tls_handshakes": self.tls_handshakes,
+            "connection_reuse": round(reused / self.requests, 3) if self.requests else 0.0,
+        }
+
+
+_http_clients = {}            # provider -> httpx.Client
+_http_async_clients = {}      # provider -> _PerLoopAsyncClient
+_pool_stats = {}              # provider -> _PoolStats, counts both pools
+
+
+def _pool_settings() -> dict:
+    return {
+        "limits": httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY_S,
+        ),
+        "timeout": httpx.Timeout(60.0, connect=10.0),
+    }
+
+
+def _stats_for(provider: str) -> _PoolStats:
+    if provider not in _pool_stats:
+        _pool_stats[provider] = _PoolStats()
+    return _pool_stats[provider]
+
+
+def _http_client(provider: str) -> httpx.Client:
+    if provider not in _http_clients:
+        _http_clients[provider] = httpx.Client(
+            event_hooks={"request": [_stats_for(provider).on_request]}, **_pool_settings())
+    return _http_clients[provider]
+
+
+class _PerLoopAsyncClient(httpx.AsyncClient):
+    """
+    The AsyncClient handed to the chat models. Every request is sent
+    through the pool of the event loop it runs on: reusing a keep-alive
+    connection from another (possibly closed) loop fails with "Event
+    loop is closed".
+    """
+
+    def __init__(self, stats: _PoolStats):
+        super().__init__(**_pool_settings())
+        self._stats = stats
+        self._pools = weakref.WeakKeyDictionary()   # event loop -> httpx.AsyncClient
+        self._pools_lock = threading.Lock()
+
+    def _pool(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._pools_lock:
+            for ended in [l for l in self._pools if l.is_closed()]:
+                del self._pools[ended]              # its sockets ended with it
+            pool = self._pools.get(loop)
+            if pool is None:
+                pool = self._pools[loop] = httpx.AsyncClient(
+                    event_hooks={"request": [self._stats.on_arequest]}, **_pool_settings())
+        return pool
+
+    async def send(self, request, **kwargs):
+        return await self._pool().send(request, **kwargs)
+
+    async def aclose(self):
+        """Close the running loop's pool."""
+        with self._pools_lock:
+            pool = self._pools.pop(asyncio.get_running_loop(), None)
+        if pool is not None:
+            await pool.aclose()
+
+    def pools(self) -> int:
+        with self._pools_lock:
+            return sum(not loop.is_closed() for loop in self._pools)
+
+
+def _http_async_client(provider: str) -> httpx.AsyncClient:
+    if provider not in _http_async_clients:
+        _http_async_clients[provider] = _PerLoopAsyncClient(_stats_for(provider))
+    return _http_async_clients[provider]
+
+
+# ============================================================
+# 3. PROVIDERS
+# ============================================================
+
+def _make_groq(model: str, http_client: httpx.Client,
+               http_async_client: httpx.AsyncClient, **params):
+    from langchain_groq import ChatGroq
+    return ChatGroq(model=model, http_client=http_client,
+                    http_async_client=http_async_client, **params)
+
+
+PROVIDERS = {"groq": _make_groq}
+
+
+# ============================================================
+# 4. REGISTRY
+# ============================================================
+
+_clients = {}                 # (provider, model, params) -> chat model
+_bound = {}                   # (client key, tool ids) -> (tool-bound runnable, tools)
+_lock = threading.Lock()
+_counters = {"client_hits": 0, "client_misses": 0, "binding_hits": 0, "binding_misses": 0}
+
+
+def _freeze(value):
+    """Hashable form of a params value (dicts / lists become tuples)."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def get_chat_model(model: str, provider: str = "groq", tools=None, **params):
+    """
+    The shared chat model for (provider, model, params); with `tools`,
+    its cached bind_tools(tools) variant. Safe to call on every step.
+    """
+    key = (provider, model, _freeze(params))
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            _counters["client_misses"] += 1
+            client = _clients[key] = PROVIDERS[provider](
+                model, _http_client(provider), _http_async_client(provider), **params)
+        else:
+            _counters["client_hits"] += 1
+        if tools is None:
+            return client
+
+        # Keyed by tool identity; the entry holds the tools, so their ids stay unique.
+        bound_key = (key, tuple(id(t) for t in tools))
+        entry = _bound.get(bound_key)
+        if entry is None:
+            _counters["binding_misses"] += 1
+            entry = _bound[bound_key] = (client.bind_tools(list(tools)), list(tools))
+        else:
+            _counters["binding_hits"] += 1
+        return entry[0]
+
+
+def stats() -> dict:
+    with _lock:
+        return {
+            "clients": len(_clients),
+            "tool_bindings": len(_bound),
+            **_counters,
+            "pools": {provider: s.as_dict() for provider, s in _pool_stats.items()},
+        }
+
+
+def close():
+    """Close every pooled connection (e.g. on app shutdown)."""
+    with _lock:
+        for client in _http_clients.values():
+            client.close()
+        # Async pools can only be closed from their own loop (aclose());
+        # those of loops that have ended need nothing more.
+        _http_clients.clear()
+        _http_async_clients.clear()
+        _pool_stats.clear()
+        _clients.clear()
+        _bound.clear()
+
+
+async def aclose():
+    """close() from a running event loop, closing that loop's async pools too."""
+    with _lock:
+        clients = list(_http_async_clients.values())
+    for client in clients:
+        await client.aclose()
+    close()
+
+
+# ============================================================
+# 5. BENCHMARK
+# ============================================================
+
+def benchmark(steps: int = 200, model: str = "llama-3.1-8b-instant"):
+    """What run_agent used to pay per step, vs a registry lookup. No network."""
+    from langchain_core.tools import tool
+    from langchain_groq import ChatGroq
+
+    os.environ.setdefault("GROQ_API_KEY", "gsk_benchmark_dummy")
+
+    @tool
+    def add(a: int, b: int) -> int:
+        """Add two integers."""
+        return a + b
+
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        ChatGroq(model=model, temperature=0).bind_tools([add])
+    per_step = (time.perf_counter() - t0) / steps
+
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        get_chat_model(model, tools=[add], temperature=0)
+    registry = (time.perf_counter() - t0) / steps
+
+    print(f"new client + bind_tools per step : {1000 * per_step:8.3f} ms  (+ a TCP/TLS handshake per client)")
+    print(f"registry lookup per step         : {1000 * registry:8.3f} ms")
+    print(stats())
+
+
+def live_benchmark(calls: int, model: str = "llama-3.1-8b-instant"):
+    """Real Groq calls through one pooled client; needs GROQ_API_KEY."""
+    llm = get_chat_model(model, temperature=0, max_tokens=5)
+    for i in range(calls):
+        t0 = time.perf_counter()
+        llm.invoke("Reply with OK.")
+        print(f"call {i + 1}: {time.perf_counter() - t0:.3f}s")
+    print(stats())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--live":
+        live_benchmark(int(sys.argv[2]))
+    else:
+        benchmark()
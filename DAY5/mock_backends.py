@@ -0,0 +1,230 @@
+"""
+============================================================
+  Indexed backends for the canned web_search / weather tools
+============================================================
+  usecase_example's mock tools scanned every canned entry on every
+  call: web_search ran all(word in query ...) for each key and
+  weather_forecast tested each city as a substring. With load-test
+  fixtures of thousands of entries that is O(entries x words) per
+  call.
+
+      SearchIndex   inverted word index. Each entry is filed under its
+                    rarest word only, so a query looks at the entries
+                    filed under its own words and checks just those.
+      CityMatcher   Aho-Corasick automaton over every city name: one
+                    pass over the input finds all cities it contains.
+
+  Both return the same entry the linear scan did: the first one, in
+  fixture order, that matches. Search keys now match whole query
+  words ("paris" matches "Paris?", not "comparison").
+
+  Fixtures are JSON  {"search": {key: result}, "weather": {city: forecast}}
+  or CSV with the columns  kind,key,value  (kind = search | weather).
+
+  BENCHMARK (linear scan vs index, 10 -> 10 000 entries):
+      python mock_backends.py
+============================================================
+"""
+
+import re
+import csv
+import json
+import time
+import random
+from collections import deque
+
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def words_of(text: str) -> list:
+    return _WORD_RE.findall(text.lower())
+
+
+# ============================================================
+# 1. SEARCH — inverted word index
+# ============================================================
+
+class SearchIndex:
+    """key -> result lookup where a key matches if all its words are in the query."""
+
+    def __init__(self, entries: dict):
+        self.results = list(entries.values())
+        self.key_words = [frozenset(words_of(key)) for key in entries]
+        df = {}
+        for words in self.key_words:
+            for w in words:
+                df[w] = df.get(w, 0) + 1
+        # Every entry is filed under its rarest word: a query that matches
+        # the entry contains that word too, and short lists stay short.
+        self.postings = {}
+        for i, words in enumerate(self.key_words):
+            if words:
+                anchor = min(words, key=lambda w: (df[w], w))
+                self.postings.setdefault(anchor, []).append(i)
+
+    def lookup(self, query: str):
+        """Result of the first entry whose words all occur in `query`, or None."""
+        query_words = set(words_of(query))
+        best = None
+        for w in query_words:
+            for i in self.postings.get(w, ()):
+                if best is not None and i >= best:
+                    break                             # postings are in fixture order
+                if self.key_words[i] <= query_words:
+                    best = i
+                    break
+        return None if best is None else self.results[best]
+
+
+# ============================================================
+# 2. CITIES — Aho-Corasick automaton
+# ============================================================
+
+class CityMatcher:
+    """Finds which known city names occur in a string, in one pass over it."""
+
+    def __init__(self, entries: dict):
+        self.values = list(entries.values())
+        self.goto = [{}]           # state -> {char: next state}
+        self.fail = [0]
+        self.out = [None]          # state -> lowest entry index ending here (incl. via fail links)
+        for i, city in enumerate(entries):
+            state = 0
+            for ch in city.lower():
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(None)
+                state = nxt
+            if self.out[state] is None:               # keep the first of duplicate names
+                self.out[state] = i
+
+        queue = deque(self.goto[0].values())
+        while queue:                                  # breadth-first: fail links point up
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                inherited = self.out[self.fail[nxt]]
+                if inherited is not None and (self.out[nxt] is None or inherited < self.out[nxt]):
+                    self.out[nxt] = inherited
+
+    def lookup(self, text: str):
+        """Value of the first city (in fixture order) contained in `text`, or None."""
+        state, best = 0, None
+        for ch in text.lower():
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            found = self.out[state]
+            if found is not None and (best is None or found < best):
+                best = found
+                if best == 0:
+                    break
+        return None if best is None else self.values[best]
+
+
+# ============================================================
+# 3. FIXTURES
+# ============================================================
+
+def load_fixture(path: str) -> tuple:
+    """(search entries, weather entries) from a .json or .csv fixture, in file order."""
+    if path.lower().endswith(".csv"):
+        search, weather = {}, {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                target = search if row["kind"].strip() == "search" else weather
+                target.setdefault(row["key"].strip().lower(), row["value"])
+        return search, weather
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return ({k.lower(): v for k, v in data.get("search", {}).items()},
+            {k.lower(): v for k, v in data.get("weather", {}).items()})
+
+
+def save_fixture(path: str, search: dict, weather: dict):
+    if path.lower().endswith(".csv"):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["kind", "key", "value"])
+            writer.writerows(["search", k, v] for k, v in search.items())
+            writer.writerows(["weather", k, v] for k, v in weather.items())
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"search": search, "weather": weather}, f, indent=1)
+
+
+# ============================================================
+# 4. BENCHMARK
+# ============================================================
+
+def _linear_search(entries: dict, query: str):
+    """The old web_search loop."""
+    query_lower = query.lower()
+    for key, result in entries.items():
+        if all(word in query_lower for word in key.split()):
+            return result
+    return None
+
+
+def _linear_city(entries: dict, city: str):
+    """The old weather_forecast loop."""
+    for key, forecast in entries.items():
+        if key in city.lower():
+            return forecast
+    return None
+
+
+def synthetic_fixture(n: int, seed: int = 0) -> tuple:
+    rng = random.Random(seed)
+    vocab = [f"w{i}x" for i in range(max(50, n // 2))] + ["weather", "hotels", "april", "activities"]
+    search, weather = {}, {}
+    while len(search) < n:
+        search[" ".join(rng.sample(vocab, 3))] = f"result {len(search)}"
+    while len(weather) < n:
+        weather[f"city{len(weather)}ville"] = f"forecast {len(weather)}"
+    return search, weather
+
+
+def benchmark(sizes=(10, 100, 1_000, 10_000), calls: int = 2_000):
+    import os
+    import tempfile
+
+    print(f"{'entries':>8} {'search scan':>12} {'index':>8} {'city scan':>10} {'automaton':>10}   (us per call)")
+    for n in sizes:
+        search, weather = synthetic_fixture(n)
+        rng = random.Random(1)
+        keys, cities = list(search), list(weather)
+        # Half the queries hit an entry somewhere in the fixture, half miss.
+        queries = [f"tell me about {rng.choice(keys)} please" if i % 2 else "nothing relevant here"
+                   for i in range(calls)]
+        places = [f"weather in {rng.choice(cities).title()} today" if i % 2 else "Atlantis"
+                  for i in range(calls)]
+
+        with tempfile.TemporaryDirectory() as tmp:    # go through both fixture formats
+            save_fixture(os.path.join(tmp, "f.json"), search, weather)
+            save_fixture(os.path.join(tmp, "f.csv"), search, weather)
+            assert load_fixture(os.path.join(tmp, "f.json")) == load_fixture(os.path.join(tmp, "f.csv"))
+        index, matcher = SearchIndex(search), CityMatcher(weather)
+
+        timings = []
+        for fn, inputs in ((lambda q: _linear_search(search, q), queries), (index.lookup, queries),
+                           (lambda c: _linear_city(weather, c), places), (matcher.lookup, places)):
+            t0 = time.perf_counter()
+            out = [fn(x) for x in inputs]
+            timings.append((time.perf_counter() - t0) / calls * 1e6)
+            timings.append(out)
+        assert timings[1] == timings[3] and timings[5] == timings[7]   # same answers
+        print(f"{n:>8} {timings[0]:>12.1f} {timings[2]:>8.1f} {timings[4]:>10.1f} {timings[6]:>10.1f}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -10,7 +10,8 @@ Writes final response using research notes
 '''
 from typing import TypedDict
 from langgraph.graph import StateGraph, END
-from langchain_groq import ChatGroq
+from llm_registry import get_chat_model
+from tracing import traced
 from langchain_community.tools import DuckDuckGoSearchRun
 
 # -----------------------
@@ -24,7 +25,7 @@ class State(TypedDict):
 # -----------------------
 # LLM + Tool
 # -----------------------
-llm = ChatGroq(model="llama-3.1-8b-instant", temperature=0)
+llm = get_chat_model("llama-3.1-8b-instant", temperature=0)   # shared, pooled client
 search = DuckDuckGoSearchRun()
 
 # -----------------------
@@ -78,7 +79,7 @@ graph.set_entry_point("researcher")
 graph.add_edge("researcher", "writer")
 graph.add_edge("writer", END)
 
-app = graph.compile()
+app = traced(graph.compile())     # AGENT_TRACE=spans.jsonl to record spans
 
 # -----------------------
 # Run
@@ -11,7 +11,8 @@ checks correctness + improves
 '''
 from typing import TypedDict
 from langgraph.graph import StateGraph, END
-from langchain_groq import ChatGroq
+from llm_registry import get_chat_model
+from tracing import traced
 from langchain_community.tools import DuckDuckGoSearchRun
 
 # -----------------------
@@ -26,7 +27,7 @@ class State(TypedDict):
 # -----------------------
 # LLM + Tool
 # -----------------------
-llm = ChatGroq(model="llama-3.1-8b-instant", temperature=0)
+llm = get_chat_model("llama-3.1-8b-instant", temperature=0)   # shared, pooled client
 search = DuckDuckGoSearchRun()
 
 # -----------------------
@@ -101,7 +102,7 @@ graph.add_edge("researcher", "writer")
 graph.add_edge("writer", "reviewer")
 graph.add_edge("reviewer", END)
 
-app = graph.compile()
+app = traced(graph.compile())     # AGENT_TRACE=spans.jsonl to record spans
 
 # -----------------------
 # Run
@@ -9,9 +9,13 @@ Stops when quality is good OR max iterations reached
 
 This is the true Agentic AI loop (not just a linear pipeline).
 '''
+import sys
+import uuid
 from typing import TypedDict
 from langgraph.graph import StateGraph, END
-from langchain_groq import ChatGroq
+from llm_registry import get_chat_model
+from tracing import traced
+from checkpointing import sqlite_checkpointer, retry_policy, run_resumable
 from langchain_community.tools import DuckDuckGoSearchRun
 
 
@@ -31,7 +35,7 @@ class State(TypedDict):
 # -----------------------
 # 2) LLM + Tool
 # -----------------------
-llm = ChatGroq(model="llama-3.1-8b-instant", temperature=0)
+llm = get_chat_model("llama-3.1-8b-instant", temperature=0)   # shared, pooled client
 search = DuckDuckGoSearchRun()
 
 
@@ -163,9 +167,10 @@ def should_continue(state: State):
 # -----------------------
 graph = StateGraph(State)
 
-graph.add_node("researcher", researcher_agent)
-graph.add_node("writer", writer_agent)
-graph.add_node("reviewer", reviewer_agent)
+# Each node gets up to 3 attempts on network / rate-limit errors
+graph.add_node("researcher", researcher_agent, retry_policy=retry_policy())
+graph.add_node("writer", writer_agent, retry_policy=retry_policy())
+graph.add_node("reviewer", reviewer_agent, retry_policy=retry_policy())
 
 graph.set_entry_point("researcher")
 
@@ -183,7 +188,8 @@ graph.add_conditional_edges(
     }
 )
 
-app = graph.compile()
+# State is saved to SQLite after every node, so an interrupted run can resume
+app = traced(graph.compile(checkpointer=sqlite_checkpointer()))     # AGENT_TRACE=spans.jsonl to record spans
 
 
 # -----------------------
@@ -202,7 +208,14 @@ if __name__ == "__main__":
         "iteration": 0
     }
 
-    output = app.invoke(initial_state)
+    # python p8.py --resume <thread id>  continues an interrupted run
+    if "--resume" in sys.argv:
+        thread_id = sys.argv[sys.argv.index("--resume") + 1]
+    else:
+        thread_id = f"p8-{uuid.uuid4().hex[:12]}"
+    print("Thread:", thread_id)
+
+    output = run_resumable(app, initial_state, thread_id)
 
     print("\n==============================")
     print("FINAL OUTPUT")
@@ -1,7 +1,8 @@
 # chain_based_agentic_langgraph
 from typing import TypedDict, List
 from langgraph.graph import StateGraph, END
-from langchain_groq import ChatGroq
+from llm_registry import get_chat_model
+from tracing import traced
 from langchain_community.tools import DuckDuckGoSearchRun
 
 
@@ -19,7 +20,7 @@ class ChainState(TypedDict):
 # ----------------------------
 # 2) LLM + Tool
 # ----------------------------
-llm = ChatGroq(model="llama-3.1-8b-instant", temperature=0)
+llm = get_chat_model("llama-3.1-8b-instant", temperature=0)   # shared, pooled client
 search = DuckDuckGoSearchRun()
 
 
@@ -101,7 +102,7 @@ graph.add_edge("research", "writer")
 graph.add_edge("writer", "formatter")
 graph.add_edge("formatter", END)
 
-app = graph.compile()
+app = traced(graph.compile())     # AGENT_TRACE=spans.jsonl to record spans
 
 
 # ----------------------------
@@ -0,0 +1,174 @@
+"""
+============================================================
+  Approximate-nearest-neighbour index types for large corpora
+============================================================
+  FAISS.from_documents always builds IndexFlatL2: exact, but query
+  time and memory grow linearly with the number of chunks. For
+  big corpora the ingestion can instead write one of:
+
+      ivf_flat  inverted lists over k-means cells   (tune: nprobe)
+      hnsw      navigable small-world graph          (tune: efSearch)
+      ivf_pq    inverted lists + product quantization (tune: nprobe)
+
+  IVF types are trained on a random sample of the vectors. The
+  exact flat index is still what ingestion and incremental
+  updates work on; the ANN index is derived from it at save time
+  (FAISS cannot delete from HNSW, and IVF deletes don't renumber
+  rows the way the LangChain wrapper expects).
+
+  BENCHMARK (recall@10 vs latency vs memory, against flat):
+      python rag_ann.py corpus_index
+      python rag_ann.py --synthetic 200000
+============================================================
+"""
+
+import sys
+import time
+import json
+import math
+
+import numpy as np
+import faiss
+
+
+# ============================================================
+# 1. CONFIGURATION
+# ============================================================
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+
+DEFAULT_PARAMS = {
+    "nlist": None,          # IVF cells; None -> ~4 * sqrt(n)
+    "nprobe": 8,            # IVF cells visited per query
+    "hnsw_m": 32,           # HNSW graph degree
+    "ef_construction": 80,
+    "ef_search": 64,        # HNSW candidate list per query
+    "pq_m": 48,             # PQ sub-quantizers (must divide the dimension)
+    "pq_nbits": 8,
+    "train_sample": 50000,  # max vectors used to train IVF/PQ
+}
+
+MIN_TRAIN_PER_CELL = 39     # FAISS warns below this many points per centroid
+
+
+def resolve_params(index_type: str, n: int, params: dict = None) -> dict:
+    """Defaults + overrides, with nlist sized to the corpus."""
+    p = dict(DEFAULT_PARAMS, **(params or {}))
+    if index_type in ("ivf_flat", "ivf_pq"):
+        if p["nlist"] is None:
+            p["nlist"] = int(4 * math.sqrt(n))
+        p["nlist"] = max(1, min(p["nlist"], n // MIN_TRAIN_PER_CELL))
+        p["nprobe"] = min(p["nprobe"], p["nlist"])
+    return p
+
+
+# ============================================================
+# 2. BUILD / TUNE
+# ============================================================
+
+def build_index(vectors: np.ndarray, index_type: str, params: dict = None):
+    """Return (faiss index with every vector added in order, resolved params)."""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"index_type must be one of {INDEX_TYPES}, got {index_type!r}")
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    p = resolve_params(index_type, n, params)
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, p["hnsw_m"])
+        index.hnsw.efConstruction = p["ef_construction"]
+    else:
+        quantizer = faiss.IndexFlatL2(dim)
+        if index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, p["nlist"])
+        else:
+            if dim % p["pq_m"]:
+                raise ValueError(f"pq_m={p['pq_m']} must divide the vector dimension {dim}")
+            if n < 2 ** p["pq_nbits"]:
+                raise ValueError(f"ivf_pq needs at least {2 ** p['pq_nbits']} vectors to train, got {n}")
+            index = faiss.IndexIVFPQ(quantizer, dim, p["nlist"], p["pq_m"], p["pq_nbits"])
+        rng = np.random.default_rng(0)
+        sample = vectors[rng.choice(n, size=min(n, p["train_sample"]), replace=False)]
+        index.train(sample)
+
+    index.add(vectors)
+    apply_search_params(index, index_type, p)
+    return index, p
+
+
+def apply_search_params(index, index_type: str, params: dict):
+    """Set nprobe / efSearch on an index (also after loading from disk)."""
+    space = faiss.ParameterSpace()
+    if index_type in ("ivf_flat", "ivf_pq"):
+        space.set_index_parameter(index, "nprobe", params["nprobe"])
+    elif index_type == "hnsw":
+        space.set_index_parameter(index, "efSearch", params["ef_search"])
+
+
+def all_vectors(index) -> np.ndarray:
+    """Every vector of an exact (flat) index, in row order."""
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def index_nbytes(index) -> int:
+    return faiss.serialize_index(index).nbytes
+
+
+# ============================================================
+# 3. BENCHMARK
+# ============================================================
+
+def _recall_at(found: np.ndarray, truth: np.ndarray, k: int) -> float:
+    hits = sum(len(set(f[:k]) & set(t[:k])) for f, t in zip(found, truth))
+    return hits / (len(truth) * k)
+
+
+def benchmark(vectors: np.ndarray, n_queries: int = 200, k: int = 10):
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    rng = np.random.default_rng(1)
+    # Queries: stored vectors plus a little noise, i.e. "near" real chunks.
+    picks = rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False)
+    queries = vectors[picks] + rng.normal(0, 0.01, size=(len(picks), vectors.shape[1])).astype(np.float32)
+
+    flat, _ = build_index(vectors, "flat")
+    _, truth = flat.search(queries, k)
+
+    sweeps = {
+        "flat": [{}],
+        "ivf_flat": [{"nprobe": p} for p in (1, 4, 8, 16, 32)],
+        "hnsw": [{"ef_search": e} for e in (16, 32, 64, 128)],
+        "ivf_pq": [{"nprobe": p} for p in (4, 8, 16, 32)],
+    }
+    print(f"{len(vectors)} vectors, dim {vectors.shape[1]}, {len(queries)} queries, k={k}\n")
+    print(f"{'index':<9} {'setting':<14} {'recall@10':>9} {'ms/query':>9} {'MB':>8} {'build s':>8}")
+    for index_type, settings in sweeps.items():
+        try:
+            t0 = time.perf_counter()
+            index, params = build_index(vectors, index_type)
+            build_s = time.perf_counter() - t0
+        except ValueError as e:
+            print(f"{index_type:<9} skipped: {e}")
+            continue
+        mb = index_nbytes(index) / 2 ** 20
+        for setting in settings:
+            apply_search_params(index, index_type, dict(params, **setting))
+            t0 = time.perf_counter()
+            _, found = index.search(queries, k)
+            ms = 1000 * (time.perf_counter() - t0) / len(queries)
+            label = ", ".join(f"{a}={b}" for a, b in setting.items()) or "exact"
+            print(f"{index_type:<9} {label:<14} {_recall_at(found, truth, k):>9.3f} "
+                  f"{ms:>9.3f} {mb:>8.1f} {build_s:>8.2f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--synthetic":
+        rng = np.random.default_rng(0)
+        benchmark(rng.normal(size=(int(sys.argv[2]), 384)).astype(np.float32))
+    else:
+        index_dir = sys.argv[1] if len(sys.argv) > 1 else "corpus_index"
+        with open(f"{index_dir}/meta.json") as f:
+            meta = json.load(f)
+        exact = "flat.faiss" if meta.get("index_type", "flat") != "flat" else "index.faiss"
+        benchmark(all_vectors(faiss.read_index(f"{index_dir}/{exact}")))
@@ -0,0 +1,204 @@
+"""
+============================================================
+  Semantic answer cache for the Strict RAG chatbot
+============================================================
+  Users ask the same thing in different words. Before paying for
+  a Groq round trip we embed the query (local, ~ms), retrieve the
+  context, and look for a cached query that is
+
+      cosine(query, cached_query) >= threshold
+      AND retrieved context is exactly the same chunks
+      AND the chat history the prompt carries is the same
+
+  If all hold, the stored answer is returned. The history check
+  matters because the cache is shared by every session: a follow-up
+  like "and the second one?" means different things in different
+  conversations. Entries are evicted
+  LRU-first beyond `max_entries` and expire after `ttl_s`. Call
+  invalidate() whenever the index is rebuilt.
+
+  LIMIT: because the history is part of the key, a follow-up only
+  hits if another session had the same conversation word for word
+  up to that point. First turns hit the most, and the hit rate drops
+  with every turn after that (the benchmark shows the decay).
+  stats() reports first-turn and follow-up hit rates separately so
+  this stays visible. Keying follow-ups on an LLM-condensed standalone question
+  would lift the follow-up rate, but it costs a Groq call per turn,
+  which is what the cache is there to save.
+
+  BENCHMARK (hit rate per turn on replayed multi-turn sessions, no model):
+      python rag_answer_cache.py
+============================================================
+"""
+
+import sys
+import time
+import random
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+# ============================================================
+# 1. CONFIGURATION
+# ============================================================
+
+DEFAULT_THRESHOLD = 0.95     # cosine similarity; MiniLM paraphrases land ~0.9+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_S = 3600
+
+
+def context_fingerprint(docs, history=()) -> str:
+    """Order-sensitive hash of the retrieved chunks' text and the chat history messages."""
+    h = hashlib.sha256()
+    for doc in docs:
+        h.update(doc.page_content.encode("utf-8"))
+        h.update(b"\0")
+    h.update(b"\1")
+    for message in history:
+        h.update(f"{message.type}:{message.content}".encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+# ============================================================
+# 2. CACHE
+# ============================================================
+
+class SemanticAnswerCache:
+    """Thread-safe: one instance is shared by every chat session."""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl_s: float = DEFAULT_TTL_S):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries = OrderedDict()      # id -> (unit vector, context fp, answer, created)
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.follow_up_hits = 0          # the subset of hits / misses with history
+        self.follow_up_misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        return v / (np.linalg.norm(v) or 1.0)
+
+    def _expire(self, now: float):
+        for key in [k for k, e in self._entries.items() if now - e[3] > self.ttl_s]:
+            del self._entries[key]
+            self.evictions += 1
+
+    def lookup(self, query_vector, docs, history=()):
+        """Return a cached answer for this query + context + history, or None."""
+        fingerprint = context_fingerprint(docs, history)
+        q = self._unit(query_vector)
+        with self._lock:
+            self._expire(time.time())
+            # Only entries with the same retrieved context and history can match.
+            candidates = [(k, e) for k, e in self._entries.items() if e[1] == fingerprint]
+            if candidates:
+                sims = np.stack([e[0] for _, e in candidates]) @ q
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    key, entry = candidates[best]
+                    self._entries.move_to_end(key)       # mark as recently used
+                    self.hits += 1
+                    self.follow_up_hits += bool(history)
+                    return entry[2]
+            self.misses += 1
+            self.follow_up_misses += bool(history)
+            return None
+
+    def store(self, query_vector, docs, answer: str, history=()):
+        with self._lock:
+            self._entries[self._next_id] = (
+                self._unit(query_vector), context_fingerprint(docs, history), answer, time.time()
+            )
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)        # least recently used
+                self.evictions += 1
+
+    def invalidate(self):
+        """Drop everything, e.g. after the index was rebuilt."""
+        with self._lock:
+            self._entries.clear()
+
+    @staticmethod
+    def _rate(hits: int, misses: int) -> float:
+        return hits / (hits + misses) if hits + misses else 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        return self._rate(self.hits, self.misses)
+
+    def stats(self) -> dict:
+        first_hits = self.hits - self.follow_up_hits
+        first_misses = self.misses - self.follow_up_misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hit_rate, 3),
+            "first_turn_hit_rate": round(self._rate(first_hits, first_misses), 3),
+            "follow_up_hit_rate": round(self._rate(self.follow_up_hits, self.follow_up_misses), 3),
+        }
+
+
+# ============================================================
+# 3. BENCHMARK — hit rate by turn on multi-turn sessions
+# ============================================================
+
+def _fake_vector(text: str, dim: int = 64) -> np.ndarray:
+    """Stand-in for the embedding: identical text -> identical vector."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(dim)
+
+
+def benchmark(sessions: int = 500, turns: int = 5, questions_per_turn: int = 8, seed: int = 0):
+    """
+    Replay `sessions` conversations of `turns` turns. Turn t picks one of
+    `questions_per_turn` questions, skewed towards the first few (popular
+    openers, common follow-ups), so conversations overlap the way real
+    traffic does: heavily on turn 1, less and less after.
+    """
+    from langchain_core.documents import Document
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(questions_per_turn)]     # Zipf-like
+    cache = SemanticAnswerCache()
+    per_turn = [[0, 0] for _ in range(turns)]                           # [hits, lookups]
+    for _ in range(sessions):
+        history = []
+        for turn in range(turns):
+            question = f"turn {turn} question {rng.choices(range(questions_per_turn), weights)[0]}"
+            vector = _fake_vector(question)
+            docs = [Document(page_content=f"chunk for {question}")]
+            answer = cache.lookup(vector, docs, history)
+            per_turn[turn][1] += 1
+            if answer is None:
+                answer = f"answer to {question}"
+                cache.store(vector, docs, answer, history)
+            else:
+                per_turn[turn][0] += 1
+            history = history + [HumanMessage(content=question), AIMessage(content=answer)]
+
+    print(f"{sessions} sessions x {turns} turns, {questions_per_turn} candidate questions per turn")
+    for turn, (hits, lookups) in enumerate(per_turn, 1):
+        print(f"  turn {turn}: hit rate {hits / lookups:6.1%}")
+    stats = cache.stats()
+    print(f"  first turn {stats['first_turn_hit_rate']:.1%} | follow-ups {stats['follow_up_hit_rate']:.1%} "
+          f"| overall {stats['hit_rate']:.1%}")
+
+
+if __name__ == "__main__":
+    benchmark(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,266 @@
+"""
+============================================================
+  Process-wide shared RAG backend
+============================================================
+  The embedding model, the FAISS index, the Groq client and the
+  RAG chain are read-only once built, so one copy per
+  process is enough. Every Streamlit session shares it and keeps
+  only its own chat history in st.session_state.
+
+  A semantic answer cache (rag_answer_cache.py) sits in front of
+  the chain and is shared the same way. Retrieved chunks are
+  compressed to a token budget (rag_compress.py) before they go
+  into the prompt.
+
+  BENCHMARK (memory + startup latency, 1 / 10 / 50 sessions):
+      python rag_backend.py
+
+  BENCHMARK (time-to-first-token, blocking vs streaming):
+      python rag_backend.py --latency "What is multi-head attention?"
+============================================================
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+from operator import itemgetter
+
+from langchain_core.prompts import PromptTemplate
+from langchain_core.messages import get_buffer_string
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+
+from rag_store import PDF_PATH, CACHE_DIR, get_embeddings, load_or_build_vectorstore
+from rag_ingest import load_corpus_index
+from rag_answer_cache import SemanticAnswerCache
+from rag_history import estimate_tokens
+from rag_hybrid import HybridRetriever, load_or_build_bm25
+from rag_compress import CONTEXT_TOKEN_BUDGET, compress
+from llm_registry import get_chat_model
+
+
+# ============================================================
+# 1. CONFIGURATION
+# ============================================================
+
+LLM_MODEL = "llama-3.1-8b-instant"
+INDEX_DIR = os.environ.get("RAG_INDEX_DIR")   # corpus index from rag_ingest.py
+RETRIEVER = os.environ.get("RAG_RETRIEVER", "hybrid")   # "hybrid" or "dense"
+
+STRICT_PROMPT = PromptTemplate(
+    input_variables=["context", "question", "history"],
+    template="""
+You are a strict retrieval QA assistant.
+Use only the following context and chat history to answer the question.
+If the answer is not present, reply exactly with:
+"I don't know, the document doesnot contain this information."
+
+Context:
+{context}
+
+Chat history:
+{history}
+
+Question:
+{question}
+
+Answer:
+"""
+)
+
+
+# ============================================================
+# 2. BACKEND
+# ============================================================
+
+def format_docs(docs) -> str:
+    return "\n\n".join(doc.page_content for doc in docs)
+
+
+def build_context(query: str, docs) -> str:
+    """The {context} text for `docs`, compressed to CONTEXT_TOKEN_BUDGET."""
+    if CONTEXT_TOKEN_BUDGET > 0:
+        docs = compress(query, docs, CONTEXT_TOKEN_BUDGET)
+    return format_docs(docs)
+
+
+def prompt_tokens(query: str, docs, history_messages) -> int:
+    """Estimated size of the exact strict prompt this turn will send."""
+    return estimate_tokens(STRICT_PROMPT.format(
+        context=build_context(query, docs),
+        history=get_buffer_string(history_messages),
+        question=query,
+    ))
+
+
+class RAGBackend:
+    """Everything a chat session needs except its own history."""
+
+    def __init__(self, pdf_path: str = PDF_PATH, index_dir: str = INDEX_DIR,
+                 llm=None, embeddings=None):
+        self.pdf_path = pdf_path
+        self.index_dir = index_dir
+        self.embeddings = embeddings or get_embeddings()
+        self.answer_cache = SemanticAnswerCache()
+
+        # One keep-alive connection pool for all sessions (and every other
+        # script using llm_registry), instead of a TLS handshake per tab.
+        self.llm = llm or get_chat_model(LLM_MODEL, api_key=os.getenv("GROQ_API_KEY"))
+
+        self.reload_index()
+
+    def reload_index(self):
+        """(Re)load the vector store and drop answers cached against the old one."""
+        if self.index_dir:
+            self.vectorstore = load_corpus_index(self.index_dir, self.embeddings)
+        else:
+            self.vectorstore = load_or_build_vectorstore(self.pdf_path, self.embeddings)
+        if RETRIEVER == "hybrid":
+            bm25 = load_or_build_bm25(self.vectorstore, self.index_dir or CACHE_DIR)
+            self.retriever = HybridRetriever(vectorstore=self.vectorstore, bm25=bm25)
+        else:
+            self.retriever = self.vectorstore.as_retriever()
+        self.rag_chain = self._build_chain()
+        self.answer_cache.invalidate()
+
+    def _build_chain(self):
+        """
+        {"query", "history"[, "docs"]}  ->  answer string
+
+        Written as LCEL rather than RetrievalQA: RetrievalQA only forwards
+        `question` to the prompt, so {history} was never filled, and it
+        cannot stream tokens. Callers that already retrieved (the answer
+        cache does) pass "docs" so the query is not embedded twice.
+        """
+        def context(inputs: dict) -> str:
+            docs = inputs.get("docs")
+            if docs is None:
+                docs = self.retriever.invoke(inputs["query"])
+            return build_context(inputs["query"], docs)
+
+        return (
+            RunnablePassthrough.assign(
+                context=RunnableLambda(context),
+                question=itemgetter("query"),
+                history=lambda inputs: get_buffer_string(inputs.get("history", [])),
+            )
+            | STRICT_PROMPT
+            | self.llm
+            | StrOutputParser()
+        )
+
+    def retrieve(self, query: str):
+        """Embed `query` once and fetch the same top-k chunks the chain would."""
+        query_vector = self.embeddings.embed_query(query)
+        if isinstance(self.retriever, HybridRetriever):
+            return query_vector, self.retriever.search(query, query_vector)
+        k = self.retriever.search_kwargs.get("k", 4)
+        return query_vector, self.vectorstore.similarity_search_by_vector(query_vector, k=k)
+
+
+_backends = {}                   # pdf_path -> RAGBackend
+_backend_lock = threading.Lock()
+
+
+def get_shared_backend(pdf_path: str = PDF_PATH) -> RAGBackend:
+    """Build the backend for `pdf_path` on first use; later callers get the same one."""
+    backend = _backends.get(pdf_path)
+    if backend is None:
+        with _backend_lock:
+            backend = _backends.get(pdf_path)
+            if backend is None:
+                backend = _backends[pdf_path] = RAGBackend(pdf_path)
+    return backend
+
+
+# ============================================================
+# 3. BENCHMARK — per-session vs shared backend
+# ============================================================
+
+def _rss_mb() -> float:
+    """Current resident set size of this process, in MB (Linux)."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _simulate(mode: str, sessions: int) -> dict:
+    """Open `sessions` sessions in this process the old way or the shared way."""
+    from langchain_groq import ChatGroq
+
+    rss_before = _rss_mb()
+    t0 = time.perf_counter()
+    startups = []
+    held = []                                   # keep every session alive
+    for _ in range(sessions):
+        s0 = time.perf_counter()
+        if mode == "per-session":
+            # The old app built its own ChatGroq (and connection pool) per session.
+            llm = ChatGroq(model=LLM_MODEL, api_key=os.getenv("GROQ_API_KEY"))
+            held.append(RAGBackend(llm=llm))
+        else:
+            held.append(get_shared_backend())
+        startups.append(time.perf_counter() - s0)
+    return {
+        "mode": mode,
+        "sessions": sessions,
+        "total_s": round(time.perf_counter() - t0, 3),
+        "first_session_s": round(startups[0], 3),
+        "later_session_avg_s": round(sum(startups[1:]) / max(len(startups) - 1, 1), 4),
+        "rss_delta_mb": round(_rss_mb() - rss_before, 1),
+    }
+
+
+def _time_answer(chain, question: str, stream: bool) -> dict:
+    """Time-to-first-token and total latency for one answer."""
+    t0 = time.perf_counter()
+    if not stream:
+        chain.invoke({"query": question})
+        total = time.perf_counter() - t0
+        return {"ttft_s": total, "total_s": total}   # nothing is visible before the end
+    ttft = None
+    for _ in chain.stream({"query": question}):
+        if ttft is None:
+            ttft = time.perf_counter() - t0
+    return {"ttft_s": ttft, "total_s": time.perf_counter() - t0}
+
+
+def latency_benchmark(question: str, runs: int = 3):
+    """Blocking invoke vs token streaming, against the real Groq API."""
+    chain = get_shared_backend().rag_chain
+    for mode, stream in (("blocking", False), ("streaming", True)):
+        results = [_time_answer(chain, question, stream) for _ in range(runs)]
+        ttft = sorted(r["ttft_s"] for r in results)[runs // 2]
+        total = sorted(r["total_s"] for r in results)[runs // 2]
+        print(f"{mode:<10} median TTFT {ttft:6.3f} s   median total {total:6.3f} s   ({runs} runs)")
+
+
+def benchmark(session_counts=(1, 10, 50)):
+    """Run each (mode, N) in a fresh interpreter so RSS numbers don't mix."""
+    os.environ.setdefault("GROQ_API_KEY", "gsk_benchmark_dummy")   # no calls are made
+    load_or_build_vectorstore(PDF_PATH)    # warm the disk cache once up front
+
+    print(f"{'mode':<12} {'N':>4} {'total s':>9} {'1st s':>8} {'next avg s':>11} {'RSS +MB':>9}")
+    for n in session_counts:
+        for mode in ("per-session", "shared"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--simulate", mode, str(n)],
+                capture_output=True, text=True, check=True,
+            )
+            r = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"{r['mode']:<12} {r['sessions']:>4} {r['total_s']:>9} "
+                  f"{r['first_session_s']:>8} {r['later_session_avg_s']:>11} {r['rss_delta_mb']:>9}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--simulate":
+        print(json.dumps(_simulate(sys.argv[2], int(sys.argv[3]))))
+    elif len(sys.argv) == 3 and sys.argv[1] == "--latency":
+        latency_benchmark(sys.argv[2])
+    else:
+        benchmark()
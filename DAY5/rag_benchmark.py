@@ -0,0 +1,286 @@
+"""
+============================================================
+  Offline benchmark for the RAG pipelines
+============================================================
+  Runs the retrieval side of the RAG scripts end to end with no
+  network: a fixed corpus (DAY2/my_docs.txt + the PDFs in DAY5),
+  the checked-in questions in rag_eval_questions.json and a
+  deterministic stub LLM in place of Groq. Each chunking profile
+  mirrors one of the scripts:
+
+      chatbot     RAG_CHAT_History_Groq.py   4000 / 200, k=4
+      strict_rag  DAY2/Strict_RAG.ipynb       200 /  20, k=4
+      rag1        DAY2/RAG-1.ipynb            500 /  50, k=3
+
+  and reports ingestion time, embedding throughput, retrieval
+  p50/p95/p99 latency, recall@k (dense and hybrid), context size
+  before/after compression (and whether the gold answer survives
+  it), stub-LLM answer latency and peak memory. Every profile runs in a fresh
+  interpreter so the RSS numbers don't mix.
+
+  The MiniLM model must already be in the Hugging Face cache
+  (the benchmark forces offline mode); --fake-embeddings runs
+  without it, but then recall means nothing.
+
+  USAGE:
+      python rag_benchmark.py                          # writes rag_benchmark-<commit>.json
+      python rag_benchmark.py --profile rag1 --repeats 5
+      python rag_benchmark.py --compare old.json new.json
+============================================================
+"""
+
+import os
+
+# Never reach for the network: the model comes from the local cache.
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+
+from langchain_core.embeddings import Embeddings, DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+
+from rag_store import EMBED_MODEL, get_embeddings, file_sha256
+from rag_ingest import stream_ingest, save_corpus_index, peak_rss_mb, DEFAULT_BATCH_SIZE
+from rag_hybrid import HybridRetriever, load_or_build_bm25, evaluate, latency_percentiles
+from rag_backend import RAGBackend, build_context, format_docs
+from rag_history import estimate_tokens
+
+
+# ============================================================
+# 1. CONFIGURATION
+# ============================================================
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CORPUS = [
+    os.path.join(HERE, "..", "DAY2", "my_docs.txt"),
+    os.path.join(HERE, "attention.pdf"),
+    os.path.join(HERE, "Beautiful_Soup_Documentation.pdf"),
+]
+QUESTIONS = os.path.join(HERE, "rag_eval_questions.json")
+
+PROFILES = {
+    "chatbot":    {"script": "DAY5/RAG_CHAT_History_Groq.py", "chunk_size": 4000, "chunk_overlap": 200, "k": 4},
+    "strict_rag": {"script": "DAY2/Strict_RAG.ipynb",         "chunk_size": 200,  "chunk_overlap": 20,  "k": 4},
+    "rag1":       {"script": "DAY2/RAG-1.ipynb",              "chunk_size": 500,  "chunk_overlap": 50,  "k": 3},
+}
+
+STUB_ANSWER = "I don't know, the document doesnot contain this information."
+DEFAULT_REPEATS = 3          # passes over the question set for latency percentiles
+
+
+class TimedEmbeddings(Embeddings):
+    """Wraps an embedding model and counts document-embedding time."""
+
+    def __init__(self, inner: Embeddings):
+        self.inner = inner
+        self.texts = 0
+        self.seconds = 0.0
+
+    def embed_documents(self, texts):
+        t0 = time.perf_counter()
+        vectors = self.inner.embed_documents(texts)
+        self.seconds += time.perf_counter() - t0
+        self.texts += len(texts)
+        return vectors
+
+    def embed_query(self, text):
+        return self.inner.embed_query(text)
+
+
+# ============================================================
+# 2. ONE PROFILE (runs in its own interpreter)
+# ============================================================
+
+def run_profile(name: str, repeats: int = DEFAULT_REPEATS, fake_embeddings: bool = False) -> dict:
+    profile = PROFILES[name]
+    k = profile["k"]
+    with open(QUESTIONS) as f:
+        questions = json.load(f)
+
+    t0 = time.perf_counter()
+    # No embedding cache: every run embeds the whole corpus, so runs stay comparable.
+    base = DeterministicFakeEmbedding(size=384) if fake_embeddings else get_embeddings(cache_dir=None)
+    base.embed_query("warm up")                 # loads the model weights
+    model_load_s = time.perf_counter() - t0
+    embeddings = TimedEmbeddings(base)
+
+    index_dir = tempfile.mkdtemp(prefix="rag-bench-")
+    try:
+        t0 = time.perf_counter()
+        vectorstore, stats = stream_ingest(
+            CORPUS, embeddings, batch_size=DEFAULT_BATCH_SIZE,
+            chunk_size=profile["chunk_size"], chunk_overlap=profile["chunk_overlap"],
+        )
+        save_corpus_index(vectorstore, index_dir, stats,
+                          profile["chunk_size"], profile["chunk_overlap"])
+        ingest_s = time.perf_counter() - t0
+
+        # Warm start, the way the chatbot loads it; the stub keeps Groq out of it.
+        t0 = time.perf_counter()
+        backend = RAGBackend(index_dir=index_dir, embeddings=embeddings,
+                             llm=FakeListChatModel(responses=[STUB_ANSWER]))
+        hybrid = HybridRetriever(vectorstore=backend.vectorstore,
+                                 bm25=load_or_build_bm25(backend.vectorstore, index_dir), k=k)
+        index_load_s = time.perf_counter() - t0
+
+        runs = questions * repeats
+        dense = evaluate(lambda q: backend.vectorstore.similarity_search(q, k=k), runs, k)
+        fused = evaluate(hybrid.search, runs, k)
+
+        context = measure_context(questions, hybrid)
+
+        latencies = []
+        for item in runs:
+            t0 = time.perf_counter()
+            backend.rag_chain.invoke({"query": item["question"]})
+            latencies.append(time.perf_counter() - t0)
+    finally:
+        shutil.rmtree(index_dir, ignore_errors=True)
+
+    return {
+        **profile,
+        "files": stats["files"],
+        "chunks": stats["chunks"],
+        "model_load_s": round(model_load_s, 3),
+        "ingest_s": round(ingest_s, 3),
+        "embed_texts_per_s": round(embeddings.texts / embeddings.seconds, 1) if embeddings.seconds else None,
+        "index_load_s": round(index_load_s, 3),
+        "dense": dense,
+        "hybrid": fused,
+        "context": context,
+        "answer": latency_percentiles(latencies),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def measure_context(questions: list, retriever) -> dict:
+    """Prompt context as retrieved vs as compressed, over the question set."""
+    raw_tokens, tokens, raw_gold, gold, latencies = [], [], 0, 0, []
+    for item in questions:
+        docs = retriever.search(item["question"])
+        raw = format_docs(docs)
+        t0 = time.perf_counter()
+        compressed = build_context(item["question"], docs)
+        latencies.append(time.perf_counter() - t0)
+        raw_tokens.append(estimate_tokens(raw))
+        tokens.append(estimate_tokens(compressed))
+        raw_gold += any(g in raw for g in item["gold"])
+        gold += any(g in compressed for g in item["gold"])
+    return {
+        "raw_tokens_avg": round(sum(raw_tokens) / len(questions), 1),
+        "tokens_avg": round(sum(tokens) / len(questions), 1),
+        "raw_gold_kept": round(raw_gold / len(questions), 3),
+        "gold_kept": round(gold / len(questions), 3),
+        "compress": latency_percentiles(latencies),
+    }
+
+
+# ============================================================
+# 3. FULL RUN + COMPARISON
+# ============================================================
+
+def _git(*args) -> str:
+    try:
+        out = subprocess.run(["git", *args], cwd=HERE, capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def benchmark(profiles: list, repeats: int, fake_embeddings: bool) -> dict:
+    with open(QUESTIONS) as f:
+        n_questions = len(json.load(f))
+    report = {
+        "commit": _git("rev-parse", "--short", "HEAD") or None,
+        "dirty": bool(_git("status", "--porcelain", "--", ".")),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": f"{platform.machine()} x{os.cpu_count()}",
+        "embeddings": "fake" if fake_embeddings else EMBED_MODEL,
+        "corpus": {os.path.relpath(p, os.path.join(HERE, "..")): file_sha256(p)[:12] for p in CORPUS},
+        "questions": n_questions,
+        "repeats": repeats,
+        "profiles": {},
+    }
+    for name in profiles:
+        cmd = [sys.executable, __file__, "--run", name, "--repeats", str(repeats)]
+        if fake_embeddings:
+            cmd.append("--fake-embeddings")
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        report["profiles"][name] = result
+        k = result["k"]
+        print(f"{name:<11} {result['chunks']:>5} chunks  ingest {result['ingest_s']:>7.2f}s  "
+              f"embed {result['embed_texts_per_s']:>8}/s  "
+              f"dense r@{k} {result['dense'][f'recall@{k}']:.3f} p95 {result['dense']['p95_ms']:>6}ms  "
+              f"hybrid r@{k} {result['hybrid'][f'recall@{k}']:.3f} p95 {result['hybrid']['p95_ms']:>6}ms  "
+              f"context {result['context']['raw_tokens_avg']:>6} -> {result['context']['tokens_avg']:>6} tok  "
+              f"peak {result['peak_rss_mb']:>7}MB")
+    return report
+
+
+def _flatten(result: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in result.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(old_path: str, new_path: str):
+    """Side-by-side numbers of two saved runs, per profile."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"old: {old['commit']}  {old['embeddings']}   new: {new['commit']}  {new['embeddings']}")
+    for name in new["profiles"]:
+        if name not in old["profiles"]:
+            continue
+        a, b = _flatten(old["profiles"][name]), _flatten(new["profiles"][name])
+        print(f"\n[{name}]")
+        for key in b:
+            if key in a and a[key] != b[key]:
+                change = f"{100 * (b[key] - a[key]) / a[key]:+.1f}%" if a[key] else ""
+                print(f"  {key:<22} {a[key]:>10} -> {b[key]:<10} {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline RAG benchmark.")
+    parser.add_argument("--profile", action="append", choices=sorted(PROFILES),
+                        help="profile to run (repeatable); default: all")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--fake-embeddings", action="store_true",
+                        help="hash embeddings instead of MiniLM (timings only)")
+    parser.add_argument("--out", help="JSON report path (default rag_benchmark-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_profile(args.run, args.repeats, args.fake_embeddings)))
+        return
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = benchmark(args.profile or list(PROFILES), args.repeats, args.fake_embeddings)
+    out = args.out or f"rag_benchmark-{report['commit'] or 'nogit'}.json"
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nwrote {out}")
+
+
+if __name__ == "__main__":
+    main()
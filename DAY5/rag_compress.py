@@ -0,0 +1,184 @@
+"""
+============================================================
+  Context compression between the retriever and the LLM
+============================================================
+  The strict prompt used to get every retrieved chunk at full
+  length. Neighbouring chunks repeat their chunk_overlap, hybrid
+  retrieval can return near-copies, and most sentences of a
+  4000-character chunk have nothing to do with the question. All
+  of it is paid for in prompt tokens and Groq latency.
+
+  compress(query, docs) runs, in order:
+
+      1. overlap removal   text a chunk shares with the end/start of
+                           an earlier chunk is cut from the later one
+      2. near-duplicates   chunks whose word 3-grams are mostly in an
+                           earlier chunk are dropped
+      3. budget            if what is left fits the token budget it
+                           is used as is; otherwise sentences are
+                           scored against the question (BM25-style
+                           idf of shared terms, local, no model) and
+                           the best ones are kept, each together
+                           with its neighbours, until the budget is
+                           reached
+
+  Kept sentences stay in document order; gaps are marked "...".
+
+  BENCHMARK (context tokens + gold answers kept, per profile):
+      python rag_benchmark.py
+============================================================
+"""
+
+import os
+import re
+import math
+from collections import Counter
+
+from langchain_core.documents import Document
+
+from rag_history import estimate_tokens
+from rag_hybrid import tokenize
+
+
+# ============================================================
+# 1. CONFIGURATION
+# ============================================================
+
+# Tokens of {context}; the 4 x 4000-char chunks were ~4000. 0 sends chunks as retrieved.
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("RAG_CONTEXT_BUDGET", "1024"))
+MIN_OVERLAP = 32             # chars; shorter shared edges are coincidence
+MAX_OVERLAP = 2000           # chars searched at a chunk's edges
+DUPLICATE_SHARE = 0.8        # share of a chunk's 3-grams already seen -> drop it
+NEIGHBOURS = 1               # sentences kept on each side of a selected one
+GAP = " ... "
+
+STOPWORDS = set("""
+a an and are as at be by can do does for from has have how i in is it its of on or
+that the their this to was were what when where which who why will with you your
+""".split())
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+
+
+# ============================================================
+# 2. OVERLAPS + NEAR-DUPLICATES
+# ============================================================
+
+def overlap_length(a: str, b: str) -> int:
+    """Length of the longest suffix of `a` that is a prefix of `b`."""
+    tail = a[-MAX_OVERLAP:]
+    probe = b[:MIN_OVERLAP]
+    if len(probe) < MIN_OVERLAP:
+        return 0
+    pos = tail.find(probe)
+    while pos != -1:
+        if b.startswith(tail[pos:]):
+            return len(tail) - pos
+        pos = tail.find(probe, pos + 1)
+    return 0
+
+
+def remove_overlaps(texts: list) -> list:
+    """Cut from each chunk the edges it shares with an earlier chunk."""
+    out = []
+    for text in texts:
+        for earlier in out:
+            text = text[overlap_length(earlier, text):]
+            cut = overlap_length(text, earlier)
+            if cut:
+                text = text[:-cut]
+        out.append(text.strip())
+    return out
+
+
+def _shingles(text: str, n: int = 3) -> set:
+    words = tokenize(text)
+    return {tuple(words[i:i + n]) for i in range(max(1, len(words) - n + 1))}
+
+
+def drop_near_duplicates(texts: list, share: float = DUPLICATE_SHARE) -> list:
+    """Indices of the chunks to keep, in order."""
+    keep, seen = [], set()
+    for i, text in enumerate(texts):
+        shingles = _shingles(text)
+        if not text or len(shingles & seen) >= share * len(shingles):
+            continue
+        keep.append(i)
+        seen |= shingles
+    return keep
+
+
+# ============================================================
+# 3. SENTENCE SELECTION
+# ============================================================
+
+def split_sentences(text: str) -> list:
+    return [s.strip() for s in _SENTENCE_RE.split(text) if s.strip()]
+
+
+def score_sentences(query: str, sentences: list) -> list:
+    """Sum of the idf of query terms each sentence contains."""
+    terms = {t for t in tokenize(query) if t not in STOPWORDS}
+    if not terms:
+        return [0.0] * len(sentences)
+    bags = [set(tokenize(s)) & terms for s in sentences]
+    df = Counter(t for bag in bags for t in bag)
+    n = len(sentences)
+    idf = {t: math.log(1 + (n - df[t] + 0.5) / (df[t] + 0.5)) for t in df}
+    return [sum(idf[t] for t in bag) for bag in bags]
+
+
+def compress(query: str, docs: list, token_budget: int = CONTEXT_TOKEN_BUDGET) -> list:
+    """Shorter copies of `docs` for the prompt; retrieval order is kept."""
+    texts = remove_overlaps([doc.page_content for doc in docs])
+    keep = drop_near_duplicates(texts)
+    if sum(estimate_tokens(texts[i]) for i in keep) <= token_budget:
+        return [Document(page_content=texts[i], metadata=docs[i].metadata) for i in keep]
+
+    # (doc position, sentence position, text) over every kept chunk
+    sentences = [(d, s, sent) for d, i in enumerate(keep)
+                 for s, sent in enumerate(split_sentences(texts[i]))]
+    scores = score_sentences(query, [sent for _, _, sent in sentences])
+    where = {(d, s): k for k, (d, s, _) in enumerate(sentences)}
+    ranked = sorted((k for k in range(len(sentences)) if scores[k] > 0),
+                    key=lambda k: (-scores[k], sentences[k][0], sentences[k][1]))
+
+    chosen, chosen_text, used = set(), set(), 0
+
+    def take(k):
+        nonlocal used
+        text = sentences[k][2]
+        cost = estimate_tokens(text) + 1
+        if k in chosen or text in chosen_text or used + cost > token_budget:
+            return
+        chosen.add(k)
+        chosen_text.add(text)         # the same sentence twice is still one fact
+        used += cost
+
+    # Each ranked sentence comes with its neighbours, nearest first, so a
+    # long tail of low-scoring hits cannot use up the budget before the
+    # context around the best ones is in.
+    for k in ranked:
+        take(k)
+        if k not in chosen:
+            continue
+        d, s, _ = sentences[k]
+        for offset in range(1, NEIGHBOURS + 1):
+            for neighbour in (where.get((d, s - offset)), where.get((d, s + offset))):
+                if neighbour is not None:
+                    take(neighbour)
+    if not chosen:
+        # Nothing matched the question: fall back to the top chunk's head.
+        first = keep[0]
+        return [Document(page_content=texts[first][:4 * token_budget], metadata=docs[first].metadata)]
+
+    out = []
+    for d, i in enumerate(keep):
+        picked = sorted(s for k, (dd, s, _) in enumerate(sentences) if dd == d and k in chosen)
+        if not picked:
+            continue
+        parts = [sentences[where[(d, picked[0])]][2]]
+        for prev, s in zip(picked, picked[1:]):
+            parts.append((" " if s == prev + 1 else GAP) + sentences[where[(d, s)]][2])
+        out.append(Document(page_content="".join(parts), metadata=docs[i].metadata))
+    return out
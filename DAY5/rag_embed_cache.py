@@ -0,0 +1,232 @@
+"""
+============================================================
+  Chunk-level embedding cache shared across chunking settings
+============================================================
+  Changing chunk_size / chunk_overlap re-splits the corpus, but a
+  lot of the chunks come out byte-identical (short pages, short
+  files, everything under the chunk size). The index cache in
+  rag_store.py is keyed on the whole configuration, so it misses
+  and every chunk used to be embedded again.
+
+  This cache works one level lower, per chunk:
+
+      key    = sha256( normalized chunk text )[:16]   per model
+      store  = <dir>/<model>/vectors.f32   float32 rows, memory-mapped
+               <dir>/<model>/keys.bin      16-byte key of each row
+               <dir>/<model>/meta.json     model name + dimension
+
+  Both files are append-only; row i of vectors.f32 belongs to the
+  i-th key. Lookups hit an in-memory dict key -> row and read the
+  row from the memory map, so only the chunks that were never seen
+  before go to the model. Text is normalized (NFC, whitespace
+  collapsed) before hashing; MiniLM's tokenizer ignores those
+  differences anyway.
+
+  Appends take a file lock (fcntl, where available) so several
+  processes can share one cache directory.
+
+  BENCHMARK (re-indexing one PDF under several chunk settings):
+      python rag_embed_cache.py attention.pdf
+============================================================
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import tempfile
+import threading
+import unicodedata
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    import fcntl                    # POSIX only; Windows falls back to the thread lock
+except ImportError:
+    fcntl = None
+
+
+# ============================================================
+# 1. CONFIGURATION
+# ============================================================
+
+KEY_BYTES = 16
+
+
+def normalize(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def chunk_key(text: str) -> bytes:
+    return hashlib.sha256(normalize(text).encode("utf-8")).digest()[:KEY_BYTES]
+
+
+# ============================================================
+# 2. ON-DISK STORE
+# ============================================================
+
+class EmbeddingCache:
+    """Append-only (key -> float32 vector) store for one embedding model."""
+
+    def __init__(self, model_name: str, cache_dir: str):
+        self.model_name = model_name
+        self.dir = os.path.join(cache_dir, model_name.replace("/", "--"))
+        os.makedirs(self.dir, exist_ok=True)
+        self._vectors_path = os.path.join(self.dir, "vectors.f32")
+        self._keys_path = os.path.join(self.dir, "keys.bin")
+        self._meta_path = os.path.join(self.dir, "meta.json")
+        self.dim = None
+        self._rows = {}             # key -> row number (first row holding it)
+        self._n = 0                 # rows read so far; > len(self._rows) if a key repeats
+        self._matrix = None         # np.memmap over the first self._n rows
+        self._lock = threading.Lock()
+        with self._lock:
+            self._refresh()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _refresh(self):
+        """Pick up rows appended since the last look (possibly by another process)."""
+        if self.dim is None:
+            if not os.path.exists(self._meta_path):
+                return
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+            if meta["model_name"] != self.model_name:
+                raise ValueError(f"{self.dir} holds embeddings of {meta['model_name']!r}")
+            self.dim = meta["dim"]
+        row_bytes = 4 * self.dim
+        n_keys = os.path.getsize(self._keys_path) // KEY_BYTES if os.path.exists(self._keys_path) else 0
+        n_vectors = os.path.getsize(self._vectors_path) // row_bytes if os.path.exists(self._vectors_path) else 0
+        # Vectors are written before keys, so a row only counts once its key is there.
+        n = min(n_keys, n_vectors)
+        if n == self._n:
+            return
+        # Row numbers come from the position in keys.bin, not from the dict
+        # size: a key appended twice (two processes without fcntl) must not
+        # shift every later key onto the wrong vector.
+        start = self._n * KEY_BYTES
+        with open(self._keys_path, "rb") as f:
+            f.seek(start)
+            new_keys = f.read(n * KEY_BYTES - start)
+        for i in range(0, len(new_keys), KEY_BYTES):
+            self._rows.setdefault(new_keys[i:i + KEY_BYTES], (start + i) // KEY_BYTES)
+        self._n = n
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+
+    def lookup(self, keys: list) -> list:
+        """Cached vector (float32 array) for each key, or None."""
+        with self._lock:
+            if any(key not in self._rows for key in keys):
+                self._refresh()
+            return [None if (row := self._rows.get(key)) is None else np.array(self._matrix[row])
+                    for key in keys]
+
+    def add(self, keys: list, vectors):
+        """Append vectors for keys that are not stored yet."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(keys):
+            return
+        with self._lock, open(os.path.join(self.dir, ".lock"), "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            if self.dim is None:
+                self._refresh()
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                with open(self._meta_path, "w") as f:
+                    json.dump({"model_name": self.model_name, "dim": self.dim}, f)
+            self._refresh()
+
+            fresh, seen = [], set()
+            for i, key in enumerate(keys):
+                if key not in self._rows and key not in seen:
+                    fresh.append(i)
+                    seen.add(key)
+            if not fresh:
+                return
+            # Drop a torn tail left by a crash mid-append before adding to it.
+            n = self._n
+            for path, size in ((self._vectors_path, n * 4 * self.dim), (self._keys_path, n * KEY_BYTES)):
+                if os.path.exists(path) and os.path.getsize(path) != size:
+                    os.truncate(path, size)
+            with open(self._vectors_path, "ab") as f:
+                f.write(np.ascontiguousarray(vectors[fresh]).tobytes())
+            with open(self._keys_path, "ab") as f:
+                f.write(b"".join(keys[i] for i in fresh))
+            self._refresh()
+
+    def nbytes(self) -> int:
+        return 0 if self.dim is None else self._n * (4 * self.dim + KEY_BYTES)
+
+
+# ============================================================
+# 3. EMBEDDINGS WRAPPER
+# ============================================================
+
+class CachedEmbeddings(Embeddings):
+    """
+    Drop-in for HuggingFaceEmbeddings: embed_documents() only sends
+    chunks missing from the cache (each distinct text once) to the
+    model. Queries are not cached; they are one-offs.
+    """
+
+    def __init__(self, inner: Embeddings, model_name: str, cache_dir: str):
+        self.inner = inner
+        self.cache = EmbeddingCache(model_name, cache_dir)
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts):
+        keys = [chunk_key(text) for text in texts]
+        found = self.cache.lookup(keys)
+        todo = {}                                   # key -> text, first occurrence
+        for key, text, vector in zip(keys, texts, found):
+            if vector is None:
+                todo.setdefault(key, text)
+        if todo:
+            fresh = self.inner.embed_documents(list(todo.values()))
+            self.cache.add(list(todo), fresh)
+            computed = dict(zip(todo, fresh))
+            found = [computed[key] if vector is None else vector for key, vector in zip(keys, found)]
+        self.misses += len(todo)
+        self.hits += len(texts) - len(todo)
+        return [np.asarray(vector, dtype=np.float32).tolist() for vector in found]
+
+    def embed_query(self, text):
+        return self.inner.embed_query(text)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "cached_chunks": len(self.cache),
+                "cache_mb": round(self.cache.nbytes() / 2 ** 20, 1)}
+
+
+# ============================================================
+# 4. BENCHMARK — chunk settings sweep, cold vs shared cache
+# ============================================================
+
+def benchmark(pdf_path: str, settings=((4000, 200), (2000, 200), (1000, 100), (4000, 0), (4000, 200))):
+    from rag_store import EMBED_MODEL, get_embeddings, build_vectorstore
+
+    model = get_embeddings(cache_dir=None)
+    model.embed_query("warm up")
+    with tempfile.TemporaryDirectory(prefix="embed_cache_bench.") as cache_dir:
+        print(f"{'chunk':>6} {'overlap':>8} {'chunks':>7} {'embedded':>9} {'no cache s':>11} {'cached s':>9}")
+        for chunk_size, chunk_overlap in settings:
+            t0 = time.perf_counter()
+            build_vectorstore(pdf_path, model, chunk_size, chunk_overlap)
+            plain_s = time.perf_counter() - t0
+
+            cached = CachedEmbeddings(model, EMBED_MODEL, cache_dir)
+            t0 = time.perf_counter()
+            vs = build_vectorstore(pdf_path, cached, chunk_size, chunk_overlap)
+            cached_s = time.perf_counter() - t0
+            print(f"{chunk_size:>6} {chunk_overlap:>8} {vs.index.ntotal:>7} {cached.misses:>9} "
+                  f"{plain_s:>11.2f} {cached_s:>9.2f}")
+
+
+if __name__ == "__main__":
+    benchmark(sys.argv[1] if len(sys.argv) > 1 else "attention.pdf")
@@ -0,0 +1,397 @@
+"""
+============================================================
+  Bounded chat history for RunnableWithMessageHistory
+============================================================
+  A plain ChatMessageHistory grows forever and all of it goes
+  into the {history} slot of the strict prompt, so every turn is
+  slower and more expensive than the last. This history keeps:
+
+      [ rolling summary ]  +  [ last K turns verbatim ]
+
+  Turns that fall out of the window are folded into the summary
+  by a background thread, so the user never waits for it. Until
+  that finishes they stay verbatim, and the whole thing is
+  trimmed oldest-first to a token budget, so the history part of
+  the prompt plateaus instead of growing linearly.
+
+  SQLiteHistoryStore makes it durable: every message is written
+  (batched, write-behind) to SQLite in WAL mode, keyed by session
+  ID. Only recently active sessions stay in memory (LRU); reads
+  for those never touch disk, idle ones are reloaded on demand.
+============================================================
+"""
+
+import json
+import math
+import logging
+import time
+import queue
+import atexit
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import (
+    SystemMessage, get_buffer_string, message_to_dict, messages_from_dict,
+)
+
+
+# ============================================================
+# 1. CONFIGURATION
+# ============================================================
+
+KEEP_LAST_TURNS = 4          # human + AI pairs kept word for word
+HISTORY_TOKEN_BUDGET = 1024  # hard cap for the rendered history
+
+HISTORY_DB = "chat_history.db"
+MAX_HOT_SESSIONS = 256       # sessions kept in memory
+FLUSH_INTERVAL_S = 0.5       # write-behind batching window
+MAX_WRITE_BATCH = 512        # queued operations per transaction
+
+SUMMARY_PROMPT = """Update the running summary of a conversation about a document.
+Keep facts the user asked about and the answers given. Be brief.
+
+Current summary:
+{summary}
+
+New lines:
+{lines}
+
+Updated summary:"""
+
+logger = logging.getLogger(__name__)
+
+# One background thread is plenty: summaries are rare and small.
+_summarizer_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-summary")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap ~4 chars/token estimate; good enough to watch growth."""
+    return math.ceil(len(text) / 4)
+
+
+# ============================================================
+# 2. HISTORY
+# ============================================================
+
+class SummarizingChatHistory(BaseChatMessageHistory):
+
+    def __init__(self, llm=None, keep_last_turns: int = KEEP_LAST_TURNS,
+                 token_budget: int = HISTORY_TOKEN_BUDGET):
+        self.llm = llm
+        self.keep_last_turns = keep_last_turns
+        self.token_budget = token_budget
+        self.summary = ""
+        self._recent = []          # last K turns, verbatim
+        self._pending = []         # evicted turns not yet in the summary
+        self._summarizing = None   # Future of the running summary job
+        self._lock = threading.Lock()
+
+    @property
+    def messages(self):
+        with self._lock:
+            head = []
+            if self.summary:
+                head = [SystemMessage(content=f"Summary of the earlier conversation: {self.summary}")]
+            tail = self._pending + self._recent
+        # Enforce the budget, dropping the oldest verbatim lines first.
+        while tail and estimate_tokens(get_buffer_string(head + tail)) > self.token_budget:
+            tail = tail[1:]
+        return head + tail
+
+    def add_messages(self, messages):
+        with self._lock:
+            self._recent.extend(messages)
+            overflow = len(self._recent) - 2 * self.keep_last_turns
+            if overflow > 0:
+                self._pending.extend(self._recent[:overflow])
+                self._recent = self._recent[overflow:]
+            if self.llm is None:
+                self._pending = []     # no summarizer: the window alone bounds it
+            elif self._pending and self._summarizing is None:
+                self._summarizing = _summarizer_pool.submit(self._summarize)
+
+    def _summarize(self):
+        """Runs off the request path: fold pending turns into the summary."""
+        while True:
+            with self._lock:
+                batch = list(self._pending)
+                summary = self.summary
+                if not batch:
+                    self._summarizing = None
+                    return
+            prompt = SUMMARY_PROMPT.format(summary=summary or "(none)",
+                                           lines=get_buffer_string(batch))
+            try:
+                new_summary = self.llm.invoke(prompt).content.strip()
+            except Exception:
+                # Drop the batch rather than let an unreachable LLM grow
+                # the backlog forever; the last K turns are still kept.
+                with self._lock:
+                    del self._pending[:len(batch)]
+                    self._summarizing = None
+                return
+            with self._lock:
+                self.summary = new_summary
+                del self._pending[:len(batch)]
+            self._summary_updated(new_summary)
+
+    def _summary_updated(self, summary: str):
+        """Hook for subclasses that persist the summary."""
+
+    def wait_for_summary(self, timeout: float = None):
+        """Block until the background summary is done (for benchmarks)."""
+        future = self._summarizing
+        if future is not None:
+            future.result(timeout)
+
+    def token_count(self) -> int:
+        return estimate_tokens(get_buffer_string(self.messages))
+
+    def clear(self):
+        with self._lock:
+            self.summary = ""
+            self._recent = []
+            self._pending = []
+
+
+# ============================================================
+# 3. DURABLE STORE (SQLite, WAL, write-behind)
+# ============================================================
+
+class PersistentChatHistory(SummarizingChatHistory):
+    """A SummarizingChatHistory that also queues every change to SQLite."""
+
+    def __init__(self, store, session_id: str, llm=None, **kwargs):
+        super().__init__(llm, **kwargs)
+        self._store = store
+        self.session_id = session_id
+        self._next_seq = 0
+
+    def add_messages(self, messages):
+        messages = list(messages)
+        with self._lock:
+            first = self._next_seq
+            self._next_seq += len(messages)
+        self._store._enqueue(("add", self.session_id, [
+            (self.session_id, first + i, json.dumps(message_to_dict(m)), time.time())
+            for i, m in enumerate(messages)
+        ]))
+        super().add_messages(messages)
+
+    def _summary_updated(self, summary: str):
+        self._store._enqueue(("summary", self.session_id, summary))
+
+    def clear(self):
+        super().clear()
+        with self._lock:
+            self._next_seq = 0
+        self._store._enqueue(("clear", self.session_id))
+
+
+class SQLiteHistoryStore:
+    """
+    Process-wide owner of the history DB. get(session_id) is what
+    RunnableWithMessageHistory's get_session_history should return.
+    """
+
+    def __init__(self, path: str = HISTORY_DB, llm=None,
+                 max_hot_sessions: int = MAX_HOT_SESSIONS,
+                 flush_interval_s: float = FLUSH_INTERVAL_S,
+                 **history_kwargs):
+        self.path = path
+        self.llm = llm
+        self.max_hot_sessions = max_hot_sessions
+        self.flush_interval_s = flush_interval_s
+        self.history_kwargs = history_kwargs
+        self._hot = OrderedDict()            # session_id -> PersistentChatHistory
+        self._hot_lock = threading.Lock()
+        self._queue = queue.Queue()
+        # Queued ops not yet committed, per session: reads merge them in
+        # instead of waiting for the writer (and everyone else's writes).
+        self._unwritten = {}                 # session_id -> deque of ops
+        self._unwritten_lock = threading.Lock()
+
+        # Readers and the single writer use separate connections;
+        # WAL lets cold-session loads run while a batch is being written.
+        self._reader = self._connect()
+        self._reader_lock = threading.Lock()
+        self._reader.executescript("""
+            CREATE TABLE IF NOT EXISTS messages (
+                session_id TEXT NOT NULL,
+                seq        INTEGER NOT NULL,
+                message    TEXT NOT NULL,
+                created    REAL NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            );
+            CREATE TABLE IF NOT EXISTS summaries (
+                session_id TEXT PRIMARY KEY,
+                summary    TEXT NOT NULL
+            );
+        """)
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")    # durable at checkpoints, fast commits
+        return conn
+
+    # ---------- read path ----------
+
+    def get(self, session_id: str) -> PersistentChatHistory:
+        with self._hot_lock:
+            history = self._hot.get(session_id)
+            if history is not None:
+                self._hot.move_to_end(session_id)
+                return history                       # hot: no disk access
+
+        history = self._load(session_id)
+        with self._hot_lock:
+            # Another thread may have loaded it meanwhile; keep theirs.
+            history = self._hot.setdefault(session_id, history)
+            self._hot.move_to_end(session_id)
+            while len(self._hot) > self.max_hot_sessions:
+                self._hot.popitem(last=False)
+        return history
+
+    def _read_session(self, session_id: str, limit: int):
+        """
+        (last `limit` (seq, message json) rows, summary) of a session: the
+        committed state with its own still-queued ops replayed on top.
+        Holding _unwritten_lock keeps the two consistent; the DB may already
+        contain some of the queued ops, and replaying those is harmless.
+        """
+        with self._unwritten_lock:
+            pending = list(self._unwritten.get(session_id, ()))
+            with self._reader_lock:
+                rows = self._reader.execute(
+                    "SELECT seq, message FROM messages WHERE session_id = ? "
+                    "ORDER BY seq DESC LIMIT ?", (session_id, limit)
+                ).fetchall()
+                summary = self._reader.execute(
+                    "SELECT summary FROM summaries WHERE session_id = ?", (session_id,)
+                ).fetchone()
+        messages = dict(rows)
+        summary = summary[0] if summary else ""
+        for op in pending:
+            if op[0] == "add":
+                messages.update((seq, message) for _, seq, message, _ in op[2])
+            elif op[0] == "summary":
+                summary = op[2]
+            elif op[0] == "clear":
+                messages, summary = {}, ""
+        return sorted(messages.items())[-limit:], summary
+
+    def _load(self, session_id: str) -> PersistentChatHistory:
+        """Cold path: rebuild the window + summary of an idle session."""
+        history = PersistentChatHistory(self, session_id, self.llm, **self.history_kwargs)
+        rows, summary = self._read_session(session_id, 2 * history.keep_last_turns)
+        history._recent = messages_from_dict([json.loads(m) for _, m in rows])
+        history._next_seq = rows[-1][0] + 1 if rows else 0
+        history.summary = summary
+        return history
+
+    def transcript(self, session_id: str, limit: int = 200) -> list:
+        """Last `limit` messages as {"role", "content"} dicts for the chat UI."""
+        rows, _ = self._read_session(session_id, limit)
+        messages = messages_from_dict([json.loads(m) for _, m in rows])
+        return [{"role": "user" if m.type == "human" else "assistant", "content": m.content}
+                for m in messages]
+
+    # ---------- write path ----------
+
+    def _enqueue(self, op: tuple):
+        """op = (kind, session_id, ...)."""
+        with self._unwritten_lock:
+            self._unwritten.setdefault(op[1], deque()).append(op)
+            self._queue.put(op)
+
+    def _written(self, ops: list):
+        """Ops the writer is done with (committed or dropped), oldest first."""
+        with self._unwritten_lock:
+            for op in ops:
+                pending = self._unwritten[op[1]]
+                pending.popleft()
+                if not pending:
+                    del self._unwritten[op[1]]
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            op = self._queue.get()
+            ops = [op]
+            deadline = time.monotonic() + self.flush_interval_s
+            # Collect whatever else arrives in the window into one transaction.
+            while op is not None and len(ops) < MAX_WRITE_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    op = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                ops.append(op)
+            done = [op for op in ops if op is not None]
+            try:
+                self._commit(conn, done)
+            finally:
+                self._written(done)
+                for _ in ops:
+                    self._queue.task_done()
+            if ops[-1] is None:
+                conn.close()
+                return
+
+    def _commit(self, conn: sqlite3.Connection, ops: list):
+        """
+        Write a batch in one transaction. If it fails, retry op by op so
+        one bad write does not lose the rest; the writer thread must
+        survive, or flush() would wait forever.
+        """
+        try:
+            with conn:
+                for op in ops:
+                    self._apply(conn, op)
+            return
+        except Exception:
+            if len(ops) == 1:
+                logger.exception("history write failed, dropped: %s", ops[0][:2])
+                return
+            logger.exception("history batch of %d writes failed, retrying one by one", len(ops))
+        for op in ops:
+            try:
+                with conn:
+                    self._apply(conn, op)
+            except Exception:
+                logger.exception("history write failed, dropped: %s", op[:2])
+
+    @staticmethod
+    def _apply(conn: sqlite3.Connection, op: tuple):
+        kind = op[0]
+        if kind == "add":
+            conn.executemany(
+                "INSERT OR REPLACE INTO messages (session_id, seq, message, created) "
+                "VALUES (?, ?, ?, ?)", op[2]
+            )
+        elif kind == "summary":
+            conn.execute(
+                "INSERT OR REPLACE INTO summaries (session_id, summary) VALUES (?, ?)",
+                (op[1], op[2])
+            )
+        elif kind == "clear":
+            conn.execute("DELETE FROM messages WHERE session_id = ?", (op[1],))
+            conn.execute("DELETE FROM summaries WHERE session_id = ?", (op[1],))
+
+    def flush(self):
+        """Wait until every queued write is committed."""
+        self._queue.join()
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
@@ -0,0 +1,225 @@
+"""
+============================================================
+  Hybrid BM25 + FAISS retrieval for the Strict RAG chatbot
+============================================================
+  Dense search (MiniLM + FAISS) is good at paraphrases but weak at
+  exact terms: model names, equation labels, acronyms like BLEU or
+  "warmup_steps". BM25 is the opposite. We run both and merge the
+  two rankings with reciprocal-rank fusion:
+
+      score(chunk) = w_dense  / (rrf_k + rank_dense)
+                   + w_sparse / (rrf_k + rank_bm25)
+
+  The BM25 inverted index is built once over the same chunks as the
+  FAISS store and saved to disk, keyed by the store's chunk IDs, so
+  later startups only load it.
+
+  BENCHMARK (recall@k + latency, dense-only vs hybrid):
+      python rag_hybrid.py attention.pdf rag_eval_questions.json
+============================================================
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import time
+import heapq
+import hashlib
+from typing import Any
+from collections import Counter, defaultdict
+
+import numpy as np
+from langchain_core.retrievers import BaseRetriever
+
+
+# ============================================================
+# 1. CONFIGURATION
+# ============================================================
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60
+DENSE_WEIGHT = 1.0
+SPARSE_WEIGHT = 1.0
+TOP_K = 4
+FETCH_K = 20                 # candidates taken from each ranking before fusion
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[_.][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> list:
+    """Lower-case word tokens; keeps snake_case and dotted terms whole."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+# ============================================================
+# 2. BM25 INVERTED INDEX
+# ============================================================
+
+class BM25Index:
+    """
+    postings: term -> [[doc_no, tf], ...]
+    Scores are computed only over the postings of the query terms,
+    so a query touches a handful of lists, not every chunk.
+    """
+
+    def __init__(self, doc_ids: list, doc_lens: list, postings: dict,
+                 k1: float = BM25_K1, b: float = BM25_B):
+        self.doc_ids = doc_ids
+        self.doc_lens = doc_lens
+        self.postings = postings
+        self.k1 = k1
+        self.b = b
+        n = len(doc_ids)
+        self.avgdl = (sum(doc_lens) / n) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in postings.items()
+        }
+
+    @classmethod
+    def build(cls, doc_ids: list, texts: list) -> "BM25Index":
+        postings = defaultdict(list)
+        doc_lens = []
+        for doc_no, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lens.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings[term].append([doc_no, tf])
+        return cls(doc_ids, doc_lens, dict(postings))
+
+    def search(self, query: str, k: int = FETCH_K) -> list:
+        """Top-k (doc_id, score), best first."""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = self.idf[term]
+            for doc_no, tf in plist:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lens[doc_no] / self.avgdl)
+                scores[doc_no] += idf * tf * (self.k1 + 1) / (tf + norm)
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.doc_ids[doc_no], score) for doc_no, score in best]
+
+    def save(self, path: str):
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"doc_ids": self.doc_ids, "doc_lens": self.doc_lens,
+                       "postings": self.postings, "k1": self.k1, "b": self.b}, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["doc_ids"], data["doc_lens"], data["postings"], data["k1"], data["b"])
+
+
+def _store_ids(vectorstore) -> list:
+    return [vectorstore.index_to_docstore_id[i] for i in range(vectorstore.index.ntotal)]
+
+
+def load_or_build_bm25(vectorstore, cache_dir: str) -> BM25Index:
+    """
+    BM25 over exactly the chunks in `vectorstore`. Saved under a hash of
+    the store's chunk IDs, so it is rebuilt whenever the store changes.
+    """
+    ids = _store_ids(vectorstore)
+    key = hashlib.sha256("\n".join(ids).encode("utf-8")).hexdigest()[:32]
+    path = os.path.join(cache_dir, f"bm25-{key}.json")
+    if os.path.exists(path):
+        return BM25Index.load(path)
+    texts = [vectorstore.docstore.search(doc_id).page_content for doc_id in ids]
+    bm25 = BM25Index.build(ids, texts)
+    os.makedirs(cache_dir, exist_ok=True)
+    bm25.save(path)
+    return bm25
+
+
+# ============================================================
+# 3. HYBRID RETRIEVER (reciprocal-rank fusion)
+# ============================================================
+
+class HybridRetriever(BaseRetriever):
+    """Drop-in replacement for vectorstore.as_retriever()."""
+
+    vectorstore: Any
+    bm25: Any
+    k: int = TOP_K
+    fetch_k: int = FETCH_K
+    dense_weight: float = DENSE_WEIGHT
+    sparse_weight: float = SPARSE_WEIGHT
+    rrf_k: int = RRF_K
+
+    def dense_ids(self, query_vector) -> list:
+        """Top fetch_k docstore IDs straight from the FAISS index."""
+        vector = np.asarray([query_vector], dtype=np.float32)
+        _, rows = self.vectorstore.index.search(vector, self.fetch_k)
+        return [self.vectorstore.index_to_docstore_id[int(i)] for i in rows[0] if i != -1]
+
+    def search(self, query: str, query_vector=None) -> list:
+        """Fused top-k Documents; pass `query_vector` if it is already embedded."""
+        if query_vector is None:
+            query_vector = self.vectorstore.embedding_function.embed_query(query)
+        fused = defaultdict(float)
+        for rank, doc_id in enumerate(self.dense_ids(query_vector), 1):
+            fused[doc_id] += self.dense_weight / (self.rrf_k + rank)
+        for rank, (doc_id, _) in enumerate(self.bm25.search(query, self.fetch_k), 1):
+            fused[doc_id] += self.sparse_weight / (self.rrf_k + rank)
+        best = heapq.nlargest(self.k, fused.items(), key=lambda item: item[1])
+        return [self.vectorstore.docstore.search(doc_id) for doc_id, _ in best]
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> list:
+        return self.search(query)
+
+
+# ============================================================
+# 4. BENCHMARK — recall@k and latency, dense vs hybrid
+# ============================================================
+
+def _is_relevant(doc, item: dict) -> bool:
+    return any(gold in doc.page_content for gold in item["gold"])
+
+
+def evaluate(search, questions: list, k: int) -> dict:
+    """recall@k (share of questions with a gold chunk in the top k) + latency."""
+    hits, latencies = 0, []
+    for item in questions:
+        t0 = time.perf_counter()
+        docs = search(item["question"])[:k]
+        latencies.append(time.perf_counter() - t0)
+        hits += any(_is_relevant(doc, item) for doc in docs)
+    return {f"recall@{k}": round(hits / len(questions), 3), **latency_percentiles(latencies)}
+
+
+def latency_percentiles(latencies: list) -> dict:
+    """p50 / p95 / p99 of a list of durations in seconds, as ms."""
+    latencies = sorted(latencies)
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+    return {f"p{int(q * 100)}_ms": round(1000 * pick(q), 2) for q in (0.50, 0.95, 0.99)}
+
+
+def benchmark(pdf_path: str, questions_path: str, k: int = TOP_K):
+    from rag_store import CACHE_DIR, load_or_build_vectorstore
+
+    with open(questions_path) as f:
+        questions = [q for q in json.load(f) if q.get("source", pdf_path) == os.path.basename(pdf_path)]
+    vectorstore = load_or_build_vectorstore(pdf_path)
+
+    t0 = time.perf_counter()
+    bm25 = load_or_build_bm25(vectorstore, CACHE_DIR)
+    print(f"BM25 index: {len(bm25.postings)} terms over {len(bm25.doc_ids)} chunks "
+          f"(ready in {time.perf_counter() - t0:.3f}s)")
+
+    dense = vectorstore.as_retriever(search_kwargs={"k": k})
+    hybrid = HybridRetriever(vectorstore=vectorstore, bm25=bm25, k=k)
+    for name, search in (("dense", dense.invoke), ("hybrid", hybrid.invoke)):
+        print(f"{name:<7} {evaluate(search, questions, k)}   ({len(questions)} questions)")
+
+
+if __name__ == "__main__":
+    benchmark(sys.argv[1] if len(sys.argv) > 1 else "attention.pdf",
+              sys.argv[2] if len(sys.argv) > 2 else "rag_eval_questions.json")
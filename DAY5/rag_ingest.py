@@ -0,0 +1,683 @@
+"""
+============================================================
+  Corpus ingestion — whole folders into one FAISS index
+============================================================
+  Walks a directory, loads + splits every PDF / .txt file in
+  parallel worker processes, embeds the chunks in fixed-size
+  batches (also spread across the workers) and writes a single
+  FAISS index where every chunk carries its source metadata.
+
+  USAGE:
+      python rag_ingest.py Ref_docs --out corpus_index
+      python rag_ingest.py Ref_docs --workers 8 --batch-size 128
+      python rag_ingest.py Ref_docs --scaling      # 1,2,4..N workers
+      python rag_ingest.py big.pdf --stream        # bounded-memory mode
+      python rag_ingest.py Ref_docs --update       # embed only new/changed files
+      python rag_ingest.py Ref_docs --index-type hnsw --ef-search 64
+
+  The chatbot picks the index up with:
+      RAG_INDEX_DIR=corpus_index streamlit run RAG_CHAT_History_Groq.py
+============================================================
+"""
+
+import os
+import json
+import time
+import shutil
+import resource
+import tempfile
+import argparse
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_community.document_loaders import PyPDFLoader, TextLoader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_community.vectorstores import FAISS
+import faiss
+
+from rag_embed_cache import chunk_key
+from rag_ann import INDEX_TYPES, build_index, apply_search_params, all_vectors
+from rag_store import EMBED_MODEL, CHUNK_SIZE, CHUNK_OVERLAP, get_embeddings, file_sha256
+
+
+# ============================================================
+# 1. CONFIGURATION
+# ============================================================
+
+SUPPORTED_EXTENSIONS = {".pdf", ".txt"}
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_WORKERS = os.cpu_count() or 1
+SWAP_ATTEMPTS = 5             # concurrent saves racing for the same index dir
+
+
+# ============================================================
+# 2. DISCOVERY + LOAD/SPLIT (runs in worker processes)
+# ============================================================
+
+def find_documents(root: str) -> list:
+    """All supported files under `root`, sorted so runs are reproducible."""
+    if os.path.isfile(root):
+        return [root]
+    paths = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                paths.append(os.path.join(dirpath, name))
+    return sorted(paths)
+
+
+def _loader_for(path: str):
+    if path.lower().endswith(".pdf"):
+        return PyPDFLoader(path)
+    return TextLoader(path, encoding="utf-8")
+
+
+def _source_name(path: str, root: str) -> str:
+    if root and os.path.isdir(root):
+        return os.path.relpath(path, root)
+    return os.path.basename(path)
+
+
+def chunk_id(source: str, index: int) -> str:
+    """Stable docstore ID for the `index`-th chunk of `source`."""
+    return f"{source}::{index}"
+
+
+def load_and_split(path: str, root: str = "",
+                   chunk_size: int = CHUNK_SIZE,
+                   chunk_overlap: int = CHUNK_OVERLAP) -> list:
+    """
+    Load one file and split it. Returns plain (text, metadata) tuples
+    so the result pickles cheaply back to the parent process.
+    """
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True
+    )
+    source = _source_name(path, root)
+    chunks = []
+    for i, doc in enumerate(splitter.split_documents(_loader_for(path).load())):
+        meta = {
+            "source": source,
+            "page": doc.metadata.get("page", 0),
+            "start_index": doc.metadata.get("start_index", 0),
+            "chunk": i,
+        }
+        chunks.append((doc.page_content, meta))
+    return chunks
+
+
+# ============================================================
+# 3. BATCHED EMBEDDING (runs in worker processes)
+# ============================================================
+
+_worker_config = None
+_worker_embeddings = None
+
+
+def _init_worker(model_name: str, batch_size: int, threads: int):
+    """
+    Pin each worker to `threads` torch threads. Without this every
+    worker grabs all cores and N workers fight over them, which is
+    what stops multi-process embedding from scaling.
+    """
+    global _worker_config
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    import torch
+    torch.set_num_threads(threads)
+    _worker_config = (model_name, batch_size)
+
+
+def _embed_batch(texts: list) -> list:
+    """Embed one batch of chunk texts with this worker's model."""
+    global _worker_embeddings
+    if _worker_embeddings is None:
+        # Load the model lazily: workers that only split never pay for it.
+        from langchain_huggingface import HuggingFaceEmbeddings
+        model_name, batch_size = _worker_config
+        _worker_embeddings = HuggingFaceEmbeddings(
+            model_name=model_name, encode_kwargs={"batch_size": batch_size}
+        )
+    return _worker_embeddings.embed_documents(texts)
+
+
+def batched(items, size: int):
+    """Yield lists of up to `size` items; works on lists and generators."""
+    it = iter(items)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+# ============================================================
+# 4. PIPELINE
+# ============================================================
+
+def ingest_directory(root: str, workers: int = DEFAULT_WORKERS,
+                     batch_size: int = DEFAULT_BATCH_SIZE,
+                     chunk_size: int = CHUNK_SIZE,
+                     chunk_overlap: int = CHUNK_OVERLAP,
+                     model_name: str = EMBED_MODEL,
+                     embeddings=None,
+                     manifest: dict = None):
+    """
+    Build one FAISS store from every document under `root`.
+    Returns (vectorstore, stats). If `manifest` is given it is
+    filled in with every file's hash and chunk IDs.
+    """
+    paths = find_documents(root)
+    if not paths:
+        raise ValueError(f"No {sorted(SUPPORTED_EXTENSIONS)} files found under {root!r}")
+
+    if embeddings is None:
+        embeddings = get_embeddings(model_name)
+    cache = getattr(embeddings, "cache", None)      # set on CachedEmbeddings
+
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(model_name, batch_size, threads),
+    ) as pool:
+        # Stage 1: load + split, one file per task.
+        chunks = []
+        for file_chunks in pool.map(
+            load_and_split, paths,
+            [root] * len(paths), [chunk_size] * len(paths), [chunk_overlap] * len(paths),
+        ):
+            chunks.extend(file_chunks)
+        t_split = time.perf_counter()
+
+        # Stage 2: embed, one batch per task, spread over the same workers.
+        # Chunks already in the embedding cache (or repeated) are sent once or not at all.
+        texts = [text for text, _ in chunks]
+        if cache is not None:
+            keys = [chunk_key(text) for text in texts]
+            vectors = cache.lookup(keys)
+        else:
+            keys, vectors = list(range(len(texts))), [None] * len(texts)
+        todo = {}
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None:
+                todo.setdefault(key, text)
+        fresh = []
+        for batch_vectors in pool.map(_embed_batch, batched(list(todo.values()), batch_size)):
+            fresh.extend(batch_vectors)
+        if cache is not None and fresh:
+            cache.add(list(todo), fresh)
+        computed = dict(zip(todo, fresh))
+        vectors = [computed[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+        t_embed = time.perf_counter()
+
+    # Stage 3: a single index-add in the parent.
+    metas = [meta for _, meta in chunks]
+    ids = [chunk_id(meta["source"], meta["chunk"]) for meta in metas]
+    vectorstore = FAISS.from_embeddings(
+        list(zip(texts, vectors)), embeddings, metadatas=metas, ids=ids,
+    )
+    t_end = time.perf_counter()
+
+    if manifest is not None:
+        manifest["files"].update(_manifest_entries(paths, root))
+        for meta, cid in zip(metas, ids):
+            manifest["files"][meta["source"]]["chunk_ids"].append(cid)
+
+    stats = {
+        "files": len(paths),
+        "chunks": len(chunks),
+        "embedded": len(todo),
+        "workers": workers,
+        "batch_size": batch_size,
+        "split_s": round(t_split - t0, 3),
+        "embed_s": round(t_embed - t_split, 3),
+        "index_s": round(t_end - t_embed, 3),
+        "total_s": round(t_end - t0, 3),
+        "embed_chunks_per_s": round(len(chunks) / max(t_embed - t_split, 1e-9), 1),
+        "chunks_per_s": round(len(chunks) / max(t_end - t0, 1e-9), 1),
+    }
+    return vectorstore, stats
+
+
+# ============================================================
+# 5. STREAMING INGEST (bounded memory)
+#
+#   page ──► chunks ──► embedding batch ──► index.add
+#
+#   Pages are pulled one at a time with lazy_load(), so at most
+#   `batch_size` chunks (plus the current page) are ever in flight.
+#   Only the index itself grows with the corpus; the working set
+#   around it stays flat however many pages the PDF has.
+# ============================================================
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024   # KB on Linux
+
+
+def iter_chunks(path: str, root: str = "",
+                chunk_size: int = CHUNK_SIZE,
+                chunk_overlap: int = CHUNK_OVERLAP):
+    """Yield (text, metadata) for one file, one page at a time."""
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True
+    )
+    source = _source_name(path, root)
+    i = 0
+    for page in _loader_for(path).lazy_load():
+        # Splitting page by page gives the same chunks as load() +
+        # split_documents(), which also splits each page on its own.
+        for doc in splitter.split_documents([page]):
+            yield doc.page_content, {
+                "source": source,
+                "page": doc.metadata.get("page", 0),
+                "start_index": doc.metadata.get("start_index", 0),
+                "chunk": i,
+            }
+            i += 1
+
+
+def stream_ingest(paths: list, embeddings, root: str = "",
+                  batch_size: int = DEFAULT_BATCH_SIZE,
+                  chunk_size: int = CHUNK_SIZE,
+                  chunk_overlap: int = CHUNK_OVERLAP,
+                  vectorstore: FAISS = None,
+                  manifest: dict = None):
+    """
+    Embed and index `paths` batch by batch, adding to `vectorstore`
+    (or a new one). Returns (vectorstore, stats). Chunk IDs are
+    appended to `manifest`, whose entries for `paths` must exist.
+    """
+    def all_chunks():
+        for path in paths:
+            yield from iter_chunks(path, root, chunk_size, chunk_overlap)
+
+    t0 = time.perf_counter()
+    first_chunk_s = None
+    n_chunks = 0
+    for batch in batched(all_chunks(), batch_size):
+        texts = [text for text, _ in batch]
+        metas = [meta for _, meta in batch]
+        ids = [chunk_id(meta["source"], meta["chunk"]) for meta in metas]
+        vectors = embeddings.embed_documents(texts)
+        if vectorstore is None:
+            vectorstore = FAISS.from_embeddings(list(zip(texts, vectors)), embeddings,
+                                                metadatas=metas, ids=ids)
+        else:
+            vectorstore.add_embeddings(list(zip(texts, vectors)), metadatas=metas, ids=ids)
+        if manifest is not None:
+            for meta, cid in zip(metas, ids):
+                manifest["files"][meta["source"]]["chunk_ids"].append(cid)
+        n_chunks += len(batch)
+        if first_chunk_s is None:
+            first_chunk_s = time.perf_counter() - t0
+    total_s = time.perf_counter() - t0
+    if vectorstore is None:
+        raise ValueError(f"No chunks produced from {len(paths)} file(s)")
+
+    stats = {
+        "files": len(paths),
+        "chunks": n_chunks,
+        "workers": 1,
+        "batch_size": batch_size,
+        "first_indexed_s": round(first_chunk_s or 0.0, 3),
+        "total_s": round(total_s, 3),
+        "chunks_per_s": round(n_chunks / max(total_s, 1e-9), 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    return vectorstore, stats
+
+
+# ============================================================
+# 6. MANIFEST + INCREMENTAL UPDATES
+#
+#   manifest.json:  { "files": { source: { "sha256": ...,
+#                                          "chunk_ids": [...] } } }
+#
+#   Re-ingesting compares file hashes against the manifest:
+#     new file      -> embed + add
+#     changed file  -> delete its old chunk IDs, embed + add
+#     deleted file  -> delete its old chunk IDs
+#     unchanged     -> nothing
+#   so the cost follows the size of the change, not of the corpus.
+# ============================================================
+
+def new_manifest() -> dict:
+    return {"files": {}}
+
+
+def _manifest_entries(paths: list, root: str) -> dict:
+    return {
+        _source_name(path, root): {"sha256": file_sha256(path), "chunk_ids": []}
+        for path in paths
+    }
+
+
+def load_manifest(index_dir: str) -> dict:
+    path = os.path.join(index_dir, "manifest.json")
+    if not os.path.exists(path):
+        return new_manifest()
+    with open(path) as f:
+        return json.load(f)
+
+
+def _can_update(index_dir: str, chunk_size: int, chunk_overlap: int) -> bool:
+    """
+    An existing index can only be patched if it has a manifest and was
+    built with the same splitter and model; otherwise start from scratch.
+    """
+    meta_path = os.path.join(index_dir, "meta.json")
+    if not (os.path.exists(os.path.join(index_dir, "manifest.json"))
+            and os.path.exists(meta_path)):
+        return False
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return (meta["chunk_size"], meta["chunk_overlap"], meta["model_name"]) == \
+        (chunk_size, chunk_overlap, EMBED_MODEL)
+
+
+def update_index(root: str, index_dir: str, embeddings=None,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 chunk_size: int = CHUNK_SIZE,
+                 chunk_overlap: int = CHUNK_OVERLAP):
+    """
+    Bring the index in `index_dir` up to date with the files under
+    `root`, creating it if needed. Returns (vectorstore, manifest, stats).
+    """
+    if embeddings is None:
+        embeddings = get_embeddings()
+
+    t0 = time.perf_counter()
+    current = {_source_name(path, root): path for path in find_documents(root)}
+    index_dir = resolve_index_dir(index_dir)
+    if _can_update(index_dir, chunk_size, chunk_overlap):
+        # Patch the exact flat index; an ANN index is re-derived on save.
+        vectorstore = load_corpus_index(index_dir, embeddings, exact=True)
+        manifest = load_manifest(index_dir)
+    else:
+        vectorstore, manifest = None, new_manifest()
+    files = manifest["files"]
+
+    hashes = {source: file_sha256(path) for source, path in current.items()}
+    added = [s for s in current if s not in files]
+    changed = [s for s in current if s in files and files[s]["sha256"] != hashes[s]]
+    deleted = [s for s in files if s not in current]
+
+    stale_ids = [cid for s in changed + deleted for cid in files[s]["chunk_ids"]]
+    if stale_ids:
+        vectorstore.delete(stale_ids)
+    for s in changed + deleted:
+        del files[s]
+
+    stats = {"added": len(added), "changed": len(changed), "deleted": len(deleted),
+             "unchanged": len(current) - len(added) - len(changed),
+             "removed_chunks": len(stale_ids), "chunks": 0}
+    to_embed = added + changed
+    for s in to_embed:
+        files[s] = {"sha256": hashes[s], "chunk_ids": []}
+    if to_embed:
+        vectorstore, ingest_stats = stream_ingest(
+            [current[s] for s in to_embed], embeddings, root, batch_size,
+            chunk_size, chunk_overlap, vectorstore=vectorstore, manifest=manifest,
+        )
+        stats["chunks"] = ingest_stats["chunks"]
+    if vectorstore is None:
+        raise ValueError(f"No {sorted(SUPPORTED_EXTENSIONS)} files found under {root!r}")
+
+    stats["total_s"] = round(time.perf_counter() - t0, 3)
+    return vectorstore, manifest, stats
+
+
+def save_corpus_index(vectorstore, out_dir: str, stats: dict,
+                      chunk_size: int = CHUNK_SIZE,
+                      chunk_overlap: int = CHUNK_OVERLAP,
+                      model_name: str = EMBED_MODEL,
+                      manifest: dict = None,
+                      index_type: str = "flat",
+                      index_params: dict = None):
+    """
+    Write index + metadata (+ manifest) to a fresh temp dir and swap it
+    in, so a crash mid-save never leaves a manifest that disagrees with
+    the index next to it, and concurrent saves never share a temp dir.
+
+    For ANN index types (rag_ann.py) the served index.faiss is built
+    from the flat vectors, and the exact index is kept as flat.faiss
+    for later incremental updates.
+    """
+    out_dir = os.path.abspath(out_dir)
+    parent, name = os.path.split(out_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=name + ".tmp-", dir=parent)
+    try:
+        _write_index_dir(tmp_dir, vectorstore, stats, chunk_size, chunk_overlap,
+                         model_name, manifest, index_type, index_params)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    _swap_in(tmp_dir, out_dir)
+
+
+def _write_index_dir(tmp_dir, vectorstore, stats, chunk_size, chunk_overlap,
+                     model_name, manifest, index_type, index_params):
+    params = {}
+    if index_type == "flat":
+        vectorstore.save_local(tmp_dir)
+    else:
+        flat = vectorstore.index
+        ann, params = build_index(all_vectors(flat), index_type, index_params)
+        vectorstore.index = ann
+        try:
+            vectorstore.save_local(tmp_dir)
+        finally:
+            vectorstore.index = flat
+        faiss.write_index(flat, os.path.join(tmp_dir, "flat.faiss"))
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump({
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
+            "model_name": model_name,
+            "num_chunks": vectorstore.index.ntotal,
+            "index_type": index_type,
+            "index_params": params,
+            "stats": stats,
+            "created": time.time(),
+        }, f, indent=2)
+    if manifest is not None:
+        with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+            json.dump(manifest, f)
+
+
+def _swap_in(tmp_dir: str, out_dir: str):
+    """
+    Replace out_dir with tmp_dir. A directory cannot be renamed over a
+    non-empty one, so the old index is first moved to a unique
+    "<out_dir>.old-*" name; if the process dies between the two renames,
+    resolve_index_dir() serves that copy. If a concurrent save swaps its
+    index in between, move that one aside too and retry: the last save
+    to finish wins.
+    """
+    parent, name = os.path.split(out_dir)
+    for _ in range(SWAP_ATTEMPTS):
+        old_dir = tempfile.mkdtemp(prefix=name + ".old-", dir=parent)
+        os.rmdir(old_dir)                       # reserve a unique name, then take it
+        try:
+            os.rename(out_dir, old_dir)
+        except FileNotFoundError:
+            pass                                # first save, or mid-swap elsewhere
+        try:
+            os.rename(tmp_dir, out_dir)
+            break
+        except OSError:
+            continue                            # another save got there first
+    else:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise OSError(f"could not swap a new index into {out_dir!r}")
+    # out_dir is complete now: every older copy, ours or left by a crash, is stale.
+    for stale in _previous_versions(out_dir):
+        shutil.rmtree(stale, ignore_errors=True)
+
+
+def _previous_versions(index_dir: str) -> list:
+    """Complete indexes moved aside by _swap_in(), newest first."""
+    index_dir = os.path.abspath(index_dir)
+    parent, name = os.path.split(index_dir)
+    try:
+        entries = os.listdir(parent)
+    except FileNotFoundError:
+        return []
+    olds = [os.path.join(parent, e) for e in entries if e.startswith(name + ".old-")]
+    olds = [d for d in olds if os.path.exists(os.path.join(d, "meta.json"))]
+    return sorted(olds, key=os.path.getmtime, reverse=True)
+
+
+def resolve_index_dir(index_dir: str) -> str:
+    """
+    index_dir itself, or, if a save died between its two renames and
+    left no index there, the newest copy it had moved aside.
+    """
+    if os.path.exists(os.path.join(index_dir, "meta.json")):
+        return index_dir
+    olds = _previous_versions(index_dir)
+    return olds[0] if olds else index_dir
+
+
+def load_corpus_index(index_dir: str, embeddings=None, exact: bool = False,
+                      search_params: dict = None) -> FAISS:
+    """
+    Load an index written by this module (our own pickles, so trusted).
+    ANN indexes get their recorded nprobe/efSearch, overridable with
+    `search_params`; `exact=True` swaps in the flat index instead.
+    """
+    index_dir = resolve_index_dir(index_dir)
+    with open(os.path.join(index_dir, "meta.json")) as f:
+        meta = json.load(f)
+    if embeddings is None:
+        embeddings = get_embeddings(meta["model_name"])
+    vectorstore = FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+
+    index_type = meta.get("index_type", "flat")
+    if index_type != "flat":
+        if exact:
+            vectorstore.index = faiss.read_index(os.path.join(index_dir, "flat.faiss"))
+        else:
+            params = dict(meta["index_params"], **(search_params or {}))
+            apply_search_params(vectorstore.index, index_type, params)
+    return vectorstore
+
+
+def index_settings(index_dir: str):
+    """(index_type, index_params) recorded for an existing index."""
+    meta_path = os.path.join(resolve_index_dir(index_dir), "meta.json")
+    if not os.path.exists(meta_path):
+        return "flat", {}
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return meta.get("index_type", "flat"), meta.get("index_params", {})
+
+
+# ============================================================
+# 7. CLI
+# ============================================================
+
+def _print_stats(stats: dict):
+    print(f"  files={stats['files']}  chunks={stats['chunks']}  "
+          f"workers={stats['workers']}  batch={stats['batch_size']}")
+    if "first_indexed_s" in stats:
+        print(f"  first chunk indexed {stats['first_indexed_s']}s | "
+              f"total {stats['total_s']}s | peak RSS {stats['peak_rss_mb']} MB")
+        print(f"  throughput: {stats['chunks_per_s']} chunks/s")
+        return
+    print(f"  split {stats['split_s']}s | embed {stats['embed_s']}s | "
+          f"index {stats['index_s']}s | total {stats['total_s']}s")
+    print(f"  embedded {stats['embedded']} new chunks, "
+          f"{stats['chunks'] - stats['embedded']} from the embedding cache")
+    print(f"  throughput: {stats['embed_chunks_per_s']} chunks/s (embed), "
+          f"{stats['chunks_per_s']} chunks/s (end to end)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest a folder into one FAISS index.")
+    parser.add_argument("root", help="file, or directory to walk for .pdf / .txt files")
+    parser.add_argument("--out", default="corpus_index", help="output index directory")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--chunk-overlap", type=int, default=CHUNK_OVERLAP)
+    parser.add_argument("--scaling", action="store_true",
+                        help="benchmark 1, 2, 4 .. --workers processes instead of writing an index")
+    parser.add_argument("--stream", action="store_true",
+                        help="single-process streaming ingest; at most --batch-size chunks in memory")
+    parser.add_argument("--update", action="store_true",
+                        help="incrementally update --out: embed only new/changed files, drop deleted ones")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=None,
+                        help="FAISS index to serve (default: flat, or the existing index's type with --update)")
+    parser.add_argument("--nlist", type=int, help="IVF cells (default ~4*sqrt(n))")
+    parser.add_argument("--nprobe", type=int, help="IVF cells searched per query")
+    parser.add_argument("--hnsw-m", type=int, help="HNSW graph degree")
+    parser.add_argument("--ef-search", type=int, help="HNSW search breadth")
+    parser.add_argument("--pq-m", type=int, help="PQ sub-quantizers (must divide 384)")
+    args = parser.parse_args()
+
+    # --update keeps the existing index's type and tuning unless overridden.
+    index_type, index_params = index_settings(args.out) if args.update else ("flat", {})
+    index_type = args.index_type or index_type
+    index_params = dict(index_params, **{key: value for key, value in {
+        "nlist": args.nlist, "nprobe": args.nprobe, "hnsw_m": args.hnsw_m,
+        "ef_search": args.ef_search, "pq_m": args.pq_m,
+    }.items() if value is not None})
+    save_kwargs = {"index_type": index_type, "index_params": index_params}
+
+    if args.update:
+        vectorstore, manifest, stats = update_index(args.root, args.out, None, args.batch_size,
+                                                    args.chunk_size, args.chunk_overlap)
+        save_corpus_index(vectorstore, args.out, stats, args.chunk_size, args.chunk_overlap,
+                          manifest=manifest, **save_kwargs)
+        print(f"Updated {args.out} in {stats['total_s']}s: "
+              f"+{stats['added']} new, ~{stats['changed']} changed, -{stats['deleted']} deleted, "
+              f"{stats['unchanged']} unchanged | {stats['chunks']} chunks embedded, "
+              f"{stats['removed_chunks']} removed")
+        return
+
+    manifest = new_manifest()
+    if args.stream:
+        paths = find_documents(args.root)
+        manifest["files"].update(_manifest_entries(paths, args.root))
+        vectorstore, stats = stream_ingest(paths, get_embeddings(),
+                                           args.root, args.batch_size,
+                                           args.chunk_size, args.chunk_overlap,
+                                           manifest=manifest)
+        save_corpus_index(vectorstore, args.out, stats, args.chunk_size, args.chunk_overlap,
+                          manifest=manifest, **save_kwargs)
+        print(f"Wrote {args.out}")
+        _print_stats(stats)
+        return
+
+    if args.scaling:
+        counts, n = [], 1
+        while n < args.workers:
+            counts.append(n)
+            n *= 2
+        counts.append(args.workers)
+        # No embedding cache here: after the first run every chunk would be
+        # a cache hit and later runs would time cache reads, not workers.
+        uncached = get_embeddings(cache_dir=None)
+        base = None
+        for w in counts:
+            _, stats = ingest_directory(args.root, w, args.batch_size,
+                                        args.chunk_size, args.chunk_overlap,
+                                        embeddings=uncached)
+            base = base or stats["total_s"]
+            print(f"\n[{w} worker(s)]  speed-up x{base / stats['total_s']:.2f}")
+            _print_stats(stats)
+        return
+
+    vectorstore, stats = ingest_directory(args.root, args.workers, args.batch_size,
+                                          args.chunk_size, args.chunk_overlap,
+                                          manifest=manifest)
+    save_corpus_index(vectorstore, args.out, stats, args.chunk_size, args.chunk_overlap,
+                      manifest=manifest, **save_kwargs)
+    print(f"Wrote {args.out}")
+    _print_stats(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+============================================================
+  Persistent FAISS index cache for the Strict RAG chatbot
+============================================================
+  Building the vector store (load PDF -> split -> embed -> FAISS)
+  takes tens of seconds. This module saves the built index to disk
+  under a content-addressed key:
+
+      key = sha256( PDF bytes hash
+                    + chunk_size + chunk_overlap
+                    + embedding model name )
+
+  Later startups load the index straight from disk. If the PDF,
+  the splitter settings or the embedding model change, the key
+  changes and the index is rebuilt automatically.
+
+  BENCHMARK (cold vs warm start):
+      python rag_store.py attention.pdf
+============================================================
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_community.vectorstores import FAISS
+from langchain_huggingface import HuggingFaceEmbeddings
+
+from rag_embed_cache import CachedEmbeddings
+
+
+# ============================================================
+# 1. CONFIGURATION
+# ============================================================
+
+PDF_PATH = "attention.pdf"
+EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+CHUNK_SIZE = 4000          # RecursiveCharacterTextSplitter defaults
+CHUNK_OVERLAP = 200
+CACHE_DIR = os.environ.get("RAG_CACHE_DIR", ".rag_cache")
+# Per-chunk vectors shared by every chunking setting; set to "" to disable.
+EMBED_CACHE_DIR = os.environ.get("RAG_EMBED_CACHE_DIR", os.path.join(CACHE_DIR, "embeddings"))
+
+
+# ============================================================
+# 2. CACHE KEY
+# ============================================================
+
+def file_sha256(path: str) -> str:
+    """Hash a file in 1 MB blocks so large PDFs are never read whole."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def index_key(pdf_path: str, chunk_size: int = CHUNK_SIZE,
+              chunk_overlap: int = CHUNK_OVERLAP,
+              model_name: str = EMBED_MODEL) -> str:
+    """Content-addressed key for one (document, splitter, model) combination."""
+    settings = {
+        "source_sha256": file_sha256(pdf_path),
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "model_name": model_name,
+    }
+    blob = json.dumps(settings, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()[:32]
+
+
+# ============================================================
+# 3. BUILD / LOAD
+# ============================================================
+
+def get_embeddings(model_name: str = EMBED_MODEL, cache_dir: str = EMBED_CACHE_DIR):
+    """MiniLM, wrapped in the chunk-level embedding cache unless `cache_dir` is empty."""
+    embeddings = HuggingFaceEmbeddings(model_name=model_name)
+    if cache_dir:
+        return CachedEmbeddings(embeddings, model_name, cache_dir)
+    return embeddings
+
+
+def build_vectorstore(pdf_path: str, embeddings,
+                      chunk_size: int = CHUNK_SIZE,
+                      chunk_overlap: int = CHUNK_OVERLAP) -> FAISS:
+    """The original load -> split -> embed -> FAISS pipeline."""
+    documents = PyPDFLoader(pdf_path).load()
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap
+    )
+    docs = splitter.split_documents(documents)
+    return FAISS.from_documents(docs, embeddings)
+
+
+def load_or_build_vectorstore(pdf_path: str = PDF_PATH, embeddings=None,
+                              chunk_size: int = CHUNK_SIZE,
+                              chunk_overlap: int = CHUNK_OVERLAP,
+                              model_name: str = EMBED_MODEL,
+                              cache_dir: str = CACHE_DIR) -> FAISS:
+    """
+    Return the FAISS store for `pdf_path`, loading it from `cache_dir`
+    when an index with the same key exists, otherwise building it and
+    saving it for the next startup.
+    """
+    if embeddings is None:
+        embeddings = get_embeddings(model_name)
+
+    key = index_key(pdf_path, chunk_size, chunk_overlap, model_name)
+    index_dir = os.path.join(cache_dir, key)
+
+    if os.path.exists(os.path.join(index_dir, "index.faiss")):
+        # We wrote these pickles ourselves, so deserializing them is safe.
+        return FAISS.load_local(
+            index_dir, embeddings, allow_dangerous_deserialization=True
+        )
+
+    vectorstore = build_vectorstore(pdf_path, embeddings, chunk_size, chunk_overlap)
+
+    # Save into a temp dir first and rename, so a crash mid-save never
+    # leaves a half-written index behind under the real key.
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=key + ".", dir=cache_dir)
+    vectorstore.save_local(tmp_dir)
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump({
+            "source": os.path.abspath(pdf_path),
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
+            "model_name": model_name,
+            "num_chunks": vectorstore.index.ntotal,
+            "created": time.time(),
+        }, f, indent=2)
+    try:
+        os.rename(tmp_dir, index_dir)
+    except OSError:
+        # Another process finished the same build first — keep theirs.
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return vectorstore
+
+
+# ============================================================
+# 4. BENCHMARK — cold vs warm start
+# ============================================================
+
+def benchmark(pdf_path: str = PDF_PATH):
+    """Time a cold build (empty cache) against a warm load (cache hit)."""
+    cache_dir = tempfile.mkdtemp(prefix="rag_cache_bench.")
+    try:
+        # Model load is the same in both modes; no embedding cache, so cold stays cold.
+        embeddings = get_embeddings(cache_dir=None)
+
+        t0 = time.perf_counter()
+        cold = load_or_build_vectorstore(pdf_path, embeddings, cache_dir=cache_dir)
+        cold_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        warm = load_or_build_vectorstore(pdf_path, embeddings, cache_dir=cache_dir)
+        warm_s = time.perf_counter() - t0
+
+        assert cold.index.ntotal == warm.index.ntotal
+        print(f"Chunks indexed : {warm.index.ntotal}")
+        print(f"Cold start     : {cold_s:8.3f} s  (load + split + embed + save)")
+        print(f"Warm start     : {warm_s:8.3f} s  (load from disk)")
+        print(f"Speed-up       : {cold_s / max(warm_s, 1e-9):8.1f}x")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    benchmark(sys.argv[1] if len(sys.argv) > 1 else PDF_PATH)
@@ -0,0 +1,130 @@
+"""
+============================================================
+  Step / token / wall-clock budgets for agent loops
+============================================================
+  The ReAct agent loops for as long as the model keeps asking for
+  tools, and usecase_example's graph has no limit at all: one
+  confused model could burn unbounded time and tokens.
+
+  A run now carries a budget in its state,
+
+      {"max_steps": 8, "max_tokens": 20000, "max_seconds": 120}
+
+  and the graph keeps count of what it has used:
+
+      steps        LLM calls made by the agent node
+      tokens_used  prompt + completion tokens reported by the provider
+      elapsed_s    wall time spent inside the graph's nodes (it carries
+                   over when a checkpointed run is resumed)
+
+  Before each LLM call the agent node asks exhausted(state). Once a
+  limit is hit (or the next call is the last one allowed), the model
+  is called without tools and told to answer from what it has, so
+  the run ends with a real answer instead of an error. The final
+  state says why it stopped:
+
+      stop_reason = "answered" | "max_steps" | "max_tokens" | "max_seconds"
+
+  Limits are checked between nodes; the forced final call may go a
+  little over max_tokens, and tool calls are cut off at the time left.
+
+  Add BudgetState's fields to an agent's state with
+      class AgentState(BudgetState): ...
+============================================================
+"""
+
+import time
+import operator
+from typing import TypedDict, Annotated
+
+from langchain_core.messages import HumanMessage
+
+
+# ============================================================
+# 1. CONFIGURATION
+# ============================================================
+
+DEFAULT_BUDGET = {"max_steps": 8, "max_tokens": 20_000, "max_seconds": 120}
+
+FINAL_ANSWER_PROMPT = (
+    "Stop here: this run has used up its {reason} budget and no more tools can be called. "
+    "Using only the information gathered above, give your best final answer now. "
+    "If it is incomplete, say what is missing."
+)
+
+REASON_NAMES = {"max_steps": "step", "max_tokens": "token", "max_seconds": "time"}
+
+
+# ============================================================
+# 2. STATE
+# ============================================================
+
+class BudgetState(TypedDict, total=False):
+    budget: dict                                 # limits, see DEFAULT_BUDGET
+    steps: Annotated[int, operator.add]          # each node adds what it used
+    tokens_used: Annotated[int, operator.add]
+    elapsed_s: Annotated[float, operator.add]
+    stop_reason: str
+
+
+def new_budget(**limits) -> dict:
+    """DEFAULT_BUDGET with some limits replaced; None removes a limit."""
+    return {**DEFAULT_BUDGET, **limits}
+
+
+# ============================================================
+# 3. CHECKS
+# ============================================================
+
+def exhausted(state: dict):
+    """Name of the limit that forces the next agent step to be final, or None."""
+    budget = state.get("budget") or DEFAULT_BUDGET
+    if budget.get("max_steps") is not None and state.get("steps", 0) + 1 >= budget["max_steps"]:
+        return "max_steps"
+    if budget.get("max_tokens") is not None and state.get("tokens_used", 0) >= budget["max_tokens"]:
+        return "max_tokens"
+    if budget.get("max_seconds") is not None and state.get("elapsed_s", 0.0) >= budget["max_seconds"]:
+        return "max_seconds"
+    return None
+
+
+def time_left(state: dict) -> float:
+    budget = state.get("budget") or DEFAULT_BUDGET
+    if budget.get("max_seconds") is None:
+        return float("inf")
+    return max(0.0, budget["max_seconds"] - state.get("elapsed_s", 0.0))
+
+
+def final_answer_messages(messages, reason: str) -> list:
+    """The history plus the instruction to wrap up."""
+    return list(messages) + [HumanMessage(content=FINAL_ANSWER_PROMPT.format(reason=REASON_NAMES[reason]))]
+
+
+# ============================================================
+# 4. ACCOUNTING (what a node returns)
+# ============================================================
+
+def tokens_of(response) -> int:
+    usage = getattr(response, "usage_metadata", None) or {}
+    return usage.get("total_tokens", 0)
+
+
+def agent_usage(response, started: float, reason: str = None) -> dict:
+    """
+    State update for one agent step that began at time.monotonic() == started.
+    A step without tool calls ends the run: its stop_reason is `reason`,
+    or "answered" if the model stopped on its own.
+    """
+    update = {
+        "steps": 1,
+        "tokens_used": tokens_of(response),
+        "elapsed_s": time.monotonic() - started,
+    }
+    if reason is not None or not getattr(response, "tool_calls", None):
+        update["stop_reason"] = reason or "answered"
+    return update
+
+
+def node_usage(started: float) -> dict:
+    """State update for a node that costs time only (tools)."""
+    return {"elapsed_s": time.monotonic() - started}
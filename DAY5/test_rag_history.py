@@ -0,0 +1,79 @@
+"""
+Write-behind history store: a failing write must not kill the writer,
+and reads must not wait for the queued writes.
+
+    python -m pytest test_rag_history.py
+"""
+
+import time
+import threading
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from rag_history import SQLiteHistoryStore
+
+
+def _flush_returns(store, timeout: float = 5.0) -> bool:
+    done = threading.Event()
+    threading.Thread(target=lambda: (store.flush(), done.set()), daemon=True).start()
+    return done.wait(timeout)
+
+
+def test_failing_write_does_not_hang_flush(tmp_path, monkeypatch):
+    store = SQLiteHistoryStore(str(tmp_path / "history.db"), flush_interval_s=0.05)
+    apply = SQLiteHistoryStore._apply
+
+    def flaky_apply(conn, op):
+        if op[0] == "summary":
+            raise RuntimeError("disk on fire")
+        apply(conn, op)
+
+    monkeypatch.setattr(store, "_apply", flaky_apply)
+    try:
+        history = store.get("s1")
+        history.add_messages([HumanMessage(content="hi"), AIMessage(content="hello")])
+        store._enqueue(("summary", "s1", "never written"))
+        history.add_messages([HumanMessage(content="still there?")])
+
+        assert _flush_returns(store)
+        assert store._writer.is_alive()
+
+        # Writes around the failed one were committed.
+        assert [m["content"] for m in store.transcript("s1")] == ["hi", "hello", "still there?"]
+
+        # And the writer keeps serving later batches.
+        store._enqueue(("summary", "s1", "again"))
+        store.get("s1").add_messages([AIMessage(content="yes")])
+        assert _flush_returns(store)
+        assert store.transcript("s1")[-1]["content"] == "yes"
+    finally:
+        monkeypatch.undo()
+        store.close()
+
+
+def test_reads_merge_queued_writes_without_waiting(tmp_path):
+    # A long batching window: nothing below gets committed before close().
+    store = SQLiteHistoryStore(str(tmp_path / "history.db"), flush_interval_s=30)
+    try:
+        store.get("busy").add_messages([HumanMessage(content="other session")])
+        history = store.get("s1")
+        history.add_messages([HumanMessage(content="hi"), AIMessage(content="hello")])
+        history.clear()
+        history.add_messages([HumanMessage(content="again")])
+        store._hot.clear()                      # evict: the next get() is a cold load
+
+        t0 = time.monotonic()
+        assert [m["content"] for m in store.transcript("s1")] == ["again"]
+        reloaded = store.get("s1")
+        assert time.monotonic() - t0 < 1.0
+        assert [m.content for m in reloaded.messages] == ["again"]
+        assert reloaded._next_seq == 1
+    finally:
+        store.close()
+
+    reopened = SQLiteHistoryStore(str(tmp_path / "history.db"))
+    try:
+        assert [m["content"] for m in reopened.transcript("s1")] == ["again"]
+        assert [m["content"] for m in reopened.transcript("busy")] == ["other session"]
+    finally:
+        reopened.close()
@@ -0,0 +1,369 @@
+"""
+============================================================
+  Span tracing for any compiled LangGraph graph
+============================================================
+  Until now the only way to see where a run spent its time was
+  the print() lines in each node. GraphTracer is a LangChain
+  callback handler that records one span per
+
+      graph run / node / LLM call / tool call
+
+  with its wall time, time spent waiting before it could start
+  (rate limiter, tool thread pool), prompt + completion tokens
+  and input / output payload sizes.
+
+      from tracing import traced
+      app = traced(graph.compile())     # no-op unless AGENT_TRACE is set
+
+      AGENT_TRACE=spans.jsonl python p8.py
+
+  prints a summary table at exit and appends every span to
+  spans.jsonl, one JSON object per line. "graph overhead" is the
+  part of a graph run not covered by any of its nodes (LangGraph
+  scheduling, reducers, checkpoints). Use GraphTracer directly to
+  trace one call:
+
+      tracer = GraphTracer()
+      app.invoke(state, config={"callbacks": [tracer]})
+      print(tracer.summary())
+
+  Code that waits before an LLM or tool call reports it with
+  report_wait(seconds); the next LLM / tool span in the same node
+  gets it as wait_s.
+
+  DEMO (stub model, no API key needed):
+      python tracing.py
+============================================================
+"""
+
+import os
+import json
+import time
+import atexit
+import threading
+from collections import defaultdict
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+# ============================================================
+# 1. CONFIGURATION
+# ============================================================
+
+TRACE_PATH = os.environ.get("AGENT_TRACE")      # set to switch tracing on in the scripts
+WAIT_EVENT = "agent_wait"
+
+
+# ============================================================
+# 2. WAIT REPORTING (called from inside nodes)
+# ============================================================
+
+def report_wait(seconds: float, reason: str = "queue"):
+    """Attach `seconds` of waiting to the current node; a no-op outside a traced run."""
+    if seconds <= 0:
+        return
+    from langchain_core.callbacks import dispatch_custom_event
+    try:
+        dispatch_custom_event(WAIT_EVENT, {"seconds": seconds, "reason": reason})
+    except RuntimeError:                        # not inside a runnable
+        pass
+
+
+async def areport_wait(seconds: float, reason: str = "queue"):
+    if seconds <= 0:
+        return
+    from langchain_core.callbacks import adispatch_custom_event
+    try:
+        await adispatch_custom_event(WAIT_EVENT, {"seconds": seconds, "reason": reason})
+    except RuntimeError:
+        pass
+
+
+# ============================================================
+# 3. TRACER
+# ============================================================
+
+def _size(payload) -> int:
+    """Bytes of `payload` as UTF-8 text (messages count their content)."""
+    if payload is None:
+        return 0
+    if isinstance(payload, str):
+        return len(payload.encode("utf-8"))
+    if isinstance(payload, dict):
+        return sum(_size(v) for v in payload.values())
+    if isinstance(payload, (list, tuple)):
+        return sum(_size(v) for v in payload)
+    content = getattr(payload, "content", None)
+    if content is not None:
+        calls = getattr(payload, "tool_calls", None)
+        return _size(content) + (len(json.dumps(calls, default=str)) if calls else 0)
+    return len(str(payload).encode("utf-8"))
+
+
+def _percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class GraphTracer(BaseCallbackHandler):
+    """Collects spans; thread-safe, works for invoke, stream and ainvoke."""
+
+    def __init__(self):
+        self.spans = []                 # finished spans, in end order
+        self._open = {}                 # run_id -> span
+        self._parent = {}               # run_id -> parent run_id, for every run still running
+        self._pending_wait = defaultdict(float)   # node run_id -> wait not yet claimed
+        self._lock = threading.RLock()
+
+    # ---------- bookkeeping ----------
+
+    def _owner(self, run_id):
+        """Nearest enclosing recorded span (a node, usually) of `run_id`."""
+        while run_id is not None and run_id not in self._open:
+            run_id = self._parent.get(run_id)
+        return run_id
+
+    def _start(self, run_id, parent_run_id, kind: str, name: str, payload, **extra):
+        with self._lock:
+            self._parent[run_id] = parent_run_id
+            owner = self._owner(parent_run_id)
+            wait = self._pending_wait.pop(owner, 0.0) if kind in ("llm", "tool") else 0.0
+            self._open[run_id] = {
+                "id": str(run_id), "parent": str(owner) if owner else None,
+                "kind": kind, "name": name, "start": time.time(), "_t0": time.perf_counter(),
+                "wall_s": None, "wait_s": wait,
+                "prompt_tokens": None, "completion_tokens": None,
+                "input_bytes": _size(payload), "output_bytes": None, "error": None,
+                **extra,
+            }
+
+    def _end(self, run_id, payload=None, error=None, **fields):
+        with self._lock:
+            self._parent.pop(run_id, None)      # finished runs have no children to resolve
+            self._pending_wait.pop(run_id, None)
+            span = self._open.pop(run_id, None)
+            if span is None:                    # a run we chose not to record
+                return
+            span["wall_s"] = time.perf_counter() - span.pop("_t0")
+            span["output_bytes"] = _size(payload)
+            span["error"] = repr(error) if error else None
+            span.update(fields)
+            self.spans.append(span)
+
+    # ---------- graphs and nodes ----------
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None,
+                       tags=None, metadata=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name", "chain")
+        with self._lock:                        # _start() re-enters it
+            parent_kind = self._open.get(parent_run_id, {}).get("kind")
+            if parent_run_id is None:
+                self._start(run_id, None, "graph", name, inputs)
+            elif parent_kind == "graph" and (metadata or {}).get("langgraph_node") == name:
+                self._start(run_id, parent_run_id, "node", name, inputs,
+                            step=(metadata or {}).get("langgraph_step"))
+            else:                               # edges, channel writes, sub-chains
+                self._parent[run_id] = parent_run_id
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id, outputs)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    # ---------- LLM calls ----------
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None,
+                            metadata=None, **kwargs):
+        name = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name", "chat_model")
+        self._start(run_id, parent_run_id, "llm", name, messages)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        name = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name", "llm")
+        self._start(run_id, parent_run_id, "llm", name, prompts)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        generations = [g for batch in response.generations for g in batch]
+        prompt_tokens = completion_tokens = None
+        for g in generations:
+            usage = getattr(getattr(g, "message", None), "usage_metadata", None)
+            if usage:
+                prompt_tokens = (prompt_tokens or 0) + usage.get("input_tokens", 0)
+                completion_tokens = (completion_tokens or 0) + usage.get("output_tokens", 0)
+        if prompt_tokens is None:               # older integrations report it here
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            prompt_tokens = usage.get("prompt_tokens")
+            completion_tokens = usage.get("completion_tokens")
+        payload = [getattr(g, "message", None) or g.text for g in generations]
+        self._end(run_id, payload, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    # ---------- tools ----------
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name", "tool")
+        self._start(run_id, parent_run_id, "tool", name, input_str)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id, output)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    # ---------- waits ----------
+
+    def on_custom_event(self, name, data, *, run_id, **kwargs):
+        if name != WAIT_EVENT:
+            return
+        with self._lock:
+            owner = self._owner(run_id)
+            if owner is not None:
+                self._open[owner]["wait_s"] += data["seconds"]
+                self._pending_wait[owner] += data["seconds"]
+
+    # ---------- export ----------
+
+    def export_jsonl(self, path: str):
+        with self._lock, open(path, "a", encoding="utf-8") as f:
+            for span in self.spans:
+                f.write(json.dumps(span, default=str) + "\n")
+
+    def rows(self) -> list:
+        """One summary row per (kind, name), plus graph overhead."""
+        with self._lock:
+            spans = list(self.spans)
+        groups = defaultdict(list)
+        for span in spans:
+            groups[(span["kind"], span["name"])].append(span)
+
+        # Graph overhead: graph wall time minus the time covered by its nodes.
+        overhead = []
+        for graph in (s for s in spans if s["kind"] == "graph"):
+            nodes = sorted((s["start"], s["start"] + s["wall_s"]) for s in spans
+                           if s["parent"] == graph["id"] and s["kind"] == "node")
+            covered, reach = 0.0, graph["start"]
+            for begin, end in nodes:            # union of (possibly parallel) node intervals
+                if end > reach:
+                    covered += end - max(begin, reach)
+                    reach = end
+            overhead.append(max(0.0, graph["wall_s"] - covered))
+
+        order = {"graph": 0, "node": 1, "llm": 2, "tool": 3}
+        rows = []
+        for (kind, name), group in sorted(groups.items(), key=lambda kv: (order[kv[0][0]], kv[0][1])):
+            walls = [s["wall_s"] for s in group]
+            rows.append({
+                "kind": kind, "name": name, "count": len(group),
+                "total_s": sum(walls), "mean_s": sum(walls) / len(walls), "p95_s": _percentile(walls, 0.95),
+                "wait_s": sum(s["wait_s"] for s in group),
+                "prompt_tokens": sum(s["prompt_tokens"] or 0 for s in group),
+                "completion_tokens": sum(s["completion_tokens"] or 0 for s in group),
+                "input_kb": sum(s["input_bytes"] for s in group) / 1024,
+                "output_kb": sum((s["output_bytes"] or 0) for s in group) / 1024,
+                "errors": sum(1 for s in group if s["error"]),
+            })
+        if overhead:
+            rows.append({"kind": "graph", "name": "graph overhead", "count": len(overhead),
+                         "total_s": sum(overhead), "mean_s": sum(overhead) / len(overhead),
+                         "p95_s": _percentile(overhead, 0.95), "wait_s": 0.0, "prompt_tokens": 0,
+                         "completion_tokens": 0, "input_kb": 0.0, "output_kb": 0.0, "errors": 0})
+        return rows
+
+    def summary(self) -> str:
+        header = (f"{'kind':<6} {'name':<28} {'n':>4} {'total s':>8} {'mean s':>8} {'p95 s':>8} "
+                  f"{'wait s':>7} {'tok in':>7} {'tok out':>7} {'in KB':>7} {'out KB':>7} {'err':>3}")
+        lines = [header, "-" * len(header)]
+        for r in self.rows():
+            lines.append(
+                f"{r['kind']:<6} {r['name'][:28]:<28} {r['count']:>4} {r['total_s']:>8.3f} "
+                f"{r['mean_s']:>8.3f} {r['p95_s']:>8.3f} {r['wait_s']:>7.3f} {r['prompt_tokens']:>7} "
+                f"{r['completion_tokens']:>7} {r['input_kb']:>7.1f} {r['output_kb']:>7.1f} {r['errors']:>3}"
+            )
+        return "\n".join(lines)
+
+
+# ============================================================
+# 4. SWITCH FOR THE SCRIPTS
+# ============================================================
+
+_global_tracer = None
+
+
+def _flush_global():
+    if _global_tracer is not None and _global_tracer.spans:
+        _global_tracer.export_jsonl(TRACE_PATH)
+        print(f"\n[trace] {len(_global_tracer.spans)} spans appended to {TRACE_PATH}\n")
+        print(_global_tracer.summary())
+
+
+def traced(app, tracer: GraphTracer = None):
+    """
+    `app` with `tracer` attached to every call. Without a tracer, the
+    process-wide one is used if AGENT_TRACE is set; otherwise `app` is
+    returned unchanged.
+    """
+    global _global_tracer
+    if tracer is None:
+        if not TRACE_PATH:
+            return app
+        if _global_tracer is None:
+            _global_tracer = GraphTracer()
+            atexit.register(_flush_global)
+        tracer = _global_tracer
+    return app.with_config(callbacks=[tracer])
+
+
+# ============================================================
+# 5. DEMO
+# ============================================================
+
+if __name__ == "__main__":
+    from typing import TypedDict
+    from langchain_core.messages import AIMessage
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from langchain_core.tools import tool
+    from langgraph.graph import StateGraph, START, END
+
+    def replies():
+        while True:
+            yield AIMessage("notes about LangGraph " * 20,
+                            usage_metadata={"input_tokens": 120, "output_tokens": 60, "total_tokens": 180})
+
+    llm = GenericFakeChatModel(messages=replies())
+
+    @tool
+    def slow_search(query: str) -> str:
+        """Stub search that takes 50 ms."""
+        time.sleep(0.05)
+        return f"results for {query} " * 10
+
+    class State(TypedDict):
+        question: str
+        notes: str
+        answer: str
+
+    def researcher(state):
+        report_wait(0.02, "rate_limit")         # as if the limiter had held the call
+        time.sleep(0.02)
+        found = slow_search.invoke({"query": state["question"]})
+        return {"notes": llm.invoke(f"Summarise: {found}").content}
+
+    def writer(state):
+        return {"answer": llm.invoke(f"Answer {state['question']} using {state['notes']}").content}
+
+    graph = StateGraph(State)
+    graph.add_node("researcher", researcher)
+    graph.add_node("writer", writer)
+    graph.add_edge(START, "researcher")
+    graph.add_edge("researcher", "writer")
+    graph.add_edge("writer", END)
+
+    tracer = GraphTracer()
+    app = traced(graph.compile(), tracer)
+    for _ in range(3):
+        app.invoke({"question": "What is LangGraph?", "notes": "", "answer": ""})
+    print(tracer.summary())
+    print()
+    print(json.dumps(tracer.spans[0], default=str))
@@ -5,14 +5,18 @@
 """
 
 import os
-from typing import TypedDict, Annotated, List, Tuple, Union
+import time
 import operator
+from typing import Annotated, List, Tuple, Union
 
 from langgraph.graph import StateGraph, END
-from langgraph.prebuilt import ToolExecutor
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage
 from langchain_core.agents import AgentAction, AgentFinish
-from langchain_groq import ChatGroq
+from llm_registry import get_chat_model
+from tracing import traced
+from agent_service import AgentService
+from mock_backends import SearchIndex, CityMatcher, load_fixture
+from run_budget import BudgetState, new_budget, exhausted, final_answer_messages, agent_usage, node_usage
 from langchain_core.tools import tool
 
 print(" All imports successful!")
@@ -26,20 +30,31 @@ if os.getenv('GROQ_API_KEY') and os.getenv('GROQ_API_KEY') != 'your-groq-api-key
 else:
     print("  Please set your GROQ_API_KEY above!")
 
+# Simulated search results and forecasts. Set MOCK_TOOLS_FIXTURE to a .json or
+# .csv file to use a bigger canned set instead (format: mock_backends.py).
+search_db = {
+    "tokyo weather april": "Tokyo in April: 14-20°C (57-68°F). Cherry blossom season peaks early-mid April.",
+    "tokyo activities april": "Top activities: Hanami at Ueno Park, Sumida River, temple visits, sakura foods.",
+    "paris hotels": "Budget hotels: Hotel du Nord (€120), Ibis Paris (€110).",
+}
+forecasts = {
+    "tokyo": "Tokyo: Partly cloudy, 18°C, Humidity: 65%",
+    "paris": "Paris: Light rain, 12°C, Humidity: 78%",
+    "new york": "New York: Sunny, 22°C, Humidity: 55%"
+}
+if os.getenv("MOCK_TOOLS_FIXTURE"):
+    search_db, forecasts = load_fixture(os.environ["MOCK_TOOLS_FIXTURE"])
+
+# Built once: lookups no longer scan every entry (word index / Aho-Corasick)
+search_index = SearchIndex(search_db)
+city_matcher = CityMatcher(forecasts)
+
 @tool
 def web_search(query: str) -> str:
     """Search the web for information."""
-    # Simulated search results
-    search_db = {
-        "tokyo weather april": "Tokyo in April: 14-20°C (57-68°F). Cherry blossom season peaks early-mid April.",
-        "tokyo activities april": "Top activities: Hanami at Ueno Park, Sumida River, temple visits, sakura foods.",
-        "paris hotels": "Budget hotels: Hotel du Nord (€120), Ibis Paris (€110).",
-    }
-    
-    query_lower = query.lower()
-    for key, result in search_db.items():
-        if all(word in query_lower for word in key.split()):
-            return result
+    result = search_index.lookup(query)
+    if result is not None:
+        return result
     
     return f"Search results for '{query}'"
 
@@ -55,42 +70,51 @@ def calculator(expression: str) -> str:
 @tool
 def weather_forecast(city: str) -> str:
     """Get weather forecast for a city."""
-    forecasts = {
-        "tokyo": "Tokyo: Partly cloudy, 18°C, Humidity: 65%",
-        "paris": "Paris: Light rain, 12°C, Humidity: 78%",
-        "new york": "New York: Sunny, 22°C, Humidity: 55%"
-    }
-    
-    for key, forecast in forecasts.items():
-        if key in city.lower():
-            return forecast
+    forecast = city_matcher.lookup(city)
+    if forecast is not None:
+        return forecast
     
     return f"Weather for {city}: Moderate conditions, ~20°C"
 
 tools = [web_search, calculator, weather_forecast]
-tool_executor = ToolExecutor(tools)
+tools_by_name = {t.name: t for t in tools}
 
 print(f" Defined {len(tools)} tools: {[t.name for t in tools]}")
 
-class AgentState(TypedDict):
-    """State that flows through the graph."""
+class AgentState(BudgetState):
+    """State that flows through the graph (+ budget counters and stop_reason)."""
     messages: Annotated[List[BaseMessage], operator.add]
     agent_outcome: Union[AgentAction, AgentFinish, None]
     intermediate_steps: Annotated[List[Tuple[AgentAction, str]], operator.add]
 
+# Per-query limits: once one is reached the agent must answer with what it has
+RUN_BUDGET = new_budget(max_steps=6, max_tokens=8_000, max_seconds=60)
+
 print("State schema defined!")
 
 def run_agent(state: AgentState) -> AgentState:
     """Agent node - LLM reasoning and decision making."""
     print("\n AGENT: Thinking...")
-    
-    # Initialize LLM
-    llm = ChatGroq(model="mixtral-8x7b-32768", temperature=0)
-    llm_with_tools = llm.bind_tools(tools)
+    started = time.monotonic()
     
     # Get messages
     messages = state.get("messages", [])
     
+    reason = exhausted(state)
+    if reason:
+        # Budget used up: no tools, the model has to answer now
+        print(f"    Budget reached ({reason}): forcing a final answer")
+        llm = get_chat_model("mixtral-8x7b-32768", temperature=0)
+        response = llm.invoke(final_answer_messages(messages, reason))
+        return {
+            "messages": [response],
+            "agent_outcome": AgentFinish(return_values={"output": response.content}, log=""),
+            **agent_usage(response, started, reason),
+        }
+    
+    # Shared client with the tools already bound (built once, reused every step)
+    llm_with_tools = get_chat_model("mixtral-8x7b-32768", tools=tools, temperature=0)
+    
     # LLM generates response
     response = llm_with_tools.invoke(messages)
     
@@ -105,7 +129,8 @@ def run_agent(state: AgentState) -> AgentState:
                 tool=tool_call['name'],
                 tool_input=tool_call['args'],
                 log=""
-            )
+            ),
+            **agent_usage(response, started)
         }
     else:
         print(f"    Decision: Finish with answer")
@@ -114,7 +139,8 @@ def run_agent(state: AgentState) -> AgentState:
             "agent_outcome": AgentFinish(
                 return_values={"output": response.content},
                 log=""
-            )
+            ),
+            **agent_usage(response, started)
         }
 
 print("Agent node defined!")
@@ -122,11 +148,16 @@ print("Agent node defined!")
 def execute_tools(state: AgentState) -> AgentState:
     """Tools node - Execute the action."""
     agent_action = state["agent_outcome"]
+    started = time.monotonic()
     
     print(f"\n🔧 TOOLS: Executing {agent_action.tool}")
     
-    # Execute tool
-    observation = tool_executor.invoke(agent_action)
+    # Execute tool (an unknown tool name becomes an error the model can read)
+    selected = tools_by_name.get(agent_action.tool)
+    if selected is None:
+        observation = f"Error: {agent_action.tool} is not a valid tool, try one of {list(tools_by_name)}"
+    else:
+        observation = selected.invoke(agent_action.tool_input)
     
     print(f" Result: {str(observation)[:80]}...")
     
@@ -138,7 +169,8 @@ def execute_tools(state: AgentState) -> AgentState:
     
     return {
         "messages": [tool_message],
-        "intermediate_steps": [(agent_action, str(observation))]
+        "intermediate_steps": [(agent_action, str(observation))],
+        **node_usage(started)
     }
 
 print("Tools node defined!")
@@ -181,36 +213,49 @@ def create_agent():
     workflow.add_edge("tools", "agent")
     
     # Compile
-    return workflow.compile()
+    return traced(workflow.compile())     # AGENT_TRACE=spans.jsonl to record spans
 
 print(" Graph builder ready!")
 
+def initial_state(query: str) -> dict:
+    return {
+        "messages": [HumanMessage(content=query)],
+        "intermediate_steps": [],
+        "budget": RUN_BUDGET
+    }
+
+# ============================================================================
+#  Agent Service (compiled once, shared by every query below)
+# ============================================================================
+# The graph is compiled here once and the tool-bound client is created up
+# front; run_query, streaming, interactive mode and quick_test all reuse them.
+service = AgentService(
+    create_agent,
+    initial_state,
+    warm=lambda: get_chat_model("mixtral-8x7b-32768", tools=tools, temperature=0),
+)
+
+print(f" Agent service ready! ({service.startup_s:.2f}s start-up)")
+
 # ============================================================================
 # : Run Agent Function
 # ============================================================================
+def answer_of(final_state) -> str:
+    if isinstance(final_state["agent_outcome"], AgentFinish):
+        return final_state["agent_outcome"].return_values["output"]
+    return "Agent did not complete"
+
 def run_query(query: str):
     """Run a query through the agent."""
     print("\n" + "="*70)
     print(f" QUERY: {query}")
     print("="*70)
     
-    # Create agent
-    app = create_agent()
-    
-    # Initial state
-    initial_state = {
-        "messages": [HumanMessage(content=query)],
-        "intermediate_steps": []
-    }
-    
-    # Execute
-    final_state = app.invoke(initial_state)
+    # Execute on the warm, already compiled agent
+    final_state = service.ask(query)
     
     # Get answer
-    if isinstance(final_state["agent_outcome"], AgentFinish):
-        answer = final_state["agent_outcome"].return_values["output"]
-    else:
-        answer = "Agent did not complete"
+    answer = answer_of(final_state)
     
     # Print summary
     print("\n" + "-"*70)
@@ -218,6 +263,8 @@ def run_query(query: str):
     print("-"*70)
     print(f" Tools used: {len(final_state.get('intermediate_steps', []))}")
     print(f" Total messages: {len(final_state['messages'])}")
+    print(f" Stopped: {final_state.get('stop_reason')} ({final_state.get('steps', 0)} steps, "
+          f"{final_state.get('tokens_used', 0)} tokens, {final_state.get('elapsed_s', 0.0):.1f}s)")
     print("="*70 + "\n")
     
     return answer
@@ -254,12 +301,7 @@ def run_with_streaming(query: str):
     print(f"STREAMING EXECUTION: {query}")
     print('='*70 + "\n")
     
-    app = create_agent()
-    
-    for i, step in enumerate(app.stream(
-        {"messages": [HumanMessage(content=query)]},
-        stream_mode="values"
-    ), 1):
+    for i, step in enumerate(service.stream(query, stream_mode="values"), 1):
         print(f"\n--- Step {i} ---")
         if "messages" in step and step["messages"]:
             last_msg = step["messages"][-1]
@@ -304,7 +346,7 @@ def interactive_mode():
 #  Quick Test Function
 # ============================================================================
 def quick_test():
-    """Run all test scenarios."""
+    """Run all test scenarios, concurrently on the shared service."""
     scenarios = [
         "What's 15 * 234?",
         "Search for Tokyo weather in April",
@@ -312,11 +354,11 @@ def quick_test():
         "Tokyo activities in April"
     ]
     
-    for query in scenarios:
-        try:
-            run_query(query)
-        except Exception as e:
-            print(f"Error on '{query}': {e}\n")
+    for query, result in zip(scenarios, service.ask_many(scenarios, max_concurrency=4)):
+        if isinstance(result, Exception):
+            print(f"Error on '{query}': {result}\n")
+        else:
+            print(f"\n{query}\n -> {answer_of(result)}\n")
 
 # Run quick test
 quick_test()
@@ -330,7 +372,7 @@ from langgraph.prebuilt import create_react_agent
 
 def simple_version(query: str):
     """Simplest possible agent."""
-    llm = ChatGroq(model="mixtral-8x7b-32768", temperature=0)
+    llm = get_chat_model("mixtral-8x7b-32768", temperature=0)
     agent = create_react_agent(llm, tools)
     
     result = agent.invoke({